@@ -19,6 +19,46 @@ class CreditConfig:
     """Credit scoring configuration"""
     min_credit_score = 300
     max_credit_score = 850
+    min_approval_score = 600
+
+class ShadowConfig:
+    """Shadow scoring of a challenger risk model on live traffic"""
+    enabled = False
+    registry_path = 'model_registry'
+    model_version = None  # None follows the registry's LATEST version
+    sample_rate = 0.1
+    max_workers = 2
+    max_pending = 16
+    risk_tolerance = 0.05
+    log_path = 'logs/shadow_disagreements.jsonl'
+
+class ExposureConfig:
+    """Portfolio concentration limits checked before an approval is final
+
+    Exposure is the amount offered (the recommended amount), not the amount
+    requested.
+    """
+    enabled = True
+    # Approvals are appended here and the book is rebuilt from it at startup;
+    # None keeps exposure in memory only, so it resets with the process
+    history_path = 'logs/approved_loans.jsonl'
+    approved_field = 'approved'
+    amount_field = 'recommended_amount'  # rows without it book their requested loan_amount
+    # Largest share of the approved book per state, loan purpose and risk category
+    max_share = {'state': 0.25, 'loan_purpose': 0.40, 'risk_category': 0.50}
+    # Share limits apply once the book holds at least this much
+    min_portfolio_amount = 5000000.0
+    # Absolute caps per value, e.g. {'state': {'CA': 20000000.0}}
+    amount_limits = {}
+
+class VelocityConfig:
+    """Sliding-window velocity checks on incoming applications"""
+    enabled = True
+    rules = None  # None uses data.velocity.DEFAULT_VELOCITY_RULES
+    n_buckets = 10
+    max_keys = 100000  # per exact-count rule
+    sketch_width = 4096
+    sketch_depth = 4
 
 # Application configuration
 APP_CONFIG = {
@@ -50,3 +90,6 @@ FEATURE_COLUMNS = {
 loan_config = LoanConfig()
 risk_config = RiskConfig()
 credit_config = CreditConfig()
+shadow_config = ShadowConfig()
+exposure_config = ExposureConfig()
+velocity_config = VelocityConfig()
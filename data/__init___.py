@@ -1,5 +1,6 @@
 """Data module for loan evaluation system"""
 from .data_processor import DataProcessor
 from .validators import InputValidator
+from .history import HistoryReader, OutcomeStream
 
-__all__ = ['DataProcessor', 'InputValidator']
+__all__ = ['DataProcessor', 'InputValidator', 'HistoryReader', 'OutcomeStream']
@@ -1,14 +1,26 @@
 """Data processing for loan evaluation system"""
-from typing import Dict, Any
+from typing import Dict, Any, List
 import logging
 
+import numpy as np
+
+from config import FEATURE_COLUMNS
+from utils.location_index import LocationIndex
+
 logger = logging.getLogger(__name__)
 
+# Fields kept as strings when flattening applications into columns
+CATEGORICAL_FIELDS = {
+    'gender', 'marital_status', 'education', 'employment_status',
+    'loan_purpose', 'state', 'city', 'zip_code'
+}
+
 class DataProcessor:
     """Data preprocessing system"""
 
     def __init__(self):
         self.processed_applications = []
+        self.location_index = LocationIndex()
 
     def process_application(self, raw_data: Dict[str, Any]) -> Dict[str, Any]:
         """Process raw application data"""
@@ -26,6 +38,50 @@ class DataProcessor:
             logger.error(f"Error processing application: {str(e)}")
             return raw_data
 
+    def process_batch(self, raw_applications: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+        """Flatten a batch of applications into feature columns"""
+        raw_columns = {}
+        for section, fields in FEATURE_COLUMNS.items():
+            sections = [application.get(section) or {} for application in raw_applications]
+            for field in fields:
+                raw_columns[field] = [values.get(field) for values in sections]
+        return self.process_columns(raw_columns)
+
+    def process_columns(self, raw_columns: Dict[str, Any]) -> Dict[str, np.ndarray]:
+        """Coerce flat columns (e.g. from Parquet or a DataFrame) to typed, normalized arrays"""
+        size = len(next(iter(raw_columns.values()))) if raw_columns else 0
+        columns = {}
+        for fields in FEATURE_COLUMNS.values():
+            for field in fields:
+                values = raw_columns.get(field)
+                if values is None:
+                    values = [None] * size
+                if field in CATEGORICAL_FIELDS:
+                    columns[field] = np.array(
+                        ['' if value is None else str(value) for value in values], dtype=object
+                    )
+                elif isinstance(values, np.ndarray) and values.dtype.kind in 'biuf':
+                    columns[field] = values.astype(np.float64)
+                else:
+                    columns[field] = np.array([self._to_float(value) for value in values], dtype=float)
+
+        # Normalize location names in one pass over their distinct values
+        columns['state'] = self.location_index.normalize_states(columns['state'])
+        columns['city'] = self.location_index.normalize_cities(columns['city'])
+        return columns
+
+    @staticmethod
+    def _to_float(value: Any) -> float:
+        """Convert a raw numeric field, using NaN for missing or malformed values"""
+        if value is None:
+            return np.nan
+        if isinstance(value, str):
+            value = value.replace(',', '').replace('$', '')
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return np.nan
+
     def _clean_data(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Clean and standardize input data"""
         cleaned = {}
@@ -0,0 +1,221 @@
+"""Chunked readers for stored application history"""
+import json
+import os
+import queue
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+from .data_processor import DataProcessor
+
+
+class HistoryReader:
+    """Streams stored applications as column chunks without loading the whole file
+
+    JSONL records hold a nested application (either under ``application`` or
+    as top-level sections) plus optional flat fields such as the outcome
+    label. Parquet files hold one flat column per feature field.
+
+    Parallel readers take a slice of the file: a ``byte_range`` of a JSONL
+    file or a list of ``row_groups`` of a Parquet file.
+    """
+
+    def __init__(self, path: str, chunk_size: int = 50000, label_field: Optional[str] = 'defaulted',
+                 extra_fields: Optional[List[str]] = None, byte_range: Optional[Tuple[int, int]] = None,
+                 row_groups: Optional[List[int]] = None):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.label_field = label_field
+        self.extra_fields = list(extra_fields or [])
+        self.byte_range = byte_range
+        self.row_groups = row_groups
+        self.processor = DataProcessor()
+
+    def __iter__(self) -> Iterator[Tuple[Dict[str, np.ndarray], Optional[np.ndarray]]]:
+        """Yield (columns, labels) per chunk; labels are None without a label field"""
+        if self.path.endswith('.parquet'):
+            if self.byte_range is not None:
+                raise ValueError("Parquet history is split by row_groups, not byte_range")
+            return self._iter_parquet()
+        if self.row_groups is not None:
+            raise ValueError("JSONL history is split by byte_range, not row_groups")
+        return self._iter_jsonl()
+
+    def _iter_jsonl(self):
+        records = []
+        for line in self._jsonl_lines():
+            line = line.strip()
+            if not line:
+                continue
+            records.append(json.loads(line))
+            if len(records) >= self.chunk_size:
+                yield self._records_to_chunk(records)
+                records = []
+        if records:
+            yield self._records_to_chunk(records)
+
+    def _jsonl_lines(self):
+        """Lines of the file, or only those starting inside ``byte_range``"""
+        if self.byte_range is None:
+            with open(self.path, 'rb') as f:
+                yield from f
+            return
+
+        start, end = self.byte_range
+        with open(self.path, 'rb') as f:
+            # A line straddling ``start`` belongs to the previous range
+            if start > 0:
+                f.seek(start - 1)
+                f.readline()
+            while f.tell() < end:
+                line = f.readline()
+                if not line:
+                    break
+                yield line
+
+    def _iter_parquet(self):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Reading Parquet history requires pyarrow") from e
+
+        parquet_file = pq.ParquetFile(self.path)
+        for batch in parquet_file.iter_batches(batch_size=self.chunk_size, row_groups=self.row_groups):
+            raw_columns = {name: batch.column(name).to_numpy(zero_copy_only=False)
+                           for name in batch.schema.names}
+            yield self._finish_chunk(self.processor.process_columns(raw_columns), raw_columns)
+
+    def _records_to_chunk(self, records: List[Dict[str, Any]]):
+        applications = [record.get('application', record) for record in records]
+        columns = self.processor.process_batch(applications)
+        flat_fields = [self.label_field] if self.label_field else []
+        raw_columns = {
+            field: [record.get(field) for record in records] for field in flat_fields + self.extra_fields
+        }
+        return self._finish_chunk(columns, raw_columns)
+
+    def _finish_chunk(self, columns: Dict[str, np.ndarray], raw_columns: Dict[str, Any]):
+        """Attach extra passthrough fields and extract the label column"""
+        for field in self.extra_fields:
+            if field in raw_columns:
+                columns[field] = np.asarray(raw_columns[field])
+
+        labels = None
+        if self.label_field and self.label_field in raw_columns:
+            labels = np.array([np.nan if value is None else float(value)
+                               for value in raw_columns[self.label_field]])
+        return columns, labels
+
+
+def split_byte_ranges(path: str, n_parts: int) -> List[Tuple[int, int]]:
+    """Split a JSONL file into contiguous byte ranges for parallel readers"""
+    size = os.path.getsize(path)
+    bounds = np.linspace(0, size, max(n_parts, 1) + 1).astype(np.int64)
+    return [(int(start), int(end)) for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+
+
+def split_row_groups(path: str, n_parts: int) -> List[List[int]]:
+    """Split a Parquet file's row groups into contiguous runs for parallel readers"""
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Reading Parquet history requires pyarrow") from e
+
+    n_groups = pq.ParquetFile(path).num_row_groups
+    return [part.tolist() for part in np.array_split(np.arange(n_groups), max(n_parts, 1)) if len(part)]
+
+
+class OutcomeStream(HistoryReader):
+    """Follows newly arriving outcome records as mini-batches
+
+    The source is either a JSONL file that other processes append to (read
+    like ``tail -f``) or a ``queue.Queue`` of records standing in for a
+    message queue. Iterating yields ``(columns, labels, offset)`` once
+    ``batch_size`` records have arrived or the source has been idle for
+    ``poll_interval`` seconds. ``offset`` is the byte offset after the last
+    complete line (or the number of records taken from the queue), so a
+    consumer can checkpoint it and resume without replaying or skipping
+    records. Iteration ends after ``idle_timeout`` idle seconds (never when
+    ``None``) or once ``stop()`` is called.
+    """
+
+    def __init__(self, source: Union[str, 'queue.Queue'], batch_size: int = 1000,
+                 label_field: Optional[str] = 'defaulted', offset: int = 0,
+                 poll_interval: float = 1.0, idle_timeout: Optional[float] = None,
+                 extra_fields: Optional[List[str]] = None):
+        super().__init__(source if isinstance(source, str) else '<queue>', batch_size, label_field, extra_fields)
+        self.source = source
+        self.offset = offset
+        self.poll_interval = poll_interval
+        self.idle_timeout = idle_timeout
+        self._stopped = threading.Event()
+
+    @staticmethod
+    def source_key(source: Union[str, 'queue.Queue']) -> str:
+        """Name under which a source's offset is checkpointed
+
+        File offsets are bytes and queue offsets are record counts, so each
+        source keeps its own offset.
+        """
+        return f"file:{os.path.abspath(source)}" if isinstance(source, str) else 'queue'
+
+    def stop(self) -> None:
+        """End iteration after the current batch"""
+        self._stopped.set()
+
+    def __iter__(self) -> Iterator[Tuple[Dict[str, np.ndarray], Optional[np.ndarray], int]]:
+        records: List[Dict[str, Any]] = []
+        idle_since = time.monotonic()
+        for record in self._records():
+            if record is not None:
+                records.append(record)
+                idle_since = time.monotonic()
+            if records and (len(records) >= self.chunk_size or record is None):
+                columns, labels = self._records_to_chunk(records)
+                records = []
+                yield columns, labels, self.offset
+                # A busy source never goes idle, so honour stop() between batches too
+                if self._stopped.is_set():
+                    return
+            if record is None and (self._stopped.is_set() or (
+                    self.idle_timeout is not None and time.monotonic() - idle_since >= self.idle_timeout)):
+                return
+
+    def _records(self) -> Iterator[Optional[Dict[str, Any]]]:
+        """Records as they arrive, with None marking each idle poll"""
+        if isinstance(self.source, str):
+            return self._tail_records()
+        return self._queue_records()
+
+    def _tail_records(self):
+        while not os.path.exists(self.source):
+            yield None
+            time.sleep(self.poll_interval)
+
+        with open(self.source, 'rb') as f:
+            f.seek(self.offset)
+            while True:
+                line = f.readline()
+                if line.endswith(b'\n'):
+                    self.offset += len(line)
+                    if line.strip():
+                        yield json.loads(line)
+                    continue
+                # No complete line yet: rewind past any partial write and wait
+                f.seek(self.offset)
+                yield None
+                if self._stopped.is_set():
+                    return
+                time.sleep(self.poll_interval)
+
+    def _queue_records(self):
+        while True:
+            try:
+                record = self.source.get(timeout=self.poll_interval)
+            except queue.Empty:
+                yield None
+                continue
+            self.offset += 1
+            yield record
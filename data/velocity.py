@@ -0,0 +1,177 @@
+"""Velocity checks: bursts of applications sharing a location or financial profile"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+@dataclass
+class VelocityRule:
+    """Flag when more than ``threshold`` applications share ``fields`` within ``window_seconds``
+
+    High-cardinality keys (e.g. a full financial profile) are counted in a
+    count-min sketch instead of one ring per key.
+    """
+    name: str
+    fields: Tuple[str, ...]
+    window_seconds: float
+    threshold: int
+    sketch: bool = False
+
+
+@dataclass
+class VelocityFlag:
+    """A rule an application tripped, with the windowed count that tripped it"""
+    rule: str
+    key: str
+    count: int
+    threshold: int
+    window_seconds: float
+
+    def __str__(self) -> str:
+        return (f"{self.count} applications with the same {self.rule} ({self.key}) "
+                f"in {self.window_seconds / 60:.0f} min (limit {self.threshold})")
+
+
+class SlidingWindowCounter:
+    """Per-key counts over a sliding window of ``n_buckets`` time buckets
+
+    Each key owns a small ring of bucket counts and the index of the bucket
+    it last wrote; an update clears the buckets skipped since then (at most
+    ``n_buckets``) and bumps the current one, so updates and reads are O(1)
+    in the number of keys and events. At most ``max_keys`` keys are kept,
+    evicting the least recently seen.
+    """
+
+    def __init__(self, window_seconds: float, n_buckets: int = 10, max_keys: int = 100000):
+        self.bucket_seconds = window_seconds / n_buckets
+        self.n_buckets = n_buckets
+        self.max_keys = max_keys
+        self._rings: 'OrderedDict[str, Tuple[List[int], int]]' = OrderedDict()
+
+    def add(self, key: str, timestamp: float) -> int:
+        """Count one event for ``key`` and return the key's count over the window"""
+        bucket = int(timestamp // self.bucket_seconds)
+        ring, last = self._rings.pop(key, (None, bucket))
+        if ring is None or bucket - last >= self.n_buckets:
+            ring = [0] * self.n_buckets
+        else:
+            for skipped in range(last + 1, bucket + 1):
+                ring[skipped % self.n_buckets] = 0
+        bucket = max(bucket, last)
+        ring[bucket % self.n_buckets] += 1
+
+        self._rings[key] = (ring, bucket)
+        if len(self._rings) > self.max_keys:
+            self._rings.popitem(last=False)
+        return sum(ring)
+
+    def __len__(self) -> int:
+        return len(self._rings)
+
+
+class SlidingCountMinSketch:
+    """Count-min sketch over a sliding window of ``n_buckets`` time buckets
+
+    Memory is fixed at ``n_buckets * depth * width`` counters whatever the
+    number of distinct keys. Counts are never underestimated; with ``e``
+    events in the window, an estimate exceeds the true count by more than
+    ``e * 2.72 / width`` with probability below ``exp(-depth)``. Moving
+    into a new bucket clears that bucket's slice of the table.
+    """
+
+    def __init__(self, window_seconds: float, n_buckets: int = 10, width: int = 4096, depth: int = 4):
+        self.bucket_seconds = window_seconds / n_buckets
+        self.n_buckets = n_buckets
+        self.width = width
+        self.depth = depth
+        self.table = np.zeros((n_buckets, depth, width), dtype=np.int32)
+        self._bucket: Optional[int] = None
+        self._rows = np.arange(depth)
+
+    def _columns(self, key: str) -> np.ndarray:
+        """One column per row from two 64-bit halves of a keyed hash (double hashing)"""
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return np.array([(first + row * second) % self.width for row in range(self.depth)])
+
+    def _advance(self, timestamp: float) -> int:
+        bucket = int(timestamp // self.bucket_seconds)
+        if self._bucket is None or bucket - self._bucket >= self.n_buckets:
+            self.table[:] = 0
+        elif bucket > self._bucket:
+            for skipped in range(self._bucket + 1, bucket + 1):
+                self.table[skipped % self.n_buckets] = 0
+        self._bucket = bucket if self._bucket is None else max(bucket, self._bucket)
+        return self._bucket % self.n_buckets
+
+    def add(self, key: str, timestamp: float) -> int:
+        """Count one event for ``key`` and return its estimated count over the window"""
+        slot = self._advance(timestamp)
+        columns = self._columns(key)
+        self.table[slot, self._rows, columns] += 1
+        return int(self.table[:, self._rows, columns].sum(axis=0).min())
+
+
+DEFAULT_VELOCITY_RULES = [
+    VelocityRule('ZIP code', ('zip_code',), window_seconds=600, threshold=5),
+    VelocityRule('city', ('state', 'city'), window_seconds=600, threshold=20),
+    VelocityRule('financial profile', ('annual_income', 'existing_debts', 'monthly_expenses', 'loan_amount'),
+                 window_seconds=3600, threshold=3, sketch=True),
+]
+
+
+def row_values(columns: Dict[str, np.ndarray], row: int = 0) -> Dict[str, Any]:
+    """Field values of one row of DataProcessor columns"""
+    return {field: values[row] for field, values in columns.items() if np.ndim(values) == 1}
+
+
+class VelocityChecker:
+    """Counts each application against every velocity rule and flags bursts
+
+    ``check`` records the application and returns the rules whose windowed
+    count now exceeds the threshold. Each rule costs one ring update or one
+    sketch update, so a check is O(1) per application. Rows missing any of
+    a rule's fields are not counted for that rule. Thread-safe.
+    """
+
+    def __init__(self, rules: Optional[Sequence[VelocityRule]] = None, n_buckets: int = 10,
+                 max_keys: int = 100000, sketch_width: int = 4096, sketch_depth: int = 4,
+                 clock: Callable[[], float] = time.time):
+        self.rules = list(DEFAULT_VELOCITY_RULES if rules is None else rules)
+        self.clock = clock
+        self._counters = {
+            rule.name: SlidingCountMinSketch(rule.window_seconds, n_buckets, sketch_width, sketch_depth)
+            if rule.sketch else SlidingWindowCounter(rule.window_seconds, n_buckets, max_keys)
+            for rule in self.rules
+        }
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def rule_key(rule: VelocityRule, values: Mapping[str, Any]) -> Optional[str]:
+        """Key of an application under a rule, or None if a field is missing"""
+        parts = []
+        for field in rule.fields:
+            value = values.get(field)
+            if value is None or value == '' or (isinstance(value, float) and np.isnan(value)):
+                return None
+            parts.append(f"{float(value):.2f}" if isinstance(value, (int, float, np.number)) else str(value))
+        return '|'.join(parts)
+
+    def check(self, values: Mapping[str, Any], timestamp: Optional[float] = None) -> List[VelocityFlag]:
+        """Record one application (flat field values) and return the rules it trips"""
+        timestamp = self.clock() if timestamp is None else timestamp
+        keys = [(rule, self.rule_key(rule, values)) for rule in self.rules]
+        flags = []
+        with self._lock:
+            for rule, key in keys:
+                if key is None:
+                    continue
+                count = self._counters[rule.name].add(key, timestamp)
+                if count > rule.threshold:
+                    flags.append(VelocityFlag(rule.name, key, count, rule.threshold, rule.window_seconds))
+        return flags
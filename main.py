@@ -19,10 +19,19 @@ try:
     from models.credit_scorer import CreditScorer
     from models.geolocation_analyzer import GeolocationAnalyzer
     from models.loan_recommender import LoanRecommender
+    from models.batch_scorer import BatchScorer
+    from models.expected_loss import ExpectedLossModel
+    from models.model_registry import ModelRegistry
+    from models.shadow import ShadowScorer
+    from models.reason_codes import ReasonCodeEngine
+    from models.counterfactual import CounterfactualSearch
+    from models.sensitivity import SensitivityAnalyzer, MAX_SENSITIVITY_FIELDS
+    from models.exposure import ExposureTracker
     from data.data_processor import DataProcessor
     from data.validators import InputValidator
+    from data.velocity import VelocityChecker, row_values
     from utils.helpers import format_currency, calculate_monthly_payment
-    from config import APP_CONFIG, RISK_CATEGORIES, loan_config
+    from config import APP_CONFIG, RISK_CATEGORIES, loan_config, shadow_config, exposure_config, velocity_config
     MODULES_LOADED = True
 except ImportError as e:
     st.error(f"Import Error: {str(e)}")
@@ -55,13 +64,15 @@ def main():
     st.sidebar.title("Navigation")
     page = st.sidebar.radio(
         "Go to",
-        ["🏠 Home", "📝 New Application", "📊 Analytics", "ℹ️ About"]
+        ["🏠 Home", "📝 New Application", "🔍 What-If", "📊 Analytics", "ℹ️ About"]
     )
 
     if page == "🏠 Home":
         show_home_page()
     elif page == "📝 New Application":
         show_application_form()
+    elif page == "🔍 What-If":
+        show_what_if()
     elif page == "📊 Analytics":
         show_analytics()
     elif page == "ℹ️ About":
@@ -195,6 +206,59 @@ def show_application_form():
 
             process_application(application_data)
 
+@st.cache_resource
+def get_shadow_scorer():
+    """Challenger shadow scorer shared across sessions, or None when disabled"""
+    if not shadow_config.enabled or not os.path.isdir(shadow_config.registry_path):
+        return None
+    registry = ModelRegistry(shadow_config.registry_path)
+    if registry.latest_version() is None:
+        return None
+
+    challenger = RiskAnalyzer()
+    if shadow_config.model_version is None:
+        challenger.follow_registry(registry)
+    else:
+        challenger.load_model(registry, shadow_config.model_version)
+    return ShadowScorer(
+        challenger,
+        shadow_config.log_path,
+        sample_rate=shadow_config.sample_rate,
+        max_workers=shadow_config.max_workers,
+        max_pending=shadow_config.max_pending,
+        risk_tolerance=shadow_config.risk_tolerance
+    )
+
+@st.cache_resource
+def get_exposure_tracker():
+    """Portfolio exposure shared across sessions, rebuilt from history at startup, or None when disabled"""
+    if not exposure_config.enabled:
+        return None
+    limits = dict(
+        max_share=exposure_config.max_share,
+        amount_limits=exposure_config.amount_limits,
+        min_portfolio_amount=exposure_config.min_portfolio_amount,
+        history_path=exposure_config.history_path
+    )
+    history_path = exposure_config.history_path
+    if history_path and os.path.exists(history_path):
+        return ExposureTracker.from_history(history_path, approved_field=exposure_config.approved_field,
+                                            amount_field=exposure_config.amount_field, **limits)
+    return ExposureTracker(**limits)
+
+@st.cache_resource
+def get_velocity_checker():
+    """Velocity counters shared across sessions, or None when disabled"""
+    if not velocity_config.enabled:
+        return None
+    return VelocityChecker(
+        rules=velocity_config.rules,
+        n_buckets=velocity_config.n_buckets,
+        max_keys=velocity_config.max_keys,
+        sketch_width=velocity_config.sketch_width,
+        sketch_depth=velocity_config.sketch_depth
+    )
+
 def process_application(data):
     """Process loan application"""
     st.success("✅ Application received! Processing...")
@@ -212,9 +276,43 @@ def process_application(data):
             credit_analysis = credit_scorer.analyze_creditworthiness(data)
             geo_risk = geo_analyzer.assess_location_risk(data['geolocation'])
             recommendation = loan_recommender.recommend_loan_terms(data, risk_score)
+            expected_loss = ExpectedLossModel().calculate_expected_loss(data, risk_score, recommendation)
 
             # Make decision
-            approved = risk_score < 0.6 and credit_analysis.score > 600
+            approved = bool(BatchScorer.approval_decision(risk_score, credit_analysis.score))
+            # The challenger is compared against the model decision, before portfolio limits
+            rule_approved = approved
+            columns = DataProcessor().process_batch([data])
+
+            # Bursts of similar applications are flagged for review, not declined
+            velocity_checker = get_velocity_checker()
+            velocity_flags = velocity_checker.check(row_values(columns)) if velocity_checker is not None else []
+
+            # Portfolio concentration limits; an approval takes up room only if it fits
+            limit_breaches = []
+            exposure_tracker = get_exposure_tracker()
+            if approved and exposure_tracker is not None:
+                keys = ExposureTracker.keys(columns['state'][0], columns['loan_purpose'][0], risk_score)
+                approved, limit_breaches = exposure_tracker.try_approve(keys, recommendation.recommended_amount,
+                                                                        application=data)
+
+            # Principal reasons for a decline, for the adverse-action notice
+            reasons = [f"Portfolio concentration limit reached ({breach})" for breach in limit_breaches]
+            codes = None
+            counterfactual = None
+            if not approved and not limit_breaches:
+                factor_names, contributions = risk_analyzer.calculate_contributions(columns)
+                codes = ReasonCodeEngine().generate(factor_names, contributions)
+                reasons = ReasonCodeEngine.render(codes, columns)[0]
+
+                # Smallest change to the request that would be approved
+                search = CounterfactualSearch(BatchScorer(risk_analyzer=risk_analyzer, credit_scorer=credit_scorer))
+                counterfactual = search.search(columns).get(0)
+
+            # Challenger scores in the background; never delays the decision
+            shadow_scorer = get_shadow_scorer()
+            if shadow_scorer is not None:
+                shadow_scorer.submit(data, risk_score, credit_analysis.score, rule_approved)
 
             # Store result
             result = {
@@ -223,17 +321,23 @@ def process_application(data):
                 'risk_score': risk_score,
                 'credit_score': credit_analysis.score,
                 'approved': approved,
-                'recommended_amount': recommendation.recommended_amount
+                'recommended_amount': recommendation.recommended_amount,
+                'expected_loss': expected_loss.expected_loss,
+                'reason_codes': codes[0].tolist() if codes is not None else [],
+                'velocity_flags': [flag.rule for flag in velocity_flags]
             }
             st.session_state.applications.append(result)
+            st.session_state.last_application = data
 
             # Display results
-            display_results(risk_score, credit_analysis, recommendation, approved)
+            display_results(risk_score, credit_analysis, recommendation, approved, expected_loss, reasons,
+                            counterfactual, velocity_flags)
 
     except Exception as e:
         st.error(f"Error processing application: {str(e)}")
 
-def display_results(risk_score, credit_analysis, recommendation, approved):
+def display_results(risk_score, credit_analysis, recommendation, approved, expected_loss, reasons=None,
+                    counterfactual=None, velocity_flags=None):
     """Display application results"""
     st.markdown("---")
     st.header("📋 Application Results")
@@ -243,6 +347,13 @@ def display_results(risk_score, credit_analysis, recommendation, approved):
         st.success("🎉 **LOAN APPROVED!**")
     else:
         st.error("❌ **LOAN REJECTED**")
+        if reasons:
+            st.markdown("**Principal reasons:**\n" + "\n".join(f"- {reason}" for reason in reasons))
+        if counterfactual is not None:
+            st.info("**What would change the decision:** " + describe_counterfactual(counterfactual))
+    if velocity_flags:
+        st.warning("⚠️ **Velocity check — refer for review:**\n" +
+                   "\n".join(f"- {flag}" for flag in velocity_flags))
 
     # Key metrics
     col1, col2, col3, col4 = st.columns(4)
@@ -266,6 +377,87 @@ def display_results(risk_score, credit_analysis, recommendation, approved):
         st.write("**Monthly Payment:**", format_currency(recommendation.monthly_payment))
         st.write("**Total Cost:**", format_currency(recommendation.total_cost))
         st.write("**Approval Probability:**", f"{recommendation.approval_probability:.1%}")
+        st.write("**Expected Loss:**", format_currency(expected_loss.expected_loss),
+                 f"(LGD {expected_loss.loss_given_default:.0%})")
+
+def describe_counterfactual(counterfactual):
+    """One-line summary of the changes in a counterfactual"""
+    labels = {
+        'loan_amount': "borrow {new} instead of {old}",
+        'loan_term': "extend the term from {old} to {new} months",
+        'collateral_value': "offer {new} of collateral instead of {old}",
+        'existing_debts': "reduce existing debts from {old} to {new}"
+    }
+    parts = []
+    for field, (old, new) in counterfactual.changes.items():
+        if field == 'loan_term':
+            parts.append(labels[field].format(old=int(old), new=int(new)))
+        else:
+            parts.append(labels[field].format(old=format_currency(old), new=format_currency(new)))
+    summary = "; ".join(parts)
+    return summary[:1].upper() + summary[1:]
+
+# Fields a loan officer can vary on the What-If page: (field, min, max, default steps)
+WHAT_IF_FIELDS = {
+    "Annual Income": ('annual_income', 0, 300000, 50),
+    "Existing Debts": ('existing_debts', 0, 200000, 50),
+    "Credit Score": ('credit_score', 300, 850, 10),
+    "Loan Amount": ('loan_amount', 1000, 500000, 50),
+    "Monthly Expenses": ('monthly_expenses', 0, 20000, 20)
+}
+
+# Heatmap outputs: (result field, color scale with green for the applicant-friendly end)
+WHAT_IF_OUTPUTS = {
+    "Approved": ('approved', 'RdYlGn'),
+    "Risk Score": ('risk_score', 'RdYlGn_r'),
+    "Interest Rate": ('interest_rate', 'RdYlGn_r'),
+    "Monthly Payment": ('monthly_payment', 'RdYlGn_r'),
+    "Approval Probability": ('approval_probability', 'RdYlGn')
+}
+
+def show_what_if():
+    """Sensitivity of the last application's decision and rate to its inputs"""
+    st.header("🔍 What-If Analysis")
+
+    application = st.session_state.get('last_application')
+    if application is None:
+        st.info("Submit an application first; its inputs are the starting point for the what-if grid.")
+        return
+
+    labels = st.multiselect("Vary", list(WHAT_IF_FIELDS), default=["Annual Income", "Existing Debts"],
+                            max_selections=MAX_SENSITIVITY_FIELDS)
+    if not labels:
+        return
+    output_label = st.selectbox("Show", list(WHAT_IF_OUTPUTS))
+
+    ranges = {}
+    for label in labels:
+        field, low, high, steps = WHAT_IF_FIELDS[label]
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            start, stop = st.slider(label, low, high, (low, high))
+        with col2:
+            count = st.number_input(f"{label} steps", min_value=2, max_value=100, value=steps)
+        ranges[field] = np.linspace(start, stop, int(count))
+
+    output, color_scale = WHAT_IF_OUTPUTS[output_label]
+    result = SensitivityAnalyzer().analyze(application, ranges)
+    grid = result.outputs[output].astype(float)
+
+    if len(labels) == 1:
+        fig = px.line(x=result.values[0], y=grid, labels={'x': labels[0], 'y': output_label})
+        st.plotly_chart(fig, use_container_width=True)
+        return
+
+    if len(labels) == 3:
+        index = st.select_slider(f"{labels[2]} shown", options=list(range(result.shape[2])),
+                                 format_func=lambda i: f"{result.values[2][i]:,.0f}")
+        grid = grid[:, :, index]
+
+    fig = px.imshow(grid, x=result.values[1], y=result.values[0], origin='lower', aspect='auto',
+                    labels={'x': labels[1], 'y': labels[0], 'color': output_label},
+                    color_continuous_scale=color_scale)
+    st.plotly_chart(fig, use_container_width=True)
 
 def show_analytics():
     """Display analytics dashboard"""
@@ -1,7 +1,17 @@
-"""Models module for loan evaluation system"""
+"""Models module for loan evaluation system
+
+Training, tuning and segmentation jobs (``models.training``,
+``models.scorecard``, ``models.calibration``, ``models.tuning``,
+``models.segmentation``) pull in scikit-learn and are imported from their
+own modules, so scoring processes never load them.
+"""
 from .risk_analyzer import RiskAnalyzer
 from .credit_scorer import CreditScorer
 from .geolocation_analyzer import GeolocationAnalyzer
 from .loan_recommender import LoanRecommender
+from .batch_scorer import BatchScorer
+from .stress_testing import StressTestEngine, Scenario
+from .model_registry import ModelRegistry
 
-__all__ = ['RiskAnalyzer', 'CreditScorer', 'GeolocationAnalyzer', 'LoanRecommender']
+__all__ = ['RiskAnalyzer', 'CreditScorer', 'GeolocationAnalyzer', 'LoanRecommender',
+           'BatchScorer', 'StressTestEngine', 'Scenario', 'ModelRegistry']
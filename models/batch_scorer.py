@@ -0,0 +1,71 @@
+"""Vectorized batch scoring of loan applications"""
+from typing import Dict, Optional
+
+import numpy as np
+
+from config import risk_config, credit_config
+from .risk_analyzer import RiskAnalyzer
+from .credit_scorer import CreditScorer
+from .geolocation_analyzer import GeolocationAnalyzer
+from .loan_recommender import LoanRecommender
+from .expected_loss import ExpectedLossModel
+from .drift import DriftMonitor
+from .features import build_feature_matrix
+from .risk_model import SegmentModel
+
+
+class BatchScorer:
+    """Scores columns from DataProcessor.process_batch through all analyzers at once"""
+
+    def __init__(self, risk_analyzer: Optional[RiskAnalyzer] = None,
+                 credit_scorer: Optional[CreditScorer] = None,
+                 geo_analyzer: Optional[GeolocationAnalyzer] = None,
+                 loan_recommender: Optional[LoanRecommender] = None,
+                 expected_loss_model: Optional[ExpectedLossModel] = None,
+                 approval_threshold: Optional[float] = None,
+                 min_approval_score: Optional[float] = None,
+                 drift_monitor: Optional[DriftMonitor] = None,
+                 segment_model: Optional[SegmentModel] = None):
+        self.risk_analyzer = risk_analyzer or RiskAnalyzer()
+        self.credit_scorer = credit_scorer or CreditScorer()
+        self.geo_analyzer = geo_analyzer or GeolocationAnalyzer()
+        self.loan_recommender = loan_recommender or LoanRecommender()
+        self.expected_loss_model = expected_loss_model or ExpectedLossModel()
+        # Overrides of the configured approval rule (e.g. for a challenger engine)
+        self.approval_threshold = approval_threshold
+        self.min_approval_score = min_approval_score
+        self.drift_monitor = drift_monitor
+        self.segment_model = segment_model
+
+    def score(self, columns: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """Score a batch, returning one output column per result field"""
+        if self.drift_monitor is not None:
+            self.drift_monitor.update(columns)
+        risk_scores = self.risk_analyzer.calculate_risk_scores(columns)
+        credit_scores = self.credit_scorer.calculate_credit_scores(columns)
+        location_risk = self.geo_analyzer.assess_location_risk_batch(columns['state'])
+        recommendation = self.loan_recommender.recommend_batch(columns, risk_scores)
+
+        results = {
+            'risk_score': risk_scores,
+            'credit_score': credit_scores,
+            'location_risk': location_risk,
+            'approved': self.approval_decision(risk_scores, credit_scores,
+                                               self.approval_threshold, self.min_approval_score)
+        }
+        results.update(recommendation)
+        results.update(self.expected_loss_model.calculate_batch(columns, results))
+        if self.segment_model is not None:
+            results['segment'] = self.segment_model.assign(build_feature_matrix(columns))
+        return results
+
+    @staticmethod
+    def approval_decision(risk_scores, credit_scores, approval_threshold: Optional[float] = None,
+                          min_approval_score: Optional[float] = None):
+        """Approval rule shared by the interactive and batch paths"""
+        if approval_threshold is None:
+            approval_threshold = risk_config.approval_threshold
+        if min_approval_score is None:
+            min_approval_score = credit_config.min_approval_score
+        return (np.asarray(risk_scores) < approval_threshold) & \
+            (np.asarray(credit_scores) > min_approval_score)
@@ -0,0 +1,86 @@
+"""Offline calibration of approval probabilities against recorded outcomes"""
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+from sklearn.isotonic import IsotonicRegression
+from sklearn.linear_model import LogisticRegression
+
+from data.history import HistoryReader
+from utils.helpers import column_or_default
+from .model_registry import ModelRegistry
+from .risk_analyzer import RiskAnalyzer
+from .loan_recommender import LoanRecommender
+from .risk_model import CalibrationTable
+
+
+class ApprovalCalibrator:
+    """Fits the approval blend to historical decisions or outcomes
+
+    Each labeled application is scored with the serving risk analyzer and
+    the uncalibrated ``LoanRecommender.approval_blend``. Isotonic regression
+    or Platt scaling maps the blend to the observed rate of the label (1 for
+    approved or repaid), and the fit is sampled on a dense grid so serving
+    only needs ``np.interp``.
+    """
+
+    METHODS = ('isotonic', 'platt')
+
+    def __init__(self, method: str = 'isotonic', grid_size: int = 1025, chunk_size: int = 50000,
+                 label_field: str = 'approved', risk_analyzer: Optional[RiskAnalyzer] = None):
+        if method not in self.METHODS:
+            raise ValueError(f"Unknown calibration method: {method}")
+        self.method = method
+        self.grid_size = grid_size
+        self.chunk_size = chunk_size
+        self.label_field = label_field
+        self.risk_analyzer = risk_analyzer or RiskAnalyzer()
+        self.calibration_summary: Dict[str, Any] = {}
+
+    def fit(self, path: str) -> CalibrationTable:
+        """Fit a calibration table from a JSONL or Parquet history file"""
+        blend, labels = self._blend_scores(path)
+        if len(labels) == 0:
+            raise ValueError(f"No labeled applications in {path}")
+
+        grid = np.linspace(blend.min(), blend.max(), self.grid_size)
+        if self.method == 'isotonic':
+            regression = IsotonicRegression(y_min=0.0, y_max=1.0, out_of_bounds='clip').fit(blend, labels)
+            values = regression.predict(grid)
+        else:
+            regression = LogisticRegression().fit(blend[:, np.newaxis], labels)
+            values = regression.predict_proba(grid[:, np.newaxis])[:, 1]
+        table = CalibrationTable(grid, values)
+
+        self.calibration_summary = {
+            'method': self.method,
+            'n_samples': len(labels),
+            'label_field': self.label_field,
+            'label_rate': float(labels.mean()),
+            'brier_before': float(np.mean(np.square(np.clip(blend, 0, 1) - labels))),
+            'brier_after': float(np.mean(np.square(table.apply(blend) - labels))),
+            'risk_model_version': self.risk_analyzer.model_version
+        }
+        return table
+
+    def fit_and_register(self, path: str, registry: ModelRegistry,
+                         metadata: Optional[Dict[str, Any]] = None) -> str:
+        """Fit and save the table as a new registry version"""
+        table = self.fit(path)
+        metadata = dict(metadata or {})
+        metadata.update({'training_data': path, **self.calibration_summary})
+        return registry.save(table, metadata)
+
+    def _blend_scores(self, path: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Uncalibrated approval blend and label of every labeled application"""
+        blends, labels = [], []
+        for columns, chunk_labels in HistoryReader(path, self.chunk_size, self.label_field):
+            if chunk_labels is None:
+                continue
+            labeled = ~np.isnan(chunk_labels)
+            risk_scores = self.risk_analyzer.calculate_risk_scores(columns)
+            credit_scores = column_or_default(columns, 'credit_score', 600)
+            blends.append(LoanRecommender.approval_blend(risk_scores, credit_scores)[labeled])
+            labels.append(chunk_labels[labeled])
+        if not blends:
+            return np.empty(0), np.empty(0)
+        return np.concatenate(blends), np.concatenate(labels)
@@ -0,0 +1,154 @@
+"""Counterfactual search: the smallest change that gets a declined application approved"""
+import itertools
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from config import loan_config
+from utils.helpers import column_or_default
+from .batch_scorer import BatchScorer
+
+# Grid of changes per field, mildest first:
+#   loan_amount     - multiplier of the requested amount
+#   loan_term       - months added to the requested term
+#   collateral_value - collateral added, as a share of the requested amount
+#   existing_debts  - multiplier of the current debts
+DEFAULT_CHANGE_GRID = {
+    'loan_amount': np.linspace(1.0, 0.3, 8),
+    'loan_term': np.array([0, 12, 24, 36, 60, 120]),
+    'collateral_value': np.array([0.0, 0.25, 0.5, 0.75, 1.0]),
+    'existing_debts': np.linspace(1.0, 0.0, 11),
+}
+
+# Values assumed for missing fields, as in build_feature_matrix
+FIELD_DEFAULTS = {'loan_amount': 25000, 'loan_term': 60, 'collateral_value': 0, 'existing_debts': 0}
+
+
+@dataclass
+class Counterfactual:
+    """Cheapest approved variant of one declined application
+
+    ``changes`` maps each changed field to its (current, proposed) value;
+    ``cost`` is the weighted sum of relative changes.
+    """
+    index: int
+    changes: Dict[str, Tuple[float, float]]
+    cost: float
+    risk_score: float
+    credit_score: float
+
+
+class CounterfactualSearch:
+    """Grid search for the minimal change that flips a decline to an approval
+
+    Every combination of grid steps is one candidate. Only the changed
+    fields get a leading candidate dimension, so a group of applicants is
+    scored by the batch scorer's analyzers in one broadcasted pass of shape
+    (candidates, applicants); groups are sized to keep that under
+    ``max_evaluations``. The decision uses the scorer's approval rule.
+    """
+
+    def __init__(self, scorer: Optional[BatchScorer] = None,
+                 grid: Optional[Dict[str, np.ndarray]] = None,
+                 weights: Optional[Dict[str, float]] = None,
+                 max_evaluations: int = 1000000):
+        self.scorer = scorer or BatchScorer()
+        self.grid = {field: np.asarray(steps, dtype=np.float64)
+                     for field, steps in (DEFAULT_CHANGE_GRID if grid is None else grid).items()}
+        unknown = set(self.grid) - set(DEFAULT_CHANGE_GRID)
+        if unknown:
+            raise ValueError(f"Unsupported counterfactual fields: {sorted(unknown)}")
+        self.weights = {field: 1.0 for field in self.grid}
+        self.weights.update(weights or {})
+        self.max_evaluations = max_evaluations
+
+        # Candidates ordered by how many fields they change, so among equal
+        # costs the first (simplest) one wins the argmin
+        steps = list(itertools.product(*(range(len(values)) for values in self.grid.values())))
+        steps.sort(key=lambda step: sum(index > 0 for index in step))
+        self._steps = np.array(steps, dtype=np.intp).reshape(len(steps), len(self.grid))
+
+    @property
+    def n_candidates(self) -> int:
+        return len(self._steps)
+
+    @property
+    def max_group_size(self) -> int:
+        """Applicants per broadcasted pass"""
+        return max(1, self.max_evaluations // self.n_candidates)
+
+    def decide(self, columns: Dict[str, np.ndarray]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Risk scores, credit scores and approval decisions (broadcasting over leading dimensions)"""
+        risk_scores = self.scorer.risk_analyzer.calculate_risk_scores(columns)
+        credit_scores = self.scorer.credit_scorer.calculate_credit_scores(columns)
+        approved = BatchScorer.approval_decision(risk_scores, credit_scores, self.scorer.approval_threshold,
+                                                 self.scorer.min_approval_score)
+        return risk_scores, credit_scores, approved
+
+    def candidate_columns(self, columns: Dict[str, np.ndarray]) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+        """Columns with a leading candidate dimension on the changed fields, and each candidate's cost"""
+        loan_amount, loan_term, collateral, debts = (
+            column_or_default(columns, field, default) for field, default in FIELD_DEFAULTS.items()
+        )
+
+        candidates = dict(columns)
+        cost = np.zeros((self.n_candidates, len(loan_amount)))
+        for position, (field, values) in enumerate(self.grid.items()):
+            step = values[self._steps[:, position]][:, np.newaxis]
+            if field == 'loan_amount':
+                proposed = np.maximum(loan_amount * step, np.minimum(loan_config.min_loan_amount, loan_amount))
+                change = 1.0 - proposed / np.where(loan_amount > 0, loan_amount, 1.0)
+            elif field == 'loan_term':
+                proposed = np.minimum(loan_term + step, np.maximum(loan_config.max_loan_term, loan_term))
+                change = (proposed - loan_term) / np.where(loan_term > 0, loan_term, 1.0)
+            elif field == 'collateral_value':
+                proposed = collateral + loan_amount * step
+                change = np.broadcast_to(step, proposed.shape)
+            else:
+                proposed = debts * step
+                change = np.where(debts > 0, 1.0 - step, 0.0)
+            candidates[field] = proposed
+            cost += self.weights[field] * change
+        return candidates, cost
+
+    def search(self, columns: Dict[str, np.ndarray]) -> Dict[int, Optional[Counterfactual]]:
+        """Cheapest approved variant per declined row (None if no grid point is approved)"""
+        _, _, approved = self.decide(columns)
+        declined = np.flatnonzero(~approved)
+        group_size = self.max_group_size
+
+        results: Dict[int, Optional[Counterfactual]] = {}
+        for start in range(0, len(declined), group_size):
+            rows = declined[start:start + group_size]
+            group = {field: np.asarray(values)[rows] for field, values in columns.items()}
+            candidates, cost = self.candidate_columns(group)
+            risk_scores, credit_scores, candidate_approved = self.decide(candidates)
+
+            # Broadcast scores that do not depend on the changed fields
+            shape = cost.shape
+            risk_scores = np.broadcast_to(risk_scores, shape)
+            credit_scores = np.broadcast_to(credit_scores, shape)
+            candidate_approved = np.broadcast_to(candidate_approved, shape)
+
+            best = np.argmin(np.where(candidate_approved, cost, np.inf), axis=0)
+            found = candidate_approved[best, np.arange(len(rows))]
+            for position, row in enumerate(rows):
+                if not found[position]:
+                    results[int(row)] = None
+                    continue
+                candidate = best[position]
+                changes = {}
+                for field in self.grid:
+                    current = float(column_or_default(group, field, FIELD_DEFAULTS[field])[position])
+                    proposed = float(np.broadcast_to(candidates[field], shape)[candidate, position])
+                    if not np.isclose(proposed, current):
+                        changes[field] = (current, proposed)
+                results[int(row)] = Counterfactual(
+                    index=int(row),
+                    changes=changes,
+                    cost=float(cost[candidate, position]),
+                    risk_score=float(risk_scores[candidate, position]),
+                    credit_score=float(credit_scores[candidate, position])
+                )
+        return results
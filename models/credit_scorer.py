@@ -2,6 +2,10 @@
 from typing import Dict, Any, List
 from dataclasses import dataclass
 
+import numpy as np
+
+from utils.helpers import column_or_default
+
 @dataclass
 class CreditAnalysis:
     """Credit analysis results"""
@@ -49,6 +53,21 @@ class CreditScorer:
         final_score = int(base_score + adjustments)
         return max(300, min(850, final_score))
 
+    def calculate_credit_scores(self, columns: Dict[str, np.ndarray]) -> np.ndarray:
+        """Vectorized credit scores for a batch of columns"""
+        base_score = column_or_default(columns, 'credit_score', 600)
+        defaults = column_or_default(columns, 'previous_defaults', 0)
+        history_length = column_or_default(columns, 'credit_history_length', 0)
+
+        # Payment history
+        adjustments = np.where(defaults == 0, 20, -30 * defaults)
+
+        # Credit history length
+        adjustments = adjustments + np.select([history_length >= 10, history_length >= 5], [15, 10], default=0)
+
+        final_scores = np.trunc(base_score + adjustments).astype(np.int64)
+        return np.clip(final_scores, 300, 850)
+
     def analyze_creditworthiness(self, application_data: Dict[str, Any]) -> CreditAnalysis:
         """Perform comprehensive credit analysis"""
         score = self.calculate_credit_score(application_data)
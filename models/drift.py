@@ -0,0 +1,160 @@
+"""Streaming feature drift monitoring against a reference population"""
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from data.history import HistoryReader
+from utils.constants import EMPLOYMENT_TYPES, LOAN_PURPOSES
+
+# Fixed bin edges per numeric field; values below the first edge or at and
+# above the last land in the outer bins, missing values in a bin of their own
+DEFAULT_NUMERIC_BINS = {
+    'credit_score': np.arange(300, 851, 25),
+    'annual_income': np.concatenate([[0], np.geomspace(10000, 1000000, 21)]),
+    'loan_amount': np.geomspace(1000, 500000, 19),
+    'existing_debts': np.concatenate([[0], np.geomspace(1000, 500000, 19)]),
+}
+
+# Known levels per categorical field; anything else is counted as 'other'
+DEFAULT_CATEGORICAL_LEVELS = {
+    'employment_status': EMPLOYMENT_TYPES,
+    'loan_purpose': LOAN_PURPOSES,
+}
+
+
+@dataclass
+class DriftStat:
+    """Drift of one field between the reference and current histograms"""
+    field: str
+    psi: float
+    ks: Optional[float]
+    n_reference: int
+    n_current: int
+
+    @property
+    def status(self) -> str:
+        """Conventional PSI bands: < 0.1 stable, < 0.25 moderate, otherwise significant"""
+        if self.psi < 0.1:
+            return 'stable'
+        if self.psi < 0.25:
+            return 'moderate'
+        return 'significant'
+
+
+class DriftMonitor:
+    """Fixed-bin histograms and category counters updated one batch at a time
+
+    Memory is set by the bin and level definitions alone, not by how many
+    applications are seen. Each update is one ``np.searchsorted`` plus
+    ``np.bincount`` per numeric field and one ``np.unique`` per categorical
+    field; only the final count addition happens under the lock.
+    """
+
+    def __init__(self, numeric_bins: Optional[Dict[str, np.ndarray]] = None,
+                 categorical_levels: Optional[Dict[str, List[str]]] = None):
+        numeric_bins = DEFAULT_NUMERIC_BINS if numeric_bins is None else numeric_bins
+        categorical_levels = DEFAULT_CATEGORICAL_LEVELS if categorical_levels is None else categorical_levels
+        self.numeric_bins = {field: np.asarray(edges, dtype=np.float64) for field, edges in numeric_bins.items()}
+        self.categorical_levels = {field: list(levels) for field, levels in categorical_levels.items()}
+        self._level_index = {field: {level: i for i, level in enumerate(levels)}
+                             for field, levels in self.categorical_levels.items()}
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Clear all counts (e.g. at the start of a monitoring window)"""
+        with self._lock:
+            self.counts = {field: np.zeros(len(edges) + 2, dtype=np.int64)
+                           for field, edges in self.numeric_bins.items()}
+            self.counts.update({field: np.zeros(len(levels) + 1, dtype=np.int64)
+                                for field, levels in self.categorical_levels.items()})
+
+    def update(self, columns: Dict[str, np.ndarray]) -> None:
+        """Add a batch of DataProcessor columns to the histograms"""
+        batch_counts = {}
+        for field, edges in self.numeric_bins.items():
+            if field not in columns:
+                continue
+            values = np.asarray(columns[field], dtype=np.float64).ravel()
+            bins = np.searchsorted(edges, values, side='right')
+            bins[np.isnan(values)] = len(edges) + 1
+            batch_counts[field] = np.bincount(bins, minlength=len(edges) + 2)
+
+        for field, levels in self.categorical_levels.items():
+            if field not in columns:
+                continue
+            uniques, inverse = np.unique(np.asarray(columns[field]).astype(str).ravel(), return_inverse=True)
+            index = self._level_index[field]
+            level_ids = np.array([index.get(value, len(levels)) for value in uniques], dtype=np.intp)
+            batch_counts[field] = np.bincount(level_ids[inverse], minlength=len(levels) + 1)
+
+        with self._lock:
+            for field, counts in batch_counts.items():
+                self.counts[field] += counts
+
+    def compare(self, reference: 'DriftMonitor') -> Dict[str, DriftStat]:
+        """PSI for every field and binned KS for numeric fields against a reference"""
+        with self._lock:
+            current_counts = {field: counts.copy() for field, counts in self.counts.items()}
+
+        stats = {}
+        for field, current in current_counts.items():
+            expected = reference.counts.get(field)
+            if expected is None or len(expected) != len(current) or current.sum() == 0:
+                continue
+            stats[field] = DriftStat(
+                field=field,
+                psi=self.population_stability_index(expected, current),
+                ks=self.binned_ks(expected[:-1], current[:-1]) if field in self.numeric_bins else None,
+                n_reference=int(expected.sum()),
+                n_current=int(current.sum())
+            )
+        return stats
+
+    @staticmethod
+    def population_stability_index(expected: np.ndarray, actual: np.ndarray, epsilon: float = 1e-4) -> float:
+        """PSI between two count vectors over the same bins"""
+        expected_share = np.maximum(expected / max(expected.sum(), 1), epsilon)
+        actual_share = np.maximum(actual / max(actual.sum(), 1), epsilon)
+        return float(np.sum((actual_share - expected_share) * np.log(actual_share / expected_share)))
+
+    @staticmethod
+    def binned_ks(expected: np.ndarray, actual: np.ndarray) -> float:
+        """Largest gap between the two empirical CDFs at the bin edges"""
+        expected_cdf = np.cumsum(expected) / max(expected.sum(), 1)
+        actual_cdf = np.cumsum(actual) / max(actual.sum(), 1)
+        return float(np.max(np.abs(expected_cdf - actual_cdf)))
+
+    @classmethod
+    def from_history(cls, path: str, chunk_size: int = 50000, **kwargs) -> 'DriftMonitor':
+        """Reference histograms of a training population file"""
+        monitor = cls(**kwargs)
+        for columns, _ in HistoryReader(path, chunk_size, label_field=None):
+            monitor.update(columns)
+        return monitor
+
+    def save(self, path: str) -> None:
+        """Save bin definitions and counts to an .npz file"""
+        arrays = {}
+        for field, edges in self.numeric_bins.items():
+            arrays[f'edges_{field}'] = edges
+        for field, levels in self.categorical_levels.items():
+            arrays[f'levels_{field}'] = np.array(levels)
+        for field, counts in self.counts.items():
+            arrays[f'counts_{field}'] = counts
+        np.savez(path, **arrays)
+
+    @classmethod
+    def load(cls, path: str) -> 'DriftMonitor':
+        """Load a monitor saved with save()"""
+        with np.load(path) as data:
+            numeric_bins = {name[len('edges_'):]: data[name] for name in data.files if name.startswith('edges_')}
+            categorical_levels = {name[len('levels_'):]: data[name].tolist()
+                                  for name in data.files if name.startswith('levels_')}
+            monitor = cls(numeric_bins, categorical_levels)
+            for name in data.files:
+                if name.startswith('counts_'):
+                    monitor.counts[name[len('counts_'):]] = data[name].astype(np.int64)
+        return monitor
@@ -0,0 +1,103 @@
+"""Expected loss (PD x LGD x EAD) estimation"""
+from dataclasses import dataclass
+from typing import Dict, Any
+
+import numpy as np
+
+from utils.constants import LOAN_PURPOSES, COLLATERAL_HAIRCUTS
+from utils.helpers import column_or_default
+
+
+@dataclass
+class ExpectedLoss:
+    """Expected loss components for one application"""
+    probability_of_default: float
+    loss_given_default: float
+    exposure_at_default: float
+    expected_loss: float
+
+
+class ExpectedLossModel:
+    """Collateral-aware expected loss for single applications and batches
+
+    PD is the risk score (floored), EAD is the average amortized balance
+    over the horizon, and LGD is the share of EAD not covered by collateral
+    after a purpose-specific haircut.
+    """
+
+    def __init__(self, horizon_months: int = 12, pd_floor: float = 0.001, lgd_floor: float = 0.10):
+        self.horizon_months = horizon_months
+        self.pd_floor = pd_floor
+        self.lgd_floor = lgd_floor
+        self.haircuts = {purpose: COLLATERAL_HAIRCUTS.get(purpose, COLLATERAL_HAIRCUTS['Other'])
+                         for purpose in LOAN_PURPOSES}
+
+    def probability_of_default(self, risk_scores) -> np.ndarray:
+        """PD from risk scores"""
+        return np.clip(np.asarray(risk_scores, dtype=np.float64), self.pd_floor, 1.0)
+
+    def exposure_at_default(self, amounts, annual_rates, term_months) -> np.ndarray:
+        """Average outstanding balance over the horizon of an amortizing loan"""
+        amounts = np.asarray(amounts, dtype=np.float64)
+        term_months = np.maximum(np.asarray(term_months, dtype=np.float64), 1)
+        horizon = np.minimum(self.horizon_months, term_months)
+        monthly_rate = np.asarray(annual_rates, dtype=np.float64) / 12
+
+        # Closed form of mean(balance after k payments) for k = 0 .. horizon - 1
+        safe_rate = np.where(monthly_rate > 0, monthly_rate, 1.0)
+        growth_term = (1 + safe_rate) ** term_months
+        growth_horizon = (1 + safe_rate) ** horizon
+        amortizing = amounts * (growth_term - (growth_horizon - 1) / (safe_rate * horizon)) / (growth_term - 1)
+        straight_line = amounts * (1 - (horizon - 1) / (2 * term_months))
+        return np.where(monthly_rate > 0, amortizing, straight_line)
+
+    def loss_given_default(self, exposures, collateral, purposes) -> np.ndarray:
+        """Share of exposure lost after recovering haircut collateral"""
+        exposures = np.asarray(exposures, dtype=np.float64)
+        recovery = np.asarray(collateral, dtype=np.float64) * (1 - self.purpose_haircuts(purposes))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            uncovered = 1 - recovery / exposures
+        return np.clip(np.nan_to_num(uncovered, nan=1.0), self.lgd_floor, 1.0)
+
+    def purpose_haircuts(self, purposes) -> np.ndarray:
+        """Collateral haircut per row, mapped over distinct purposes"""
+        purposes = np.asarray(purposes, dtype=object)
+        if purposes.ndim == 0:
+            return np.float64(self.haircuts.get(purposes.item(), COLLATERAL_HAIRCUTS['Other']))
+        uniques, inverse = np.unique(purposes.astype(str), return_inverse=True)
+        table = np.array([self.haircuts.get(purpose, COLLATERAL_HAIRCUTS['Other']) for purpose in uniques])
+        return table[inverse].reshape(purposes.shape)
+
+    def calculate_batch(self, columns: Dict[str, np.ndarray], results: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """Vectorized expected loss for a batch scored by BatchScorer"""
+        probability = self.probability_of_default(results['risk_score'])
+        exposure = self.exposure_at_default(
+            results['recommended_amount'], results['interest_rate'], results['recommended_term']
+        )
+        loss_given_default = self.loss_given_default(
+            exposure, column_or_default(columns, 'collateral_value', 0), columns.get('loan_purpose', 'Other')
+        )
+        return {
+            'probability_of_default': probability,
+            'exposure_at_default': exposure,
+            'loss_given_default': loss_given_default,
+            'expected_loss': probability * loss_given_default * exposure
+        }
+
+    def calculate_expected_loss(self, application_data: Dict[str, Any], risk_score: float,
+                                recommendation) -> ExpectedLoss:
+        """Expected loss for a single application and its LoanRecommendation"""
+        loan = application_data.get('loan', {})
+        probability = float(self.probability_of_default(risk_score))
+        exposure = float(self.exposure_at_default(
+            recommendation.recommended_amount, recommendation.interest_rate, recommendation.recommended_term
+        ))
+        loss_given_default = float(self.loss_given_default(
+            exposure, loan.get('collateral_value', 0) or 0, loan.get('loan_purpose', 'Other')
+        ))
+        return ExpectedLoss(
+            probability_of_default=probability,
+            loss_given_default=loss_given_default,
+            exposure_at_default=exposure,
+            expected_loss=probability * loss_given_default * exposure
+        )
@@ -0,0 +1,177 @@
+"""Running portfolio exposure and concentration limits"""
+import json
+import os
+import threading
+from collections import defaultdict
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from config import RISK_CATEGORIES
+from data.history import HistoryReader
+from utils.helpers import column_or_default
+from .risk_analyzer import RiskAnalyzer
+
+EXPOSURE_DIMENSIONS = ['state', 'loan_purpose', 'risk_category']
+
+# Risk category names and their upper score bounds, in score order
+_CATEGORY_NAMES = np.array(sorted(RISK_CATEGORIES, key=lambda name: RISK_CATEGORIES[name]['score_range'][0]))
+_CATEGORY_UPPER = np.array([RISK_CATEGORIES[name]['score_range'][1] for name in _CATEGORY_NAMES])
+
+
+def risk_categories(risk_scores) -> np.ndarray:
+    """RISK_CATEGORIES name for each risk score (a score on a boundary takes the higher band)"""
+    bands = np.searchsorted(_CATEGORY_UPPER, np.asarray(risk_scores, dtype=np.float64), side='right')
+    return _CATEGORY_NAMES[np.minimum(bands, len(_CATEGORY_NAMES) - 1)]
+
+
+class ExposureTracker:
+    """Approved amounts by state, loan purpose and risk category
+
+    The amount booked for a loan is the amount actually offered (the
+    recommender's ``recommended_amount``), not the amount requested.
+
+    Totals are plain dictionaries, so recording or checking one approval
+    is O(1) whatever the size of the book. ``try_approve`` checks and
+    records under one lock, so concurrent sessions cannot both take the
+    last room under a limit.
+
+    Limits are either absolute (``amount_limits[dimension][value]``) or a
+    share of the whole book (``max_share[dimension]``). Share limits only
+    apply once the book holds ``min_portfolio_amount``, so the first few
+    loans are not all rejected as concentrated.
+
+    With a ``history_path``, every approval booked by ``try_approve`` is
+    appended there as a JSONL record that ``from_history`` reads back, so
+    the book survives a restart.
+    """
+
+    def __init__(self, max_share: Optional[Mapping[str, float]] = None,
+                 amount_limits: Optional[Mapping[str, Mapping[str, float]]] = None,
+                 min_portfolio_amount: float = 0.0, history_path: Optional[str] = None):
+        self.max_share = dict(max_share or {})
+        self.amount_limits = {dimension: dict(limits) for dimension, limits in (amount_limits or {}).items()}
+        self.min_portfolio_amount = min_portfolio_amount
+        self.history_path = history_path
+        self._lock = threading.Lock()
+        self.reset()
+
+        history_dir = os.path.dirname(history_path) if history_path else ''
+        if history_dir:
+            os.makedirs(history_dir, exist_ok=True)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.totals: Dict[str, Dict[str, float]] = {dimension: defaultdict(float)
+                                                        for dimension in EXPOSURE_DIMENSIONS}
+            self.total_amount = 0.0
+            self.n_loans = 0
+
+    @staticmethod
+    def keys(state: str, loan_purpose: str, risk_score: float) -> Dict[str, str]:
+        """Exposure keys of one application"""
+        return {'state': str(state), 'loan_purpose': str(loan_purpose),
+                'risk_category': str(risk_categories(risk_score))}
+
+    def breaches(self, keys: Mapping[str, str], amount: float) -> List[str]:
+        """Limits that approving ``amount`` under ``keys`` would exceed"""
+        with self._lock:
+            return self._breaches(keys, amount)
+
+    def _breaches(self, keys: Mapping[str, str], amount: float) -> List[str]:
+        breaches = []
+        total_after = self.total_amount + amount
+        for dimension, value in keys.items():
+            exposure_after = self.totals[dimension][value] + amount
+            limit = self.amount_limits.get(dimension, {}).get(value)
+            if limit is not None and exposure_after > limit:
+                breaches.append(f"{dimension} {value}: ${exposure_after:,.0f} exceeds limit of ${limit:,.0f}")
+
+            share = self.max_share.get(dimension)
+            if share is not None and total_after >= self.min_portfolio_amount and \
+                    exposure_after > share * total_after:
+                breaches.append(f"{dimension} {value}: {exposure_after / total_after:.1%} of the portfolio "
+                                f"exceeds limit of {share:.0%}")
+        return breaches
+
+    def record(self, keys: Mapping[str, str], amount: float) -> None:
+        """Add one approval to the running totals"""
+        with self._lock:
+            self._record(keys, amount)
+
+    def _record(self, keys: Mapping[str, str], amount: float) -> None:
+        for dimension, value in keys.items():
+            self.totals[dimension][value] += amount
+        self.total_amount += amount
+        self.n_loans += 1
+
+    def try_approve(self, keys: Mapping[str, str], amount: float,
+                    application: Optional[Dict[str, Any]] = None) -> Tuple[bool, List[str]]:
+        """Record the approval if no limit would be breached; returns (recorded, breaches)
+
+        A recorded ``application`` is also appended to ``history_path``.
+        """
+        with self._lock:
+            breaches = self._breaches(keys, amount)
+            if not breaches:
+                self._record(keys, amount)
+                if self.history_path and application is not None:
+                    record = {'application': application, 'approved': 1, 'recommended_amount': float(amount)}
+                    with open(self.history_path, 'a') as f:
+                        f.write(json.dumps(record, separators=(',', ':')) + '\n')
+            return not breaches, breaches
+
+    def add_batch(self, columns: Dict[str, np.ndarray], risk_scores: np.ndarray,
+                  amounts: Optional[np.ndarray] = None) -> None:
+        """Add a batch of approved loans with one np.unique/bincount per dimension"""
+        amounts = column_or_default(columns, 'loan_amount', 0) if amounts is None \
+            else np.asarray(amounts, dtype=np.float64)
+        values = {
+            'state': np.asarray(columns['state']).astype(str),
+            'loan_purpose': np.asarray(columns['loan_purpose']).astype(str),
+            'risk_category': risk_categories(risk_scores)
+        }
+        batch_totals = {}
+        for dimension, keys in values.items():
+            uniques, inverse = np.unique(keys, return_inverse=True)
+            batch_totals[dimension] = list(zip(uniques.tolist(), np.bincount(inverse, weights=amounts).tolist()))
+
+        with self._lock:
+            for dimension, sums in batch_totals.items():
+                for value, amount in sums:
+                    self.totals[dimension][value] += amount
+            self.total_amount += float(amounts.sum())
+            self.n_loans += len(amounts)
+
+    @classmethod
+    def from_history(cls, path: str, risk_analyzer: Optional[RiskAnalyzer] = None,
+                     approved_field: Optional[str] = 'approved', amount_field: Optional[str] = 'recommended_amount',
+                     chunk_size: int = 50000, **kwargs) -> 'ExposureTracker':
+        """Tracker holding every approved loan of a history file
+
+        Rows count when ``approved_field`` is true (every row when it is
+        None); rows without the field, including every row of a Parquet file
+        without that column, are not counted. Risk categories come from
+        ``risk_analyzer``'s batch scores. Each loan books its
+        ``amount_field`` value, or the requested ``loan_amount`` for rows
+        that do not record one.
+        """
+        tracker = cls(**kwargs)
+        risk_analyzer = risk_analyzer or RiskAnalyzer()
+        extra_fields = [amount_field] if amount_field else None
+        for columns, approved in HistoryReader(path, chunk_size, label_field=approved_field,
+                                               extra_fields=extra_fields):
+            if approved_field and approved is None:
+                continue
+            if approved is not None:
+                keep = approved == 1
+                if not keep.any():
+                    continue
+                columns = {field: np.asarray(values)[keep] for field, values in columns.items()}
+
+            amounts = column_or_default(columns, 'loan_amount', 0)
+            if amount_field and amount_field in columns:
+                booked = np.array([np.nan if value is None else float(value) for value in columns[amount_field]])
+                amounts = np.where(np.isnan(booked), amounts, booked)
+            tracker.add_batch(columns, risk_analyzer.calculate_risk_scores(columns), amounts)
+        return tracker
@@ -0,0 +1,94 @@
+"""Signed feature hashing for high-cardinality text columns"""
+from typing import TYPE_CHECKING, Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from scipy import sparse
+
+FNV_OFFSET = np.uint32(2166136261)
+FNV_PRIME = np.uint32(16777619)
+
+
+def fnv1a_32(values: np.ndarray) -> np.ndarray:
+    """32-bit FNV-1a hash of every string in an array (UTF-8 bytes)
+
+    Unlike Python's ``hash`` this does not depend on ``PYTHONHASHSEED``, so
+    training and serving processes agree. The loop runs over byte
+    positions, each step vectorized across all strings.
+    """
+    encoded = np.char.encode(np.asarray(values, dtype=str), 'utf-8')
+    lengths = np.char.str_len(encoded)
+    width = encoded.dtype.itemsize
+    hashes = np.full(len(encoded), FNV_OFFSET, dtype=np.uint32)
+    if width == 0:
+        return hashes
+
+    byte_matrix = np.frombuffer(encoded.tobytes(), dtype=np.uint8).reshape(len(encoded), width)
+    for position in range(width):
+        active = lengths > position
+        hashes[active] = (hashes[active] ^ byte_matrix[active, position]) * FNV_PRIME
+    return hashes
+
+
+class FeatureHasher:
+    """Maps text columns into a fixed number of signed hash buckets
+
+    Each non-empty value of a field is hashed as ``"<field>=<value>"``; the
+    low bits pick the bucket and the top bit the sign, so colliding values
+    tend to cancel instead of adding up. Only distinct values are hashed.
+    The width bounds memory and model size however many cities or ZIP codes
+    appear.
+    """
+
+    def __init__(self, fields: Sequence[str] = ('city', 'zip_code'), n_features: int = 256):
+        self.fields = list(fields)
+        self.n_features = int(n_features)
+
+    @property
+    def feature_names(self) -> List[str]:
+        return [f'hash_{bucket}' for bucket in range(self.n_features)]
+
+    def config(self) -> Dict[str, Any]:
+        """Settings stored with a trained model so scoring hashes identically"""
+        return {'fields': self.fields, 'n_features': self.n_features, 'hash': 'fnv1a_32'}
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> 'FeatureHasher':
+        if config.get('hash', 'fnv1a_32') != 'fnv1a_32':
+            raise ValueError(f"Unsupported hash function: {config['hash']}")
+        return cls(config['fields'], config['n_features'])
+
+    def hash_columns(self, columns: Dict[str, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        """Bucket and sign (+1, -1, or 0 for empty values) per row and field"""
+        n_rows = len(next(iter(columns.values())))
+        buckets = np.zeros((n_rows, len(self.fields)), dtype=np.intp)
+        signs = np.zeros((n_rows, len(self.fields)), dtype=np.float32)
+
+        for position, field in enumerate(self.fields):
+            values = np.asarray(columns.get(field, np.full(n_rows, '', dtype=object)), dtype=object)
+            uniques, inverse = np.unique(values.astype(str), return_inverse=True)
+            hashes = fnv1a_32(np.char.add(f'{field}=', uniques))
+            unique_signs = np.where(hashes >> 31, -1.0, 1.0).astype(np.float32)
+            unique_signs[np.char.str_len(uniques) == 0] = 0.0
+
+            buckets[:, position] = (hashes % self.n_features)[inverse]
+            signs[:, position] = unique_signs[inverse]
+        return buckets, signs
+
+    def transform(self, columns: Dict[str, np.ndarray]) -> np.ndarray:
+        """Dense float32 block (rows, n_features)"""
+        buckets, signs = self.hash_columns(columns)
+        flat = (np.arange(len(buckets))[:, np.newaxis] * self.n_features + buckets).ravel()
+        dense = np.bincount(flat, weights=signs.ravel(), minlength=len(buckets) * self.n_features)
+        return dense.reshape(len(buckets), self.n_features).astype(np.float32)
+
+    def transform_sparse(self, columns: Dict[str, np.ndarray]) -> 'sparse.csr_matrix':
+        """Same block as a CSR matrix with at most one entry per field and row"""
+        from scipy import sparse  # only sparse training paths need scipy
+        buckets, signs = self.hash_columns(columns)
+        rows = np.repeat(np.arange(len(buckets)), len(self.fields))
+        matrix = sparse.csr_matrix((signs.ravel(), (rows, buckets.ravel())),
+                                   shape=(len(buckets), self.n_features), dtype=np.float32)
+        matrix.eliminate_zeros()
+        return matrix
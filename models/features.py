@@ -0,0 +1,74 @@
+"""Feature extraction shared by risk model training and scoring"""
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from utils.constants import EMPLOYMENT_TYPES, LOAN_PURPOSES
+from utils.helpers import column_or_default
+from .feature_hashing import FeatureHasher
+
+NUMERIC_FEATURES = [
+    'log_annual_income', 'debt_to_income', 'expense_ratio', 'loan_to_income',
+    'credit_score', 'credit_history_length', 'previous_defaults', 'current_loans',
+    'log_loan_amount', 'loan_term', 'collateral_coverage', 'age'
+]
+
+FEATURE_NAMES: List[str] = (
+    NUMERIC_FEATURES
+    + [f'employment_{status}' for status in EMPLOYMENT_TYPES]
+    + [f'purpose_{purpose}' for purpose in LOAN_PURPOSES]
+)
+
+
+def _ratio(numerator, denominator, cap: float) -> np.ndarray:
+    """numerator / denominator capped, with the cap used when the denominator is not positive"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = numerator / np.where(denominator > 0, denominator, 1.0)
+    return np.where(denominator > 0, np.minimum(ratio, cap), cap)
+
+
+def feature_names(hasher: Optional[FeatureHasher] = None) -> List[str]:
+    """Columns of ``build_feature_matrix`` for the given hashing settings"""
+    return FEATURE_NAMES + (hasher.feature_names if hasher is not None else [])
+
+
+def build_feature_matrix(columns: Dict[str, np.ndarray], hasher: Optional[FeatureHasher] = None) -> np.ndarray:
+    """Feature matrix (..., len(feature_names(hasher))) as float32 from DataProcessor columns
+
+    Numeric columns may carry leading dimensions (e.g. stress scenarios);
+    the output broadcasts accordingly. With a ``hasher``, the hashed
+    city/ZIP block is appended after the named features.
+    """
+    annual_income = column_or_default(columns, 'annual_income', 0)
+    existing_debts = column_or_default(columns, 'existing_debts', 0)
+    monthly_expenses = column_or_default(columns, 'monthly_expenses', 0)
+    loan_amount = column_or_default(columns, 'loan_amount', 25000)
+
+    features = [
+        np.log1p(np.maximum(annual_income, 0)),
+        _ratio(existing_debts, annual_income, 10.0),
+        _ratio(monthly_expenses * 12, annual_income, 10.0),
+        _ratio(loan_amount, annual_income, 20.0),
+        column_or_default(columns, 'credit_score', 600),
+        column_or_default(columns, 'credit_history_length', 0),
+        column_or_default(columns, 'previous_defaults', 0),
+        column_or_default(columns, 'current_loans', 0),
+        np.log1p(np.maximum(loan_amount, 0)),
+        column_or_default(columns, 'loan_term', 60),
+        _ratio(column_or_default(columns, 'collateral_value', 0), loan_amount, 5.0),
+        column_or_default(columns, 'age', 35)
+    ]
+
+    employment_status = np.asarray(columns.get('employment_status', ''), dtype=object)
+    features += [(employment_status == status).astype(np.float64) for status in EMPLOYMENT_TYPES]
+
+    loan_purpose = np.asarray(columns.get('loan_purpose', ''), dtype=object)
+    features += [(loan_purpose == purpose).astype(np.float64) for purpose in LOAN_PURPOSES]
+
+    matrix = np.stack(np.broadcast_arrays(*features), axis=-1).astype(np.float32)
+    if hasher is None:
+        return matrix
+
+    hashed = hasher.transform(columns)
+    hashed = np.broadcast_to(hashed, matrix.shape[:-1] + hashed.shape[-1:])
+    return np.concatenate([matrix, hashed], axis=-1)
@@ -1,7 +1,13 @@
 """Geolocation analysis module"""
-from typing import Dict, List
+from typing import Any, Dict, List, Optional, Tuple
 from dataclasses import dataclass
 
+import numpy as np
+
+from utils.location_index import LocationIndex
+from .hazard_raster import HazardRaster
+from .indicator_store import EconomicIndicatorStore, INDICATORS
+
 @dataclass
 class LocationRisk:
     """Location risk assessment results"""
@@ -17,37 +23,124 @@ class GeolocationAnalyzer:
     """Geographic risk assessment system"""
 
     def __init__(self):
-        # Risk data by state (simplified)
+        # Risk data by state code (simplified)
         self.state_risk_data = {
-            'CALIFORNIA': {'unemployment': 4.2, 'median_income': 80000, 'crime_rate': 400},
-            'NEW YORK': {'unemployment': 4.1, 'median_income': 71000, 'crime_rate': 500},
-            'TEXAS': {'unemployment': 3.6, 'median_income': 64000, 'crime_rate': 450},
-            'FLORIDA': {'unemployment': 3.8, 'median_income': 55000, 'crime_rate': 480}
+            'CA': {'unemployment': 4.2, 'median_income': 80000, 'crime_rate': 400},
+            'NY': {'unemployment': 4.1, 'median_income': 71000, 'crime_rate': 500},
+            'TX': {'unemployment': 3.6, 'median_income': 64000, 'crime_rate': 450},
+            'FL': {'unemployment': 3.8, 'median_income': 55000, 'crime_rate': 480}
         }
 
-    def assess_location_risk(self, location_data: Dict[str, str]) -> float:
-        """Assess risk based on geographic location"""
+        self.default_state_data = {'unemployment': 5.0, 'median_income': 60000, 'crime_rate': 400}
+
+        # Resolves abbreviations, misspellings and stray whitespace to state codes
+        self.location_index = LocationIndex()
+
+        # Optional gridded hazard scores for coordinate-based environmental risk
+        self.hazard_raster: Optional[HazardRaster] = None
+        self.hazard_weights: Optional[Dict[str, float]] = None
+
+        # Optional monthly indicator history for backtesting
+        self.indicator_store: Optional[EconomicIndicatorStore] = None
+
+    def load_hazard_raster(self, path: str, weights: Optional[Dict[str, float]] = None) -> None:
+        """Load a memory-mapped hazard raster (header + binary grid)"""
+        self.hazard_raster = HazardRaster(path)
+        self.hazard_weights = weights
+
+    def assess_environmental_risk(self, latitudes, longitudes) -> np.ndarray:
+        """Hazard-based environmental risk for a batch of coordinates (NaN if unknown)"""
+        if self.hazard_raster is None:
+            return np.full(np.shape(latitudes), np.nan)
+        return self.hazard_raster.combined_risk(latitudes, longitudes, self.hazard_weights)
+
+    def load_indicator_history(self, store: EconomicIndicatorStore) -> None:
+        """Use monthly indicator history for as-of location risk"""
+        self.indicator_store = store
+
+    def state_table(self) -> Dict[str, np.ndarray]:
+        """State indicators as sorted arrays ('codes' plus one array per indicator)"""
+        codes = np.array(sorted(self.state_risk_data), dtype='<U2')
+        table = {'codes': codes}
+        for name in INDICATORS:
+            table[name] = np.array([self.state_risk_data[code][name] for code in codes], dtype=np.float64)
+        return table
+
+    @staticmethod
+    def calculate_location_risk(unemployment, median_income, crime_rate):
+        """Location risk from state indicators (scalars or arrays)"""
+        unemployment_risk = np.minimum(np.asarray(unemployment) / 10, 1.0)
+        income_risk = np.maximum(0, 1 - (np.asarray(median_income) / 100000))
+        crime_risk = np.minimum(np.asarray(crime_rate) / 1000, 1.0)
+
+        overall_risk = (unemployment_risk * 0.4 + income_risk * 0.3 + crime_risk * 0.3)
+        return np.minimum(1.0, overall_risk)
+
+    def assess_location_risk(self, location_data: Dict[str, str], as_of=None) -> float:
+        """Assess risk based on geographic location, optionally as of a past date"""
         try:
-            state = location_data.get('state', '').upper()
+            state = self.location_index.normalize_state(location_data.get('state', ''))
+            if as_of is not None:
+                return float(self.assess_location_risk_batch([state or ''], as_of=[as_of])[0])
 
             # Get state data or use defaults
-            state_data = self.state_risk_data.get(
-                state,
-                {'unemployment': 5.0, 'median_income': 60000, 'crime_rate': 400}
-            )
+            state_data = self.state_risk_data.get(state, self.default_state_data)
 
-            # Calculate risk components
-            unemployment_risk = min(state_data['unemployment'] / 10, 1.0)
-            income_risk = max(0, 1 - (state_data['median_income'] / 100000))
-            crime_risk = min(state_data['crime_rate'] / 1000, 1.0)
-
-            # Overall risk
-            overall_risk = (unemployment_risk * 0.4 + income_risk * 0.3 + crime_risk * 0.3)
-            return min(1.0, overall_risk)
+            return float(self.calculate_location_risk(
+                state_data['unemployment'], state_data['median_income'], state_data['crime_rate']
+            ))
 
         except Exception as e:
             return 0.3  # Default moderate risk
 
+    def lookup_state_indicators(self, states, as_of=None,
+                                state_table: Optional[Dict[str, np.ndarray]] = None) -> Dict[str, np.ndarray]:
+        """Indicator columns for a batch of state codes
+
+        With ``as_of`` timestamps and a loaded indicator history, each row gets
+        the latest monthly values at or before its timestamp; rows without
+        history fall back to the current state table.
+        """
+        states = np.asarray(states, dtype='<U2')
+        table = state_table if state_table is not None else self.state_table()
+
+        codes = table['codes']
+        positions = np.minimum(np.searchsorted(codes, states), max(len(codes) - 1, 0))
+        known = (codes[positions] == states) if len(codes) else np.zeros(states.shape, dtype=bool)
+
+        indicators = {
+            name: np.where(known, table[name][positions] if len(codes) else 0.0, self.default_state_data[name])
+            for name in INDICATORS
+        }
+
+        if as_of is not None and self.indicator_store is not None:
+            history = self.indicator_store.asof(states, as_of)
+            for name, values in history.items():
+                if name in indicators:
+                    indicators[name] = np.where(np.isnan(values), indicators[name], values)
+
+        return indicators
+
+    def assess_location_risk_batch(self, states, as_of=None,
+                                   state_table: Optional[Dict[str, np.ndarray]] = None) -> np.ndarray:
+        """Vectorized location risk for state codes from DataProcessor.process_batch"""
+        indicators = self.lookup_state_indicators(states, as_of=as_of, state_table=state_table)
+        return self.calculate_location_risk(
+            indicators['unemployment'], indicators['median_income'], indicators['crime_rate']
+        )
+
+    @staticmethod
+    def _parse_coordinates(location_data: Dict[str, Any]) -> Optional[Tuple[float, float]]:
+        """Latitude and longitude as floats, or None when either is missing or malformed"""
+        try:
+            latitude = float(location_data.get('latitude'))
+            longitude = float(location_data.get('longitude'))
+        except (TypeError, ValueError):
+            return None
+        if not (np.isfinite(latitude) and np.isfinite(longitude)):
+            return None
+        return latitude, longitude
+
     def get_comprehensive_location_analysis(self, location_data: Dict[str, str]) -> LocationRisk:
         """Get comprehensive location risk analysis"""
         overall_risk = self.assess_location_risk(location_data)
@@ -56,6 +149,12 @@ class GeolocationAnalyzer:
         economic_risk = overall_risk * 0.4
         demographic_risk = overall_risk * 0.25
         environmental_risk = overall_risk * 0.20
+        hazard_risk = None
+        coordinates = self._parse_coordinates(location_data)
+        if coordinates is not None:
+            hazard_risk = float(self.assess_environmental_risk([coordinates[0]], [coordinates[1]])[0])
+            if not np.isnan(hazard_risk):
+                environmental_risk = hazard_risk
         crime_risk = overall_risk * 0.15
 
         # Identify risk factors
@@ -64,6 +163,8 @@ class GeolocationAnalyzer:
             risk_factors.append("High geographic risk area")
         if economic_risk > 0.3:
             risk_factors.append("Economic instability in region")
+        if hazard_risk is not None and hazard_risk > 0.5:
+            risk_factors.append("Elevated natural hazard exposure at property")
 
         # Risk mitigation
         risk_mitigation = []
@@ -0,0 +1,102 @@
+"""Memory-mapped gridded hazard raster lookup"""
+import json
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+class HazardRaster:
+    """Gridded hazard scores (0-1 per band) read lazily from a flat binary file
+
+    The raster is stored as ``<name>.bin`` holding a C-ordered
+    ``(bands, nrows, ncols)`` array and a ``<name>.json`` header describing the
+    grid. Row 0 is the northern edge and column 0 the western edge.
+    """
+
+    def __init__(self, path: str):
+        base = os.path.splitext(path)[0]
+        with open(base + '.json') as f:
+            self.header = json.load(f)
+
+        self.bands: List[str] = list(self.header['bands'])
+        self.nrows = int(self.header['nrows'])
+        self.ncols = int(self.header['ncols'])
+        self.lat_max = float(self.header['lat_max'])
+        self.lon_min = float(self.header['lon_min'])
+        self.cell_size = float(self.header['cell_size'])
+        self.nodata = self.header.get('nodata')
+
+        # Pages are only read from disk for the cells that are looked up
+        self.grid = np.memmap(
+            base + '.bin',
+            dtype=np.dtype(self.header.get('dtype', 'float32')),
+            mode='r',
+            shape=(len(self.bands), self.nrows, self.ncols)
+        )
+
+    @classmethod
+    def write(cls, path: str, grid: np.ndarray, lat_max: float, lon_min: float,
+              cell_size: float, bands: List[str], nodata: Optional[float] = None) -> 'HazardRaster':
+        """Write a raster (bands, nrows, ncols) and its header, then open it"""
+        grid = np.asarray(grid)
+        if grid.ndim == 2:
+            grid = grid[np.newaxis]
+        if grid.shape[0] != len(bands):
+            raise ValueError("Number of bands does not match grid shape")
+
+        base = os.path.splitext(path)[0]
+        header = {
+            'bands': list(bands),
+            'nrows': grid.shape[1],
+            'ncols': grid.shape[2],
+            'lat_max': lat_max,
+            'lon_min': lon_min,
+            'cell_size': cell_size,
+            'dtype': grid.dtype.str,
+            'nodata': nodata
+        }
+        np.ascontiguousarray(grid).tofile(base + '.bin')
+        with open(base + '.json', 'w') as f:
+            json.dump(header, f, indent=2)
+        return cls(base)
+
+    def cell_indices(self, latitudes, longitudes):
+        """Row/column indices for all points at once, with an in-bounds mask"""
+        latitudes = np.asarray(latitudes, dtype=np.float64)
+        longitudes = np.asarray(longitudes, dtype=np.float64)
+
+        rows = np.floor((self.lat_max - latitudes) / self.cell_size)
+        cols = np.floor((longitudes - self.lon_min) / self.cell_size)
+        valid = (rows >= 0) & (rows < self.nrows) & (cols >= 0) & (cols < self.ncols)
+
+        rows = np.where(valid, rows, 0).astype(np.intp)
+        cols = np.where(valid, cols, 0).astype(np.intp)
+        return rows, cols, valid
+
+    def lookup(self, latitudes, longitudes) -> Dict[str, np.ndarray]:
+        """Hazard score per band for each point (NaN outside the grid or on nodata)"""
+        rows, cols, valid = self.cell_indices(latitudes, longitudes)
+
+        values = np.asarray(self.grid[:, rows, cols], dtype=np.float64)
+        if self.nodata is not None:
+            values[values == self.nodata] = np.nan
+        values[:, ~valid] = np.nan
+
+        return {band: values[i] for i, band in enumerate(self.bands)}
+
+    def combined_risk(self, latitudes, longitudes, weights: Optional[Dict[str, float]] = None) -> np.ndarray:
+        """Weighted hazard score per point (NaN where no band has data)"""
+        band_values = self.lookup(latitudes, longitudes)
+        weights = weights or {band: 1.0 for band in self.bands}
+
+        stacked = np.stack([band_values[band] for band in weights])
+        band_weights = np.array([weights[band] for band in weights], dtype=np.float64)[:, np.newaxis]
+
+        # Average over the bands that have data at each point
+        present = ~np.isnan(stacked)
+        total_weight = np.sum(band_weights * present, axis=0)
+        weighted = np.sum(np.where(present, stacked, 0.0) * band_weights, axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            risk = weighted / total_weight
+        return np.clip(risk, 0.0, 1.0)
@@ -0,0 +1,95 @@
+"""Time-series store of state economic indicators with as-of joins"""
+from typing import Dict, List
+
+import numpy as np
+
+from utils.location_index import LocationIndex
+
+INDICATORS = ['unemployment', 'median_income', 'crime_rate']
+
+# Composite (state, month) keys: state index in the high bits, month in the low bits
+_MONTH_OFFSET = 2 ** 31
+
+
+def to_months(timestamps) -> np.ndarray:
+    """Convert dates/timestamps to integer months since 1970-01"""
+    return np.asarray(timestamps, dtype='datetime64[M]').astype(np.int64)
+
+
+class EconomicIndicatorStore:
+    """Monthly indicators per state, stored as arrays sorted by (state, month)"""
+
+    def __init__(self, states, months, indicators: Dict[str, np.ndarray]):
+        states = np.asarray(states, dtype='<U2')
+        months = np.asarray(months, dtype=np.int64)
+
+        self.state_codes = np.unique(states)
+        state_ids = np.searchsorted(self.state_codes, states)
+        keys = self._keys(state_ids, months)
+
+        order = np.argsort(keys, kind='stable')
+        self.keys = keys[order]
+        self.state_ids = state_ids[order]
+        self.months = months[order]
+        self.indicators = {
+            name: np.asarray(values, dtype=np.float64)[order] for name, values in indicators.items()
+        }
+
+    @classmethod
+    def from_frame(cls, frame, date_column: str = 'date') -> 'EconomicIndicatorStore':
+        """Build from a DataFrame with state, date and indicator columns"""
+        states = LocationIndex().normalize_states(frame['state'].to_numpy())
+        known = states != ''
+        indicators = {
+            name: frame[name].to_numpy(dtype=np.float64)[known] for name in INDICATORS if name in frame
+        }
+        return cls(states[known], to_months(frame[date_column].to_numpy())[known], indicators)
+
+    @classmethod
+    def load(cls, path: str) -> 'EconomicIndicatorStore':
+        """Load a store saved with save()"""
+        with np.load(path) as data:
+            indicators = {name[len('ind_'):]: data[name] for name in data.files if name.startswith('ind_')}
+            return cls(data['state_codes'][data['state_ids']], data['months'], indicators)
+
+    def save(self, path: str) -> None:
+        """Save the sorted arrays to an .npz file"""
+        np.savez(
+            path,
+            state_codes=self.state_codes,
+            state_ids=self.state_ids,
+            months=self.months,
+            **{f'ind_{name}': values for name, values in self.indicators.items()}
+        )
+
+    @property
+    def names(self) -> List[str]:
+        return list(self.indicators)
+
+    def asof(self, states, timestamps) -> Dict[str, np.ndarray]:
+        """Latest indicator values at or before each timestamp (NaN if none)
+
+        All applications are joined with a single searchsorted over the
+        composite (state, month) keys, which is equivalent to a per-state
+        search but needs no grouping step.
+        """
+        states = np.asarray(states, dtype='<U2')
+        months = to_months(timestamps)
+        if len(self.keys) == 0:
+            return {name: np.full(states.shape, np.nan) for name in self.indicators}
+
+        state_ids = np.searchsorted(self.state_codes, states)
+        state_ids = np.minimum(state_ids, len(self.state_codes) - 1)
+        known = self.state_codes[state_ids] == states
+
+        positions = np.searchsorted(self.keys, self._keys(state_ids, months), side='right') - 1
+        safe = np.maximum(positions, 0)
+        found = known & (positions >= 0) & (self.state_ids[safe] == state_ids)
+
+        return {
+            name: np.where(found, values[safe], np.nan) for name, values in self.indicators.items()
+        }
+
+    @staticmethod
+    def _keys(state_ids: np.ndarray, months: np.ndarray) -> np.ndarray:
+        return (np.asarray(state_ids, dtype=np.int64) << 32) + (months + _MONTH_OFFSET)
@@ -0,0 +1,86 @@
+"""NumPy k-means shared by the similarity index and applicant segmentation"""
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+def squared_distances(data: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Squared Euclidean distances (rows, centroids) via the dot-product expansion"""
+    distances = (np.einsum('ij,ij->i', data, data)[:, np.newaxis]
+                 - 2 * data @ centroids.T
+                 + np.einsum('ij,ij->i', centroids, centroids)[np.newaxis, :])
+    return np.maximum(distances, 0)
+
+
+def nearest_centroid(data: np.ndarray, centroids: np.ndarray,
+                     chunk_size: int = 65536) -> Tuple[np.ndarray, np.ndarray]:
+    """Index of and squared distance to the closest centroid for every row
+
+    Rows are processed in chunks so the distance matrix stays small.
+    """
+    labels = np.empty(len(data), dtype=np.intp)
+    distances = np.empty(len(data), dtype=np.float64)
+    for start in range(0, len(data), chunk_size):
+        chunk = squared_distances(data[start:start + chunk_size], centroids)
+        labels[start:start + len(chunk)] = np.argmin(chunk, axis=1)
+        distances[start:start + len(chunk)] = chunk[np.arange(len(chunk)), labels[start:start + len(chunk)]]
+    return labels, distances
+
+
+def cluster_sums(data: np.ndarray, labels: np.ndarray, n_clusters: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Per-cluster coordinate sums and row counts, one bincount per dimension"""
+    counts = np.bincount(labels, minlength=n_clusters).astype(np.float64)
+    sums = np.stack([np.bincount(labels, weights=data[:, column], minlength=n_clusters)
+                     for column in range(data.shape[1])], axis=1)
+    return sums, counts
+
+
+def kmeans_plus_plus(data: np.ndarray, n_clusters: int, rng: np.random.Generator) -> np.ndarray:
+    """k-means++ seeding: each new centroid drawn in proportion to squared distance"""
+    centroids = np.empty((n_clusters, data.shape[1]), dtype=np.float64)
+    centroids[0] = data[rng.integers(len(data))]
+    closest = squared_distances(data, centroids[:1])[:, 0]
+    for i in range(1, n_clusters):
+        total = closest.sum()
+        index = rng.choice(len(data), p=closest / total) if total > 0 else rng.integers(len(data))
+        centroids[i] = data[index]
+        closest = np.minimum(closest, squared_distances(data, centroids[i:i + 1])[:, 0])
+    return centroids
+
+
+def kmeans(data: np.ndarray, n_clusters: int, n_iter: int = 25, tol: float = 1e-4,
+           random_state: Optional[int] = 0) -> np.ndarray:
+    """Lloyd's k-means from k-means++ seeds; returns the (n_clusters, dims) centroids
+
+    An empty cluster is reseeded with the row farthest from its centroid.
+    Stops early once no centroid moves by more than ``tol`` times the data
+    variance.
+    """
+    data = np.asarray(data, dtype=np.float64)
+    if len(data) < n_clusters:
+        raise ValueError(f"Need at least {n_clusters} rows for {n_clusters} clusters, got {len(data)}")
+    rng = np.random.default_rng(random_state)
+    # Seeding is sequential in the number of clusters, so it runs on a subsample
+    seed_rows = min(len(data), max(20 * n_clusters, 10000))
+    seed_data = data[rng.choice(len(data), seed_rows, replace=False)] if seed_rows < len(data) else data
+    centroids = kmeans_plus_plus(seed_data, n_clusters, rng)
+    threshold = tol * max(float(data.var(axis=0).mean()), 1e-12)
+    # Assignment runs in single precision; centroid means stay in double
+    points = data.astype(np.float32)
+
+    for _ in range(n_iter):
+        labels, distances = nearest_centroid(points, centroids.astype(np.float32))
+        sums, counts = cluster_sums(data, labels, n_clusters)
+        updated = centroids.copy()
+        filled = counts > 0
+        updated[filled] = sums[filled] / counts[filled, np.newaxis]
+        for cluster in np.flatnonzero(~filled):
+            farthest = int(np.argmax(distances))
+            updated[cluster] = data[farthest]
+            distances[farthest] = 0.0
+
+        shift = np.max(np.sum((updated - centroids) ** 2, axis=1))
+        centroids = updated
+        if shift <= threshold:
+            break
+    return centroids
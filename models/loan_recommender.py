@@ -1,8 +1,15 @@
 """Loan recommendation module"""
 import numpy as np
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 from dataclasses import dataclass
 
+from utils.helpers import column_or_default
+from .model_registry import ModelRegistry
+from .risk_model import CalibrationTable
+
+# Credit tiers from best to worst; batch results report tiers as indices into this list
+CREDIT_TIERS = ['excellent', 'very_good', 'good', 'fair', 'poor']
+
 @dataclass
 class LoanRecommendation:
     """Loan recommendation results"""
@@ -19,7 +26,9 @@ class LoanRecommendation:
 class LoanRecommender:
     """Loan recommendation system"""
 
-    def __init__(self):
+    def __init__(self, calibration: Optional[CalibrationTable] = None):
+        self.calibration = calibration
+        self.calibration_version: Optional[str] = None
         self.base_rates = {
             'excellent': 0.045,
             'very_good': 0.065,
@@ -28,6 +37,11 @@ class LoanRecommender:
             'poor': 0.150
         }
 
+    def load_calibration(self, registry: ModelRegistry, version: Optional[str] = None) -> None:
+        """Calibrate approval probabilities with a table from the registry"""
+        self.calibration, metadata = registry.load(version)
+        self.calibration_version = metadata['version']
+
     def recommend_loan_terms(self, application_data: Dict[str, Any], risk_score: float) -> LoanRecommendation:
         """Generate loan recommendations"""
         try:
@@ -106,6 +120,54 @@ class LoanRecommender:
                 conditions=["Complete application review required"]
             )
 
+    def recommend_batch(self, columns: Dict[str, np.ndarray], risk_scores: np.ndarray,
+                        base_rates: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+        """Vectorized loan terms for a batch of columns
+
+        ``base_rates`` optionally overrides ``self.base_rates`` as an array in
+        ``CREDIT_TIERS`` order; a leading dimension (e.g. one row per stress
+        scenario) broadcasts against 2-D inputs.
+        """
+        annual_income = column_or_default(columns, 'annual_income', 0)
+        requested_amount = column_or_default(columns, 'loan_amount', 25000)
+        credit_score = column_or_default(columns, 'credit_score', 600)
+        risk_scores = np.asarray(risk_scores, dtype=np.float64)
+
+        # Determine credit tier
+        adjusted_score = credit_score * (1 - risk_scores * 0.2)
+        tier_floors = np.array([750, 700, 650, 600])
+        credit_tier = np.searchsorted(-tier_floors, -adjusted_score, side='left')
+
+        # Calculate maximum affordable amount
+        max_affordable = np.where(annual_income > 0, annual_income * 3, requested_amount)
+        recommended_amount = np.minimum(np.minimum(requested_amount, max_affordable), 500000)
+        recommended_term = np.full(np.shape(recommended_amount), 60)
+
+        # Calculate interest rate
+        if base_rates is None:
+            base_rates = np.array([self.base_rates[tier] for tier in CREDIT_TIERS])
+        base_rates = np.asarray(base_rates, dtype=np.float64)
+        if base_rates.ndim == 1:
+            tier_rates = base_rates[credit_tier]
+        else:
+            tier_rates = base_rates[np.arange(base_rates.shape[0])[:, np.newaxis], credit_tier]
+        interest_rate = np.minimum(0.30, tier_rates + risk_scores * 0.05)
+
+        # Calculate monthly payment
+        monthly_rate = interest_rate / 12
+        growth = (1 + monthly_rate) ** recommended_term
+        monthly_payment = recommended_amount * (monthly_rate * growth) / (growth - 1)
+
+        return {
+            'credit_tier': credit_tier,
+            'recommended_amount': recommended_amount,
+            'recommended_term': recommended_term,
+            'interest_rate': interest_rate,
+            'monthly_payment': monthly_payment,
+            'total_cost': monthly_payment * recommended_term,
+            'approval_probability': self._calculate_approval_probability(risk_scores, credit_score)
+        }
+
     def _determine_credit_tier(self, credit_score: int, risk_score: float) -> str:
         """Determine credit tier"""
         adjusted_score = credit_score * (1 - risk_score * 0.2)
@@ -138,6 +200,14 @@ class LoanRecommender:
 
     def _calculate_approval_probability(self, risk_score: float, credit_score: int) -> float:
         """Calculate approval probability"""
+        blend = self.approval_blend(risk_score, credit_score)
+        if self.calibration is not None:
+            return self.calibration.apply(blend)
+        return blend
+
+    @staticmethod
+    def approval_blend(risk_score, credit_score):
+        """Uncalibrated approval score: blend of inverse risk and normalized credit score"""
         risk_prob = 1 - risk_score
         credit_prob = (credit_score - 300) / 550  # Normalize 300-850 to 0-1
         return (risk_prob * 0.6 + credit_prob * 0.4)
@@ -0,0 +1,114 @@
+"""Versioned on-disk registry of trained risk models"""
+import json
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from utils.helpers import current_rss_bytes
+from .risk_model import MODEL_KINDS
+
+
+class ModelRegistry:
+    """Stores each model version in its own directory with a LATEST pointer
+
+    A version holds ``metadata.json`` (kind, scalar parameters) and one
+    ``.npy`` file per model array. Arrays are opened with
+    ``np.load(mmap_mode='r')``, so loading is near-instant and every process
+    serving the same version shares the file's pages through the OS page
+    cache instead of holding its own copy.
+
+    Versions are written to a temporary directory and renamed into place,
+    and the pointer is replaced atomically, so readers never see a partial
+    artifact.
+    """
+
+    def __init__(self, root: str, mmap: bool = True):
+        self.root = root
+        self.mmap = mmap
+        os.makedirs(root, exist_ok=True)
+
+    def versions(self) -> List[str]:
+        """All saved versions, oldest first"""
+        return sorted(name for name in os.listdir(self.root) if name.startswith('v') and
+                      os.path.isdir(os.path.join(self.root, name)))
+
+    def latest_version(self) -> Optional[str]:
+        """Version named by the LATEST pointer, if any"""
+        try:
+            with open(os.path.join(self.root, 'LATEST')) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def save(self, model: Any, metadata: Optional[Dict[str, Any]] = None) -> str:
+        """Persist a model as the next version and point LATEST at it"""
+        versions = self.versions()
+        version = f"v{int(versions[-1][1:]) + 1 if versions else 1:04d}"
+
+        staging = tempfile.mkdtemp(prefix='.staging-', dir=self.root)
+        try:
+            arrays, params = model.to_arrays()
+            for name, values in arrays.items():
+                np.save(os.path.join(staging, f'{name}.npy'), np.ascontiguousarray(values))
+
+            metadata = dict(metadata or {})
+            metadata.update({
+                'version': version,
+                'kind': model.kind,
+                'arrays': sorted(arrays),
+                'params': params,
+                'created_at': datetime.now().isoformat()
+            })
+            with open(os.path.join(staging, 'metadata.json'), 'w') as f:
+                json.dump(metadata, f, indent=2)
+            os.rename(staging, os.path.join(self.root, version))
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        self._write_pointer(version)
+        return version
+
+    def load(self, version: Optional[str] = None) -> Tuple[Any, Dict[str, Any]]:
+        """Load a model version (LATEST by default) and its metadata
+
+        ``metadata['load_stats']`` reports the load time and the resident
+        memory the load added to this process.
+        """
+        version = version or self.latest_version()
+        if version is None:
+            raise FileNotFoundError(f"No model versions in {self.root}")
+
+        start_time, start_rss = time.perf_counter(), current_rss_bytes()
+        path = os.path.join(self.root, version)
+        with open(os.path.join(path, 'metadata.json')) as f:
+            metadata = json.load(f)
+
+        mmap_mode = 'r' if self.mmap else None
+        if 'arrays' in metadata:
+            arrays = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode=mmap_mode)
+                      for name in metadata['arrays']}
+            model = MODEL_KINDS[metadata['kind']].from_arrays(arrays, metadata['params'])
+        else:
+            # Versions written before the array format held a single pickle
+            import joblib
+            model = joblib.load(os.path.join(path, 'model.joblib'), mmap_mode=mmap_mode)
+
+        end_rss = current_rss_bytes()
+        metadata['load_stats'] = {
+            'seconds': time.perf_counter() - start_time,
+            'rss_delta_bytes': end_rss - start_rss if end_rss is not None and start_rss is not None else None
+        }
+        return model, metadata
+
+    def _write_pointer(self, version: str) -> None:
+        """Atomically replace the LATEST pointer"""
+        fd, temp_path = tempfile.mkstemp(prefix='.latest-', dir=self.root)
+        with os.fdopen(fd, 'w') as f:
+            f.write(version)
+        os.replace(temp_path, os.path.join(self.root, 'LATEST'))
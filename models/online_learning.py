@@ -0,0 +1,117 @@
+"""Incremental risk model updates from streamed repayment outcomes"""
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from sklearn.linear_model import SGDClassifier
+
+from data.history import OutcomeStream
+from .feature_hashing import FeatureHasher
+from .features import build_feature_matrix, feature_names
+from .model_registry import ModelRegistry
+from .risk_model import LinearRiskModel
+
+
+class OnlineRiskUpdater:
+    """Continues training the registry's latest linear model on new outcomes
+
+    The classifier is seeded with the served coefficients and its step
+    counter, so ``partial_fit`` picks up the learning-rate schedule where the
+    last training run left it. Standardization stays fixed at the
+    full-history moments. Every ``checkpoint_every`` mini-batches the model
+    is saved as a new registry version, together with the stream offset
+    reached; registry writes are atomic, so a crash either loses the
+    pending batches (replayed from the last saved offset) or none at all.
+    Offsets are kept per source (``OutcomeStream.source_key``), since a
+    file's byte offset means nothing to a queue and vice versa.
+    """
+
+    def __init__(self, registry: ModelRegistry, checkpoint_every: int = 10,
+                 alpha: Optional[float] = None, random_state: int = 0):
+        self.registry = registry
+        self.checkpoint_every = checkpoint_every
+        self.alpha = alpha
+        self.random_state = random_state
+        self.parent_version: Optional[str] = None
+        self.stream_offsets: Dict[str, int] = {}
+        self.n_samples = 0
+        self._rng = np.random.default_rng(random_state)
+        self._load_latest()
+
+    def _load_latest(self) -> None:
+        """Seed the classifier from the latest registry version"""
+        model, metadata = self.registry.load()
+        if not isinstance(model, LinearRiskModel):
+            raise ValueError(f"Online updates need a linear model, not '{metadata['kind']}'")
+        hashing = metadata.get('feature_hashing')
+        self.hasher = FeatureHasher.from_config(hashing) if hashing else None
+        self.feature_names = feature_names(self.hasher)
+        if list(model.feature_names) != self.feature_names:
+            raise ValueError("Model features do not match the current feature set")
+
+        alpha = self.alpha if self.alpha is not None else metadata.get('alpha', 1e-4)
+        classifier = SGDClassifier(loss='log_loss', alpha=alpha, random_state=self.random_state)
+        classifier.coef_ = np.array(model.coef, dtype=np.float64)[np.newaxis, :]
+        classifier.intercept_ = np.array([model.intercept])
+        classifier.classes_ = np.array([0, 1])
+        classifier.t_ = float(metadata.get('sgd_steps', metadata.get('n_samples', 0) * metadata.get('epochs', 1) + 1))
+
+        self.classifier = classifier
+        self.mean, self.scale = np.array(model.mean), np.array(model.scale)
+        self.metadata = metadata
+        self.parent_version = metadata['version']
+        self.stream_offsets = dict(metadata.get('stream_offsets', {}))
+
+    def update(self, columns: Dict[str, np.ndarray], labels: np.ndarray) -> int:
+        """Apply one mini-batch of outcomes; returns the number of labeled rows used"""
+        labeled = ~np.isnan(labels)
+        if not labeled.any():
+            return 0
+        features = (build_feature_matrix(columns, self.hasher)[labeled].astype(np.float64) - self.mean) / self.scale
+        order = self._rng.permutation(int(labeled.sum()))
+        self.classifier.partial_fit(features[order], labels[labeled][order].astype(np.int64),
+                                    classes=np.array([0, 1]))
+        self.n_samples += len(order)
+        return len(order)
+
+    def checkpoint(self, source: str, stream_offset: int, metadata: Optional[Dict[str, Any]] = None) -> str:
+        """Save the current model as a new version, with ``source`` read up to ``stream_offset``"""
+        model = LinearRiskModel(self.classifier.coef_[0], self.classifier.intercept_[0],
+                                self.mean, self.scale, self.feature_names)
+        metadata = dict(metadata or {})
+        stream_offsets = {**self.stream_offsets, source: stream_offset}
+        if self.hasher is not None:
+            metadata['feature_hashing'] = self.hasher.config()
+        metadata.update({
+            'feature_names': self.feature_names,
+            'alpha': self.classifier.alpha,
+            'parent_version': self.parent_version,
+            'stream_offsets': stream_offsets,
+            'online_samples': self.n_samples,
+            'sgd_steps': self.classifier.t_
+        })
+        version = self.registry.save(model, metadata)
+        self.parent_version, self.stream_offsets, self.n_samples = version, stream_offsets, 0
+        return version
+
+    def run(self, stream: OutcomeStream) -> List[str]:
+        """Consume a stream until it ends, checkpointing as configured"""
+        versions = []
+        pending = 0
+        source = OutcomeStream.source_key(stream.source)
+        offset = stream.offset
+        for columns, labels, offset in stream:
+            if labels is None:
+                continue
+            self.update(columns, labels)
+            pending += 1
+            if pending >= self.checkpoint_every:
+                versions.append(self.checkpoint(source, offset))
+                pending = 0
+        if pending or offset != self.stream_offsets.get(source, 0):
+            versions.append(self.checkpoint(source, offset))
+        return versions
+
+    def follow(self, path: str, **stream_options) -> List[str]:
+        """Tail an outcome JSONL file from the offset last checkpointed for that file"""
+        offset = self.stream_offsets.get(OutcomeStream.source_key(path), 0)
+        return self.run(OutcomeStream(path, offset=offset, **stream_options))
@@ -0,0 +1,185 @@
+"""Champion/challenger replay of logged applications"""
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from data.history import HistoryReader, split_byte_ranges, split_row_groups
+from .batch_scorer import BatchScorer
+from .loan_recommender import CREDIT_TIERS
+
+# Per-segment sums accumulated during a replay
+REPLAY_STATS = [
+    'applications', 'champion_approved', 'challenger_approved',
+    'champion_rate_sum', 'challenger_rate_sum',
+    'champion_expected_loss', 'challenger_expected_loss',
+    'approvals_gained', 'approvals_lost'
+]
+
+
+@dataclass
+class SegmentDiff:
+    """Champion vs challenger outcome for one segment of the replayed log
+
+    Rates are averaged and expected loss summed over each engine's own
+    approvals.
+    """
+    segment: str
+    value: str
+    applications: int
+    champion_approval_rate: float
+    challenger_approval_rate: float
+    champion_avg_rate: float
+    challenger_avg_rate: float
+    champion_expected_loss: float
+    challenger_expected_loss: float
+    approvals_gained: int
+    approvals_lost: int
+
+    @property
+    def approval_rate_delta(self) -> float:
+        return self.challenger_approval_rate - self.champion_approval_rate
+
+    @property
+    def avg_rate_delta(self) -> float:
+        return self.challenger_avg_rate - self.champion_avg_rate
+
+    @property
+    def expected_loss_delta(self) -> float:
+        return self.challenger_expected_loss - self.champion_expected_loss
+
+
+# Engines of the current worker process, set once by the pool initializer
+_worker_engines: Optional[Tuple[BatchScorer, BatchScorer]] = None
+
+
+def _init_worker(champion: BatchScorer, challenger: BatchScorer) -> None:
+    global _worker_engines
+    _worker_engines = (champion, challenger)
+
+
+def _replay_range(path: str, part: Dict[str, Any], chunk_size: int,
+                  segment_fields: Sequence[str]) -> Dict[str, Dict[str, np.ndarray]]:
+    """Replay one part of the log in a worker and return its segment sums
+
+    ``part`` holds the reader's slice: a ``byte_range`` or ``row_groups``.
+    """
+    champion, challenger = _worker_engines
+    totals: Dict[str, Dict[str, np.ndarray]] = {}
+    for columns, _ in HistoryReader(path, chunk_size, label_field=None, **part):
+        # Both engines score the same processed columns
+        champion_results = champion.score(columns)
+        challenger_results = challenger.score(columns)
+        segments = {field: _segment_values(field, columns, champion_results) for field in segment_fields}
+        segments['overall'] = np.full(len(champion_results['approved']), 'all', dtype=object)
+
+        stats = _row_stats(champion_results, challenger_results)
+        for field, values in segments.items():
+            _accumulate(totals.setdefault(field, {}), values, stats)
+    return totals
+
+
+def _segment_values(field: str, columns: Dict[str, np.ndarray], results: Dict[str, np.ndarray]) -> np.ndarray:
+    """Segment label per row; credit tier comes from the champion's scoring"""
+    if field == 'credit_tier':
+        return np.asarray(CREDIT_TIERS, dtype=object)[results['credit_tier']]
+    values = results[field] if field in results else columns[field]
+    return np.asarray(values).astype(str).astype(object)
+
+
+def _row_stats(champion: Dict[str, np.ndarray], challenger: Dict[str, np.ndarray]) -> np.ndarray:
+    """Per-row contributions to REPLAY_STATS, shape (rows, stats)"""
+    champion_approved = champion['approved'].astype(np.float64)
+    challenger_approved = challenger['approved'].astype(np.float64)
+    return np.stack([
+        np.ones_like(champion_approved),
+        champion_approved,
+        challenger_approved,
+        champion['interest_rate'] * champion_approved,
+        challenger['interest_rate'] * challenger_approved,
+        champion['expected_loss'] * champion_approved,
+        challenger['expected_loss'] * challenger_approved,
+        challenger_approved * (1 - champion_approved),
+        champion_approved * (1 - challenger_approved)
+    ], axis=1)
+
+
+def _accumulate(totals: Dict[str, np.ndarray], values: np.ndarray, stats: np.ndarray) -> None:
+    """Add per-row stats into per-value sums with one bincount per stat"""
+    uniques, inverse = np.unique(values, return_inverse=True)
+    sums = np.stack([np.bincount(inverse, weights=stats[:, column], minlength=len(uniques))
+                     for column in range(stats.shape[1])], axis=1)
+    for value, row in zip(uniques, sums):
+        if value in totals:
+            totals[value] += row
+        else:
+            totals[value] = row
+
+
+class ChampionChallengerReplay:
+    """Replays an application log through two scoring engines
+
+    The log is split into parts (byte ranges of a JSONL file, row groups of
+    a Parquet file) that worker processes read and score independently;
+    each returns only its per-segment sums, so neither the log nor the
+    scores are ever collected in one place.
+    """
+
+    def __init__(self, champion: BatchScorer, challenger: BatchScorer,
+                 segment_fields: Sequence[str] = ('loan_purpose', 'state', 'credit_tier'),
+                 chunk_size: int = 20000, n_jobs: int = 1):
+        self.champion = champion
+        self.challenger = challenger
+        self.segment_fields = list(segment_fields)
+        self.chunk_size = chunk_size
+        self.n_jobs = n_jobs
+
+    def run(self, path: str) -> List[SegmentDiff]:
+        """Replay a log and return one diff per segment value, 'overall' first"""
+        if self.n_jobs > 1:
+            # Several parts per worker so one slow part does not hold up the rest
+            if path.endswith('.parquet'):
+                parts = [{'row_groups': groups} for groups in split_row_groups(path, self.n_jobs * 4)]
+            else:
+                parts = [{'byte_range': byte_range} for byte_range in split_byte_ranges(path, self.n_jobs * 4)]
+            with ProcessPoolExecutor(max_workers=self.n_jobs, initializer=_init_worker,
+                                     initargs=(self.champion, self.challenger)) as executor:
+                partials = list(executor.map(
+                    _replay_range, [path] * len(parts), parts,
+                    [self.chunk_size] * len(parts), [self.segment_fields] * len(parts)
+                ))
+        else:
+            _init_worker(self.champion, self.challenger)
+            partials = [_replay_range(path, {}, self.chunk_size, self.segment_fields)]
+
+        totals: Dict[str, Dict[str, np.ndarray]] = {}
+        for partial in partials:
+            for field, values in partial.items():
+                merged = totals.setdefault(field, {})
+                for value, row in values.items():
+                    merged[value] = merged[value] + row if value in merged else row
+
+        diffs = []
+        for field in ['overall'] + self.segment_fields:
+            for value, row in sorted(totals.get(field, {}).items()):
+                diffs.append(self._to_diff(field, value, row))
+        return diffs
+
+    @staticmethod
+    def _to_diff(field: str, value: str, row: np.ndarray) -> SegmentDiff:
+        stats = dict(zip(REPLAY_STATS, row.tolist()))
+        applications = stats['applications']
+        return SegmentDiff(
+            segment=field,
+            value=value,
+            applications=int(applications),
+            champion_approval_rate=stats['champion_approved'] / applications,
+            challenger_approval_rate=stats['challenger_approved'] / applications,
+            champion_avg_rate=stats['champion_rate_sum'] / max(stats['champion_approved'], 1),
+            challenger_avg_rate=stats['challenger_rate_sum'] / max(stats['challenger_approved'], 1),
+            champion_expected_loss=stats['champion_expected_loss'],
+            challenger_expected_loss=stats['challenger_expected_loss'],
+            approvals_gained=int(stats['approvals_gained']),
+            approvals_lost=int(stats['approvals_lost'])
+        )
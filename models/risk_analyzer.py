@@ -1,7 +1,15 @@
 """Risk analysis module for loan evaluation"""
+import threading
+import time
 import numpy as np
-from typing import Dict, Any
-from dataclasses import dataclass
+from typing import Dict, Any, List, Optional, Tuple
+from dataclasses import dataclass, field
+
+from data.data_processor import DataProcessor
+from utils.helpers import column_or_default
+from .feature_hashing import FeatureHasher
+from .features import build_feature_matrix, feature_names
+from .model_registry import ModelRegistry
 
 @dataclass
 class RiskAssessment:
@@ -12,15 +20,113 @@ class RiskAssessment:
     confidence: float
     recommendation: str
 
+@dataclass(frozen=True)
+class ServedModel:
+    """A trained model with the feature hasher and metadata it was saved with"""
+    model: Any
+    hasher: Optional[FeatureHasher] = None
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    version: Optional[str] = None
+
 class RiskAnalyzer:
-    """Risk assessment system"""
+    """Risk assessment system
+
+    The served model, its hasher and metadata are swapped in together as
+    one ``ServedModel``, and every scoring call reads that snapshot once,
+    so a registry refresh on another thread can never pair a new hasher
+    with an old model.
+    """
+
+    def __init__(self, model=None):
+        self._served: Optional[ServedModel] = ServedModel(model) if model is not None else None
+        self._processor: Optional[DataProcessor] = None
+        self._registry: Optional[ModelRegistry] = None
+        self._refresh_interval = 0.0
+        self._last_refresh = 0.0
+        self._lock = threading.RLock()
+
+    def __getstate__(self):
+        # Locks do not pickle; replay workers get a fresh one
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+
+    @property
+    def is_trained(self) -> bool:
+        return self._served is not None
+
+    @property
+    def model(self):
+        return self._served.model if self._served is not None else None
+
+    @property
+    def hasher(self) -> Optional[FeatureHasher]:
+        return self._served.hasher if self._served is not None else None
 
-    def __init__(self):
-        self.is_trained = False
+    @property
+    def model_metadata(self) -> Dict[str, Any]:
+        return self._served.metadata if self._served is not None else {}
+
+    @property
+    def model_version(self) -> Optional[str]:
+        return self._served.version if self._served is not None else None
+
+    def load_model(self, registry: ModelRegistry, version: Optional[str] = None) -> None:
+        """Score with a trained model from the registry instead of the rules"""
+        model, metadata = registry.load(version)
+        hashing = metadata.get('feature_hashing')
+        served = ServedModel(model, FeatureHasher.from_config(hashing) if hashing else None,
+                             metadata, metadata['version'])
+        with self._lock:
+            self._served = served
+
+    def follow_registry(self, registry: ModelRegistry, refresh_interval: float = 30.0) -> None:
+        """Serve the registry's LATEST version, swapping in new versions as they appear
+
+        The pointer is re-read at most every ``refresh_interval`` seconds from
+        the scoring path, so long-running workers pick up new checkpoints
+        without a restart.
+        """
+        self._registry = registry
+        self._refresh_interval = refresh_interval
+        self.refresh_model(force=True)
+
+    def refresh_model(self, force: bool = False) -> bool:
+        """Load the LATEST version if it changed; returns whether the model was swapped"""
+        if self._registry is None:
+            return False
+        # One thread refreshes at a time; others keep scoring with the current snapshot
+        if not self._lock.acquire(blocking=force):
+            return False
+        try:
+            now = time.monotonic()
+            if not force and now - self._last_refresh < self._refresh_interval:
+                return False
+            self._last_refresh = now
+
+            latest = self._registry.latest_version()
+            if latest is None or latest == self.model_version:
+                return False
+            self.load_model(self._registry, latest)
+            return True
+        finally:
+            self._lock.release()
 
     def calculate_risk_score(self, application_data: Dict[str, Any]) -> float:
         """Calculate risk score for loan application"""
         try:
+            self.refresh_model()
+            served = self._served
+            if served is not None:
+                if self._processor is None:
+                    self._processor = DataProcessor()
+                columns = self._processor.process_batch([application_data])
+                return float(self._model_scores(served, columns)[0])
+
             risk_factors = []
 
             # Financial risk
@@ -68,6 +174,79 @@ class RiskAnalyzer:
         except Exception as e:
             return 0.5
 
+    def calculate_risk_components(self, columns: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """Vectorized financial, credit and employment risk for a batch of columns
+
+        Numeric inputs may carry extra leading dimensions (e.g. scenarios);
+        the outputs broadcast accordingly.
+        """
+        annual_income = column_or_default(columns, 'annual_income', 0)
+        existing_debts = column_or_default(columns, 'existing_debts', 0)
+        credit_score = column_or_default(columns, 'credit_score', 600)
+        employment_status = np.asarray(columns.get('employment_status', ''), dtype=object)
+
+        # Financial risk
+        with np.errstate(divide='ignore', invalid='ignore'):
+            debt_ratio = existing_debts / np.where(annual_income > 0, annual_income, 1.0)
+        financial_risk = np.where(
+            annual_income > 0,
+            np.select([debt_ratio > 0.5, debt_ratio > 0.3], [0.4, 0.25], default=0.1),
+            0.6
+        )
+
+        # Credit risk
+        credit_risk = np.select(
+            [credit_score < 500, credit_score < 650, credit_score < 750],
+            [0.5, 0.35, 0.2],
+            default=0.1
+        )
+
+        # Employment risk
+        employment_risk = np.select(
+            [employment_status == 'Unemployed', employment_status == 'Self-Employed'],
+            [0.6, 0.3],
+            default=0.1
+        )
+
+        return {
+            'financial_risk': financial_risk,
+            'credit_risk': credit_risk,
+            'employment_risk': employment_risk
+        }
+
+    def calculate_risk_scores(self, columns: Dict[str, np.ndarray]) -> np.ndarray:
+        """Vectorized risk scores for a batch of columns"""
+        self.refresh_model()
+        served = self._served
+        if served is not None:
+            return self._model_scores(served, columns)
+
+        components = self.calculate_risk_components(columns)
+        risk_scores = sum(components.values()) / len(components)
+        return np.clip(risk_scores, 0.0, 1.0)
+
+    @staticmethod
+    def _model_scores(served: ServedModel, columns: Dict[str, np.ndarray]) -> np.ndarray:
+        return np.clip(served.model.predict_proba(build_feature_matrix(columns, served.hasher)), 0.0, 1.0)
+
+    def calculate_contributions(self, columns: Dict[str, np.ndarray]) -> Tuple[List[str], np.ndarray]:
+        """Factor names and per-factor contributions for a batch, shape (..., factors)
+
+        The rule score is the mean of its three components, so each
+        component contributes a third of its value and the contributions sum
+        to the score. Trained models attribute their log-odds of default to
+        individual features, relative to the model's base value.
+        """
+        self.refresh_model()
+        served = self._served
+        if served is not None:
+            contributions, _ = served.model.contributions(build_feature_matrix(columns, served.hasher))
+            return served.model.feature_names or feature_names(served.hasher), contributions
+
+        components = self.calculate_risk_components(columns)
+        contributions = np.stack(np.broadcast_arrays(*components.values()), axis=-1) / len(components)
+        return list(components), contributions
+
     def assess_comprehensive_risk(self, application_data: Dict[str, Any]) -> RiskAssessment:
         """Perform comprehensive risk assessment"""
         risk_score = self.calculate_risk_score(application_data)
@@ -81,11 +260,10 @@ class RiskAnalyzer:
             risk_category = "HIGH"
 
         # Contributing factors
-        contributing_factors = {
-            'financial_risk': risk_score * 0.4,
-            'credit_risk': risk_score * 0.35,
-            'employment_risk': risk_score * 0.25
-        }
+        if self._processor is None:
+            self._processor = DataProcessor()
+        names, contributions = self.calculate_contributions(self._processor.process_batch([application_data]))
+        contributing_factors = dict(zip(names, contributions[0].tolist()))
 
         # Generate recommendation
         if risk_score < 0.3:
@@ -0,0 +1,449 @@
+"""Trained risk model representations used at serving time"""
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .kmeans import nearest_centroid
+
+# How a split treats missing values (LightGBM's missing_type): 'None' reads NaN
+# as 0.0, 'Zero' sends zero and NaN down the default branch, 'NaN' sends NaN
+# down the default branch
+MISSING_NONE, MISSING_ZERO, MISSING_NAN = 0, 1, 2
+# LightGBM's kZeroThreshold: values this close to zero count as zero
+ZERO_THRESHOLD = 1e-35
+
+
+class LinearRiskModel:
+    """Logistic model over standardized features, scored with plain NumPy"""
+
+    kind = 'linear'
+
+    def __init__(self, coef, intercept: float, mean, scale, feature_names: List[str]):
+        self.coef = np.asarray(coef, dtype=np.float64)
+        self.intercept = float(intercept)
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.feature_names = list(feature_names)
+
+    def decision_function(self, features: np.ndarray) -> np.ndarray:
+        """Log-odds of default for a feature matrix (..., n_features)"""
+        return ((features - self.mean) / self.scale) @ self.coef + self.intercept
+
+    def predict_proba(self, features: np.ndarray) -> np.ndarray:
+        """Probability of default"""
+        return 1.0 / (1.0 + np.exp(-self.decision_function(features)))
+
+    def contributions(self, features: np.ndarray) -> Tuple[np.ndarray, float]:
+        """Per-feature log-odds contributions (..., n_features) and the base value they add to
+
+        Each term is measured against the training mean of its feature.
+        """
+        return ((features - self.mean) / self.scale) * self.coef, self.intercept
+
+    def to_arrays(self) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+        """Arrays and scalar parameters for the artifact format"""
+        arrays = {'coef': self.coef, 'mean': self.mean, 'scale': self.scale}
+        params = {'intercept': self.intercept, 'feature_names': self.feature_names}
+        return arrays, params
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray], params: Dict[str, Any]) -> 'LinearRiskModel':
+        return cls(arrays['coef'], params['intercept'], arrays['mean'], arrays['scale'], params['feature_names'])
+
+
+class CompiledTreeEnsemble:
+    """Gradient-boosted trees flattened into node arrays and scored with NumPy
+
+    Every node of every tree lives in the same arrays; leaves point back to
+    themselves, so a whole batch can walk all trees at once, one level per
+    step, and then read the leaf values. Trees are walked deepest first, so
+    the trees still descending at a level are a prefix of the work arrays,
+    and (row, tree) paths that reached a leaf early are dropped once they
+    are more than ``COMPACT_FRACTION`` of the work. Internal nodes keep
+    their expected value and cover for per-feature attributions.
+    """
+
+    kind = 'tree_ensemble'
+    BLOCK_SIZE = 32768
+    COMPACT_FRACTION = 0.5
+    ARRAYS = ['feature', 'threshold', 'children', 'value', 'cover', 'default_left', 'missing_type',
+              'is_leaf', 'roots']
+
+    def __init__(self, feature, threshold, children, value, cover, default_left, is_leaf, roots,
+                 base_score: float, max_depth: int, strict_less: bool = False,
+                 link: str = 'logit', feature_names: Optional[List[str]] = None, missing_type=None):
+        self.feature = np.asarray(feature, dtype=np.intp)
+        self.threshold = np.asarray(threshold, dtype=np.float64)
+        self.children = np.asarray(children, dtype=np.intp)
+        self.value = np.asarray(value, dtype=np.float64)
+        self.cover = np.asarray(cover, dtype=np.float64)
+        self.default_left = np.asarray(default_left, dtype=bool)
+        # Versions saved before missing_type existed only routed NaN to the default branch
+        self.missing_type = np.full(len(self.feature), MISSING_NAN, dtype=np.uint8) if missing_type is None \
+            else np.asarray(missing_type, dtype=np.uint8)
+        self._zero_missing = bool((self.missing_type == MISSING_ZERO).any())
+        self.is_leaf = np.asarray(is_leaf, dtype=bool)
+        self.roots = np.asarray(roots, dtype=np.intp)
+        self.base_score = float(base_score)
+        self.max_depth = int(max_depth)
+        self.strict_less = bool(strict_less)
+        self.link = link
+        self.feature_names = list(feature_names or [])
+
+        # float32 thresholds that give the same split as the float64 ones for any
+        # float32 input: rounded down for 'x <= t', rounded up for 'x < t'.
+        # Out-of-range thresholds (LightGBM writes +-1e300) saturate first.
+        float32_max = np.finfo(np.float32).max
+        threshold32 = np.clip(self.threshold, -float32_max, float32_max).astype(np.float32)
+        with np.errstate(over='ignore'):  # stepping past float32 max lands on +-inf, as intended
+            if self.strict_less:
+                too_low = threshold32 < self.threshold
+                threshold32[too_low] = np.nextafter(threshold32[too_low], np.float32(np.inf))
+            else:
+                too_high = threshold32 > self.threshold
+                threshold32[too_high] = np.nextafter(threshold32[too_high], np.float32(-np.inf))
+        self._threshold32 = threshold32
+        self._schedule_trees()
+
+    def _schedule_trees(self) -> None:
+        """Depth of every tree, the deepest-first tree order, and whether leaves end paths early"""
+        tree_depth = np.zeros(len(self.roots), dtype=np.int64)
+        leaf_depths, leaf_trees = [], []
+        nodes, trees = self.roots, np.arange(len(self.roots))
+        for level in range(self.max_depth + 1):
+            at_leaf = self.is_leaf[nodes]
+            leaf_depths.append(np.full(int(at_leaf.sum()), level))
+            leaf_trees.append(trees[at_leaf])
+            nodes, trees = self.children[nodes[~at_leaf]].ravel(), np.repeat(trees[~at_leaf], 2)
+            if not len(nodes):
+                break
+            tree_depth[trees] = level + 1
+
+        self._tree_order = np.argsort(-tree_depth, kind='stable')
+        self._tree_depth = tree_depth[self._tree_order]
+        leaf_depths, leaf_trees = np.concatenate(leaf_depths), np.concatenate(leaf_trees)
+        # Leaf-wise trees (LightGBM) end most paths well above their deepest leaf
+        self._ragged = bool((leaf_depths < tree_depth[leaf_trees]).mean() > 0.25) if len(leaf_depths) else False
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    def leaf_nodes(self, features: np.ndarray) -> np.ndarray:
+        """Leaf reached in every tree, shape (rows, trees)"""
+        features = np.asarray(features, dtype=np.float32)
+        leaves = np.empty((len(features), self.n_trees), dtype=np.intp)
+
+        # Rows are processed in blocks so the (rows x trees) work arrays stay cache-sized
+        block_rows = max(1, self.BLOCK_SIZE // max(self.n_trees, 1))
+        for start in range(0, len(features), block_rows):
+            block = features[start:start + block_rows]
+            leaves[start:start + len(block), self._tree_order] = self._traverse(block).T
+        return leaves
+
+    def _traverse(self, features: np.ndarray, contributions: Optional[np.ndarray] = None) -> np.ndarray:
+        """Walk all trees for one block of rows, one tree level per step
+
+        Returns the leaves as (trees, rows), trees in deepest-first order.
+
+        With a flat ``contributions`` buffer (rows * features), each step also
+        credits the change in expected value to the feature that was split on.
+        """
+        n_rows, n_features = features.shape
+        flat_features = features.ravel()
+        check_missing = self._zero_missing or bool(np.isnan(flat_features).any())
+        flat_children = self.children.ravel()
+        compare = np.greater_equal if self.strict_less else np.greater
+
+        # One entry per (tree, row), tree-major in deepest-first tree order
+        nodes = np.repeat(self.roots[self._tree_order], n_rows)
+        # Negated so the deepest-first order is ascending for searchsorted
+        neg_depths = np.repeat(-self._tree_depth, n_rows)
+        row_offsets = np.tile(np.arange(n_rows) * n_features, self.n_trees)
+        pairs = np.arange(len(nodes))
+        leaves = np.empty(len(nodes), dtype=np.intp)
+
+        # Work buffers reused across levels; indices are always in range, and
+        # mode='clip' lets take write straight into them
+        positions_buffer, steps_buffer = np.empty(len(nodes), dtype=np.intp), np.empty(len(nodes), dtype=np.intp)
+        values_buffer, thresholds_buffer = np.empty(len(nodes), np.float32), np.empty(len(nodes), np.float32)
+        go_right_buffer = np.empty(len(nodes), dtype=bool)
+
+        for level in range(self.max_depth):
+            # Entries of trees no deeper than this level already sit on their leaf
+            n_walking = int(np.searchsorted(neg_depths, -level, side='left'))
+            if not n_walking:
+                break
+            walking = nodes[:n_walking]
+            positions = positions_buffer[:n_walking]
+            np.take(self.feature, walking, out=positions, mode='clip')
+            np.add(positions, row_offsets[:n_walking], out=positions)
+            values = np.take(flat_features, positions, out=values_buffer[:n_walking], mode='clip')
+            if check_missing:
+                missing_type = self.missing_type.take(walking)
+                is_nan = np.isnan(values)
+                values = np.where(is_nan & (missing_type != MISSING_NAN), np.float32(0), values)
+                use_default = np.where(missing_type == MISSING_NAN, is_nan,
+                                       (missing_type == MISSING_ZERO) & (np.abs(values) <= ZERO_THRESHOLD))
+            thresholds = np.take(self._threshold32, walking, out=thresholds_buffer[:n_walking], mode='clip')
+            go_right = compare(values, thresholds, out=go_right_buffer[:n_walking])
+            if check_missing:
+                go_right = np.where(use_default, ~self.default_left.take(walking), go_right)
+
+            steps = np.multiply(walking, 2, out=steps_buffer[:n_walking])
+            np.add(steps, go_right, out=steps)
+            if contributions is not None:
+                # Leaves loop back to themselves, so finished paths add zero
+                previous = self.value.take(walking)
+            np.take(flat_children, steps, out=walking, mode='clip')
+            if contributions is not None:
+                contributions += np.bincount(positions, minlength=len(contributions),
+                                             weights=self.value.take(walking) - previous)
+
+            if self._ragged and 2 <= level < self.max_depth - 1:
+                at_leaf = self.is_leaf.take(nodes)
+                if np.count_nonzero(at_leaf) > self.COMPACT_FRACTION * len(nodes):
+                    leaves[pairs[at_leaf]] = nodes[at_leaf]
+                    keep = np.flatnonzero(~at_leaf)
+                    nodes, neg_depths, row_offsets, pairs = (nodes.take(keep), neg_depths.take(keep),
+                                                             row_offsets.take(keep), pairs.take(keep))
+        leaves[pairs] = nodes
+        return leaves.reshape(self.n_trees, n_rows)
+
+    def decision_function(self, features: np.ndarray) -> np.ndarray:
+        """Raw ensemble output (log-odds for a logit link); accepts leading dimensions"""
+        features = np.asarray(features, dtype=np.float32)
+        leading = features.shape[:-1]
+        features = features.reshape(-1, features.shape[-1])
+        raw = np.empty(len(features))
+
+        # Only the sum over trees is needed, so leaves stay in traversal order
+        block_rows = max(1, self.BLOCK_SIZE // max(self.n_trees, 1))
+        for start in range(0, len(features), block_rows):
+            block = features[start:start + block_rows]
+            raw[start:start + len(block)] = self.value.take(self._traverse(block)).sum(axis=0)
+        return (raw + self.base_score).reshape(leading)
+
+    def contributions(self, features: np.ndarray) -> Tuple[np.ndarray, float]:
+        """Per-feature contributions to the raw output (..., n_features) and their base value
+
+        Path attribution (Saabas): every split on a row's path credits its
+        feature with the change in the node's expected value. Contributions
+        plus the base value equal ``decision_function`` exactly.
+        """
+        features = np.asarray(features, dtype=np.float32)
+        leading, n_features = features.shape[:-1], features.shape[-1]
+        features = features.reshape(-1, n_features)
+        contributions = np.zeros((len(features), n_features))
+
+        block_rows = max(1, self.BLOCK_SIZE // max(self.n_trees, 1))
+        for start in range(0, len(features), block_rows):
+            block = features[start:start + block_rows]
+            flat = np.zeros(len(block) * n_features)
+            self._traverse(block, flat)
+            contributions[start:start + len(block)] = flat.reshape(len(block), n_features)
+
+        base = self.base_score + float(self.value[self.roots].sum())
+        return contributions.reshape(leading + (n_features,)), base
+
+    def predict_proba(self, features: np.ndarray) -> np.ndarray:
+        """Probability of default"""
+        raw = self.decision_function(features)
+        if self.link == 'logit':
+            return 1.0 / (1.0 + np.exp(-raw))
+        return raw
+
+    def to_arrays(self) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+        """Arrays and scalar parameters for the artifact format"""
+        arrays = {name: getattr(self, name) for name in self.ARRAYS}
+        params = {
+            'base_score': self.base_score,
+            'max_depth': self.max_depth,
+            'strict_less': self.strict_less,
+            'link': self.link,
+            'feature_names': self.feature_names
+        }
+        return arrays, params
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray], params: Dict[str, Any]) -> 'CompiledTreeEnsemble':
+        return cls(**{name: arrays[name] for name in cls.ARRAYS if name in arrays}, **params)
+
+
+class Scorecard:
+    """Integer points scorecard: per-feature bins, summed as int16
+
+    Bin ``i`` of a feature covers ``edges[i-1] <= x < edges[i]``; missing
+    values get their own last bin. The total score maps back to a default
+    probability through the points-to-double-odds scaling.
+    """
+
+    kind = 'scorecard'
+
+    def __init__(self, edges, edge_offsets, points, point_offsets, offset: float, factor: float,
+                 feature_names: Optional[List[str]] = None):
+        self.edges = np.asarray(edges, dtype=np.float32)
+        self.edge_offsets = np.asarray(edge_offsets, dtype=np.intp)
+        self.points = np.asarray(points, dtype=np.int16)
+        self.point_offsets = np.asarray(point_offsets, dtype=np.intp)
+        self.offset = float(offset)
+        self.factor = float(factor)
+        self.feature_names = list(feature_names or [])
+
+    @property
+    def n_features(self) -> int:
+        return len(self.edge_offsets) - 1
+
+    def feature_edges(self, feature: int) -> np.ndarray:
+        return self.edges[self.edge_offsets[feature]:self.edge_offsets[feature + 1]]
+
+    def feature_points(self, feature: int) -> np.ndarray:
+        """Points per bin of one feature (missing bin last)"""
+        return self.points[self.point_offsets[feature]:self.point_offsets[feature + 1]]
+
+    def bin_indices(self, features: np.ndarray) -> np.ndarray:
+        """Bin of every value, shape (rows, features)"""
+        features = np.asarray(features, dtype=np.float32)
+        bins = np.empty(features.shape, dtype=np.intp)
+        for feature in range(self.n_features):
+            edges = self.feature_edges(feature)
+            values = features[:, feature]
+            bins[:, feature] = np.where(np.isnan(values), len(edges) + 1,
+                                        np.searchsorted(edges, values, side='right'))
+        return bins
+
+    def score(self, features: np.ndarray) -> np.ndarray:
+        """Total points per row: one searchsorted per feature plus an int16 sum"""
+        features = np.asarray(features, dtype=np.float32)
+        leading = features.shape[:-1]
+        features = features.reshape(-1, features.shape[-1])
+
+        # Feature-major copy so each searchsorted reads one contiguous column
+        columns = np.ascontiguousarray(features.T)
+        has_missing = bool(np.isnan(columns).any())
+        total = np.zeros(len(features), dtype=np.int16)
+        for feature, values in enumerate(columns):
+            edges = self.feature_edges(feature)
+            bins = np.searchsorted(edges, values, side='right')
+            if has_missing:
+                bins[np.isnan(values)] = len(edges) + 1
+            total += self.feature_points(feature)[bins]
+        return total.reshape(leading)
+
+    def predict_proba(self, features: np.ndarray) -> np.ndarray:
+        """Probability of default implied by the total score"""
+        return 1.0 / (1.0 + np.exp((self.score(features) - self.offset) / self.factor))
+
+    def contributions(self, features: np.ndarray) -> Tuple[np.ndarray, float]:
+        """Per-feature log-odds contributions (..., n_features) and their base value
+
+        Points are on a "higher is safer" scale, so each feature's points
+        count against default as ``-points / factor``.
+        """
+        features = np.asarray(features, dtype=np.float32)
+        leading, n_features = features.shape[:-1], features.shape[-1]
+        bins = self.bin_indices(features.reshape(-1, n_features))
+        points = self.points[bins + self.point_offsets[:-1]]
+        return (-points / self.factor).reshape(leading + (n_features,)), self.offset / self.factor
+
+    def points_table(self) -> List[Dict[str, Any]]:
+        """One row per bin: feature, lower and upper edge (None if open) and points"""
+        rows = []
+        for feature in range(self.n_features):
+            name = self.feature_names[feature] if self.feature_names else str(feature)
+            bounds = [None] + self.feature_edges(feature).tolist() + [None]
+            for index, points in enumerate(self.feature_points(feature).tolist()):
+                missing = index == len(bounds) - 1
+                rows.append({
+                    'feature': name,
+                    'lower': None if missing else bounds[index],
+                    'upper': None if missing else bounds[index + 1],
+                    'missing': missing,
+                    'points': points
+                })
+        return rows
+
+    def to_arrays(self) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+        """Arrays and scalar parameters for the artifact format"""
+        arrays = {
+            'edges': self.edges,
+            'edge_offsets': self.edge_offsets,
+            'points': self.points,
+            'point_offsets': self.point_offsets
+        }
+        params = {'offset': self.offset, 'factor': self.factor, 'feature_names': self.feature_names}
+        return arrays, params
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray], params: Dict[str, Any]) -> 'Scorecard':
+        return cls(**arrays, **params)
+
+
+class CalibrationTable:
+    """Monotone score-to-probability map stored as a dense interpolation table"""
+
+    kind = 'calibration_table'
+
+    def __init__(self, grid, values):
+        self.grid = np.asarray(grid, dtype=np.float64)
+        self.values = np.asarray(values, dtype=np.float64)
+
+    def apply(self, scores):
+        """Calibrated probabilities; scores outside the grid take the end values"""
+        return np.interp(scores, self.grid, self.values)
+
+    def to_arrays(self) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+        """Arrays and scalar parameters for the artifact format"""
+        return {'grid': self.grid, 'values': self.values}, {}
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray], params: Dict[str, Any]) -> 'CalibrationTable':
+        return cls(arrays['grid'], arrays['values'])
+
+
+class SegmentModel:
+    """Applicant segments as k-means centroids over standardized features"""
+
+    kind = 'segments'
+
+    def __init__(self, centroids, mean, scale, sizes=None, feature_names: Optional[List[str]] = None):
+        self.centroids = np.asarray(centroids, dtype=np.float32)
+        self.mean = np.asarray(mean, dtype=np.float32)
+        self.scale = np.asarray(scale, dtype=np.float32)
+        self.sizes = np.zeros(len(self.centroids), dtype=np.int64) if sizes is None \
+            else np.asarray(sizes, dtype=np.int64)
+        self.feature_names = list(feature_names or [])
+
+    @property
+    def n_segments(self) -> int:
+        return len(self.centroids)
+
+    def assign(self, features: np.ndarray) -> np.ndarray:
+        """Nearest segment for every row of a feature matrix (..., n_features)"""
+        features = np.asarray(features, dtype=np.float32)
+        normalized = ((features - self.mean) / self.scale).reshape(-1, self.centroids.shape[1])
+        segments, _ = nearest_centroid(normalized, self.centroids)
+        return segments.reshape(features.shape[:-1])
+
+    def feature_centers(self) -> np.ndarray:
+        """Segment centroids in original feature units (n_segments, n_features)"""
+        return self.centroids * self.scale + self.mean
+
+    def to_arrays(self) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+        """Arrays and scalar parameters for the artifact format"""
+        arrays = {'centroids': self.centroids, 'mean': self.mean, 'scale': self.scale, 'sizes': self.sizes}
+        return arrays, {'feature_names': self.feature_names}
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray], params: Dict[str, Any]) -> 'SegmentModel':
+        return cls(arrays['centroids'], arrays['mean'], arrays['scale'], arrays['sizes'], params['feature_names'])
+
+
+# Model classes by artifact kind
+MODEL_KINDS = {
+    LinearRiskModel.kind: LinearRiskModel,
+    CompiledTreeEnsemble.kind: CompiledTreeEnsemble,
+    Scorecard.kind: Scorecard,
+    CalibrationTable.kind: CalibrationTable,
+    SegmentModel.kind: SegmentModel
+}
@@ -0,0 +1,149 @@
+"""Scorecard builder: binned weight-of-evidence features and integer points"""
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sklearn.linear_model import LogisticRegression
+
+from .risk_model import Scorecard
+from .training import RiskModelTrainer
+
+
+class ScorecardBuilder(RiskModelTrainer):
+    """Fits a points scorecard from a labeled history file
+
+    Every feature is cut at quantiles of a uniform row sample; the good and
+    bad counts of each bin over the full history come from one
+    ``np.bincount`` per chunk across all features, which gives the
+    weight of evidence (WoE) and information value (IV). A logistic
+    regression on the WoE-encoded sample is then scaled to integer points
+    with the usual points-to-double-the-odds (PDO) convention: a score of
+    ``base_score`` means good:bad odds of ``base_odds``, and every ``pdo``
+    points doubles the odds.
+    """
+
+    def __init__(self, n_bins: int = 10, pdo: float = 20.0, base_score: float = 600.0,
+                 base_odds: float = 50.0, sample_rows: int = 200000, **kwargs):
+        super().__init__(epochs=1, **kwargs)
+        self.n_bins = n_bins
+        self.pdo = pdo
+        self.base_score = base_score
+        self.base_odds = base_odds
+        self.sample_rows = sample_rows
+        self.information_value: Dict[str, float] = {}
+
+    def fit(self, path: str) -> Scorecard:
+        """Build a scorecard from a JSONL or Parquet history file"""
+        sample, sample_labels = self._sample(path)
+        edges, edge_offsets = self.bin_edges(sample)
+
+        point_offsets = edge_offsets + np.arange(len(edge_offsets)) * 2
+        counts = np.zeros(point_offsets[-1])
+        bads = np.zeros(point_offsets[-1])
+        for features, labels in self._labeled_chunks(path):
+            chunk_counts, chunk_bads = self.bin_counts(features, labels, edges, edge_offsets)
+            counts += chunk_counts
+            bads += chunk_bads
+
+        return self.fit_binned(sample, sample_labels, edges, edge_offsets, counts, bads)
+
+    def fit_arrays(self, features: np.ndarray, labels: np.ndarray,
+                   feature_names: Optional[List[str]] = None) -> Scorecard:
+        """Build a scorecard from an in-memory feature matrix"""
+        edges, edge_offsets = self.bin_edges(features)
+        counts, bads = self.bin_counts(features, labels, edges, edge_offsets)
+        return self.fit_binned(features, labels, edges, edge_offsets, counts, bads, feature_names)
+
+    def bin_edges(self, features: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Distinct inner quantiles of every feature, concatenated, with offsets"""
+        quantiles = np.linspace(0, 1, self.n_bins + 1)[1:-1]
+        cuts = np.nanquantile(features, quantiles, axis=0).astype(np.float32)
+        per_feature = [np.unique(cuts[:, feature][~np.isnan(cuts[:, feature])])
+                       for feature in range(features.shape[1])]
+        edge_offsets = np.cumsum([0] + [len(edges) for edges in per_feature])
+        return np.concatenate(per_feature).astype(np.float32), edge_offsets
+
+    @staticmethod
+    def bin_counts(features: np.ndarray, labels: np.ndarray, edges: np.ndarray,
+                   edge_offsets: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Row and default counts per bin of every feature"""
+        point_offsets = edge_offsets + np.arange(len(edge_offsets)) * 2
+        binned = Scorecard(edges, edge_offsets, np.zeros(point_offsets[-1]), point_offsets, 0.0, 1.0)
+        flat_bins = (binned.bin_indices(features) + point_offsets[:-1]).ravel()
+        row_labels = np.broadcast_to(np.asarray(labels, dtype=np.float64)[:, np.newaxis], features.shape).ravel()
+
+        counts = np.bincount(flat_bins, minlength=point_offsets[-1]).astype(np.float64)
+        bads = np.bincount(flat_bins, weights=row_labels, minlength=point_offsets[-1])
+        return counts, bads
+
+    def fit_binned(self, sample: np.ndarray, sample_labels: np.ndarray, edges: np.ndarray,
+                   edge_offsets: np.ndarray, counts: np.ndarray, bads: np.ndarray,
+                   feature_names: Optional[List[str]] = None) -> Scorecard:
+        """Fit the logistic model on WoE-encoded rows and scale it to points"""
+        n_features = len(edge_offsets) - 1
+        feature_names = list(feature_names or self.feature_names)
+        point_offsets = edge_offsets + np.arange(len(edge_offsets)) * 2
+
+        # Every feature sees every row, so the first feature's bins hold the totals
+        total = counts[:point_offsets[1]].sum()
+        total_bad = bads[:point_offsets[1]].sum()
+        if total_bad == 0 or total_bad == total:
+            raise ValueError("Training data needs both defaulted and repaid applications")
+
+        goods = counts - bads
+        good_share = (goods + 0.5) / (total - total_bad)
+        bad_share = (bads + 0.5) / total_bad
+        woe = np.log(good_share / bad_share)
+        iv = np.add.reduceat((good_share - bad_share) * woe, point_offsets[:-1])
+
+        binned = Scorecard(edges, edge_offsets, np.zeros(point_offsets[-1]), point_offsets, 0.0, 1.0)
+        encoded = woe[binned.bin_indices(sample) + point_offsets[:-1]]
+        # Same L2 strength as the SGD trainer's alpha
+        classifier = LogisticRegression(C=1.0 / (self.alpha * len(sample_labels)), max_iter=1000)
+        classifier.fit(encoded, sample_labels)
+
+        factor = self.pdo / np.log(2)
+        offset = self.base_score - factor * np.log(self.base_odds)
+        feature_of_bin = np.repeat(np.arange(n_features), np.diff(point_offsets))
+        points = np.round(offset / n_features - factor * (classifier.coef_[0][feature_of_bin] * woe +
+                                                            classifier.intercept_[0] / n_features))
+
+        feature_max = np.maximum.reduceat(np.abs(points), point_offsets[:-1])
+        if feature_max.sum() > np.iinfo(np.int16).max:
+            raise ValueError("Scorecard points do not fit an int16 total; lower pdo or base_score")
+
+        self.information_value = dict(zip(feature_names, iv.tolist()))
+        self.training_summary = {
+            'n_samples': int(total),
+            'positive_rate': float(total_bad / total),
+            'sample_rows': len(sample_labels),
+            'n_bins': self.n_bins,
+            'pdo': self.pdo,
+            'base_score': self.base_score,
+            'base_odds': self.base_odds,
+            'information_value': self.information_value
+        }
+        return Scorecard(edges, edge_offsets, points.astype(np.int16), point_offsets,
+                         offset, factor, feature_names)
+
+    def _sample(self, path: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Uniform sample of up to ``sample_rows`` labeled rows in one pass
+
+        Each row gets a random key and the rows with the smallest keys are
+        kept, so the sample does not depend on how the file is ordered.
+        """
+        rng = np.random.default_rng(self.random_state)
+        features = np.empty((0, len(self.feature_names)))
+        labels = np.empty(0, dtype=np.int64)
+        keys = np.empty(0)
+
+        for chunk_features, chunk_labels in self._labeled_chunks(path):
+            features = np.concatenate([features, chunk_features])
+            labels = np.concatenate([labels, chunk_labels])
+            keys = np.concatenate([keys, rng.random(len(chunk_labels))])
+            if len(keys) > self.sample_rows:
+                keep = np.argpartition(keys, self.sample_rows)[:self.sample_rows]
+                features, labels, keys = features[keep], labels[keep], keys[keep]
+
+        if len(labels) == 0:
+            raise ValueError(f"No labeled applications in {path}")
+        return features, labels
@@ -0,0 +1,123 @@
+"""Portfolio segmentation with streaming mini-batch k-means"""
+from typing import Any, Callable, Dict, Iterator, Optional
+
+import numpy as np
+
+from data.history import HistoryReader
+from .features import FEATURE_NAMES, build_feature_matrix
+from .kmeans import cluster_sums, kmeans_plus_plus, nearest_centroid
+from .model_registry import ModelRegistry
+from .risk_model import SegmentModel
+from .tuning import FeatureCache
+
+
+class SegmentationJob:
+    """Fits applicant segments over a history file without loading it
+
+    A first pass streams the file once for the exact feature means and
+    standard deviations and keeps a uniform row sample for k-means++
+    seeding. Each following epoch streams the file again in shuffled
+    mini-batches; every mini-batch is assigned with one nearest-centroid
+    lookup and moves each centroid towards the mean of its rows with a
+    per-centroid learning rate of 1 / (rows seen so far). Memory is bounded
+    by ``chunk_size`` and ``sample_rows``, not by the file size.
+
+    Parsing dominates the cost of a JSONL pass, so for repeated fits over a
+    large history ``fit_cache`` streams an already built ``FeatureCache``
+    instead.
+    """
+
+    def __init__(self, n_segments: int = 12, batch_size: int = 4096, epochs: int = 2,
+                 chunk_size: int = 50000, sample_rows: int = 50000, random_state: Optional[int] = 0):
+        if epochs < 1:
+            raise ValueError(f"epochs must be at least 1, got {epochs}")
+        self.n_segments = n_segments
+        self.batch_size = batch_size
+        self.epochs = epochs
+        self.chunk_size = chunk_size
+        self.sample_rows = sample_rows
+        self.random_state = random_state
+        self.training_summary: Dict[str, Any] = {}
+
+    def fit(self, path: str) -> SegmentModel:
+        """Fit segments to a JSONL or Parquet history file"""
+        def chunks():
+            for columns, _ in HistoryReader(path, self.chunk_size, label_field=None):
+                yield build_feature_matrix(columns)
+        return self._fit(chunks, path)
+
+    def fit_cache(self, cache: FeatureCache) -> SegmentModel:
+        """Fit segments to the named (unhashed) features of a memory-mapped feature cache"""
+        def chunks():
+            for start in range(0, cache.n_rows, self.chunk_size):
+                yield cache.features[start:start + self.chunk_size, :len(FEATURE_NAMES)]
+        return self._fit(chunks, cache.directory)
+
+    def _fit(self, chunks: Callable[[], Iterator[np.ndarray]], source: str) -> SegmentModel:
+        rng = np.random.default_rng(self.random_state)
+        mean, scale, sample, n_rows = self._scan(chunks(), source, rng)
+        centroids = kmeans_plus_plus((sample - mean) / scale, self.n_segments, rng)
+        seen = np.zeros(self.n_segments)
+
+        for _ in range(self.epochs):
+            # Segment sizes and inertia are measured during the last epoch
+            sizes = np.zeros(self.n_segments, dtype=np.int64)
+            inertia = 0.0
+            for batch in self._batches(chunks(), rng):
+                batch = (batch - mean) / scale
+                labels, distances = nearest_centroid(batch.astype(np.float32), centroids.astype(np.float32))
+                sums, counts = cluster_sums(batch, labels, self.n_segments)
+                seen += counts
+                moved = counts > 0
+                centroids[moved] += (sums[moved] - counts[moved, np.newaxis] * centroids[moved]) \
+                    / seen[moved, np.newaxis]
+                sizes += counts.astype(np.int64)
+                inertia += float(distances.sum())
+
+        self.training_summary = {
+            'n_rows': n_rows,
+            'n_segments': self.n_segments,
+            'epochs': self.epochs,
+            'inertia_per_row': inertia / max(n_rows, 1),
+            'segment_sizes': sizes.tolist()
+        }
+        return SegmentModel(centroids, mean, scale, sizes, FEATURE_NAMES)
+
+    def fit_and_register(self, path: str, registry: ModelRegistry,
+                         metadata: Optional[Dict[str, Any]] = None) -> str:
+        """Fit and save the segments as a new registry version"""
+        model = self.fit(path)
+        metadata = dict(metadata or {})
+        metadata.update({'training_data': path, **self.training_summary})
+        return registry.save(model, metadata)
+
+    def _scan(self, chunks: Iterator[np.ndarray], source: str, rng: np.random.Generator):
+        """Exact feature mean and scale plus a uniform row sample, in one pass"""
+        n_features = len(FEATURE_NAMES)
+        total, total_squares, n_rows = np.zeros(n_features), np.zeros(n_features), 0
+        sample, keys = np.empty((0, n_features)), np.empty(0)
+        for features in chunks:
+            features = np.asarray(features, dtype=np.float64)
+            total += features.sum(axis=0)
+            total_squares += np.square(features).sum(axis=0)
+            n_rows += len(features)
+
+            sample = np.concatenate([sample, features])
+            keys = np.concatenate([keys, rng.random(len(features))])
+            if len(keys) > self.sample_rows:
+                keep = np.argpartition(keys, self.sample_rows)[:self.sample_rows]
+                sample, keys = sample[keep], keys[keep]
+
+        if n_rows < self.n_segments:
+            raise ValueError(f"Need at least {self.n_segments} applications in {source}, got {n_rows}")
+        mean = total / n_rows
+        scale = np.sqrt(np.maximum(total_squares / n_rows - mean ** 2, 0))
+        scale[scale == 0] = 1.0
+        return mean, scale, sample, n_rows
+
+    def _batches(self, chunks: Iterator[np.ndarray], rng: np.random.Generator) -> Iterator[np.ndarray]:
+        """Shuffled mini-batches of raw feature rows, one chunk at a time"""
+        for features in chunks:
+            features = np.asarray(features, dtype=np.float64)[rng.permutation(len(features))]
+            for start in range(0, len(features), self.batch_size):
+                yield features[start:start + self.batch_size]
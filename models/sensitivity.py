@@ -0,0 +1,77 @@
+"""What-if sensitivity of one application's decision to its inputs"""
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from data.data_processor import DataProcessor
+from .batch_scorer import BatchScorer
+
+# Outputs kept on the grid
+SENSITIVITY_OUTPUTS = ['risk_score', 'credit_score', 'approved', 'interest_rate', 'monthly_payment',
+                       'recommended_amount', 'approval_probability']
+
+MAX_SENSITIVITY_FIELDS = 3
+
+
+@dataclass
+class SensitivityResult:
+    """Scores over a Cartesian grid of input values
+
+    Each output has one axis per varied field, in ``fields`` order, and
+    ``values[i]`` gives the input values along axis ``i``.
+    """
+    fields: List[str]
+    values: List[np.ndarray]
+    outputs: Dict[str, np.ndarray]
+
+    @property
+    def shape(self):
+        return tuple(len(values) for values in self.values)
+
+
+class SensitivityAnalyzer:
+    """Scores one application over a grid of up to three varied input fields
+
+    The grid is flattened into ordinary batch columns (every other field is
+    repeated), scored with one call each to the batch scorer's risk, credit
+    and recommender analyzers, and the outputs are reshaped back onto the
+    grid axes.
+    """
+
+    def __init__(self, scorer: Optional[BatchScorer] = None,
+                 data_processor: Optional[DataProcessor] = None):
+        self.scorer = scorer or BatchScorer()
+        self.data_processor = data_processor or DataProcessor()
+
+    def analyze(self, application: Dict[str, Any], ranges: Dict[str, np.ndarray]) -> SensitivityResult:
+        """Scores for every combination of the given field values"""
+        if not 1 <= len(ranges) <= MAX_SENSITIVITY_FIELDS:
+            raise ValueError(f"Between 1 and {MAX_SENSITIVITY_FIELDS} fields can be varied, got {len(ranges)}")
+        columns = self.data_processor.process_batch([application])
+        for field in ranges:
+            if field not in columns or columns[field].dtype.kind != 'f':
+                raise ValueError(f"Cannot vary non-numeric or unknown field '{field}'")
+
+        fields = list(ranges)
+        values = [np.asarray(ranges[field], dtype=np.float64).ravel() for field in fields]
+        shape = tuple(len(axis) for axis in values)
+        size = int(np.prod(shape))
+
+        grid = {field: np.repeat(column, size) for field, column in columns.items()}
+        for field, axis in zip(fields, np.meshgrid(*values, indexing='ij')):
+            grid[field] = axis.ravel()
+
+        risk_scores = self.scorer.risk_analyzer.calculate_risk_scores(grid)
+        credit_scores = self.scorer.credit_scorer.calculate_credit_scores(grid)
+        results = {
+            'risk_score': risk_scores,
+            'credit_score': credit_scores,
+            'approved': BatchScorer.approval_decision(risk_scores, credit_scores, self.scorer.approval_threshold,
+                                                      self.scorer.min_approval_score)
+        }
+        results.update(self.scorer.loan_recommender.recommend_batch(grid, risk_scores))
+
+        outputs = {name: np.asarray(results[name]).reshape(shape)
+                   for name in SENSITIVITY_OUTPUTS if name in results}
+        return SensitivityResult(fields=fields, values=values, outputs=outputs)
@@ -0,0 +1,102 @@
+"""Asynchronous shadow scoring of a challenger risk model"""
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from data.data_processor import DataProcessor
+from .batch_scorer import BatchScorer
+from .risk_analyzer import RiskAnalyzer
+
+
+class ShadowScorer:
+    """Scores a sample of live applications with a challenger off the request path
+
+    ``submit`` returns at once: work runs on a small thread pool, and at most
+    ``max_pending`` applications may be queued or running. When that bound
+    is reached the application is dropped and counted instead of queued, so
+    a slow challenger can never build up a backlog or hold up decisions.
+    Only disagreements are logged, one short JSON line each: a different
+    decision, or risk scores further apart than ``risk_tolerance``.
+    The challenger scores through its batch path, which raises on failure
+    rather than falling back to a neutral score, so broken challengers show
+    up in ``counts['errors']`` instead of as disagreements.
+    """
+
+    def __init__(self, challenger: RiskAnalyzer, log_path: str, sample_rate: float = 0.1,
+                 max_workers: int = 2, max_pending: int = 16, risk_tolerance: float = 0.05,
+                 seed: Optional[int] = None):
+        self.challenger = challenger
+        self.log_path = log_path
+        self.sample_rate = sample_rate
+        self.risk_tolerance = risk_tolerance
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='shadow')
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._rng = np.random.default_rng(seed)
+        self._processor = DataProcessor()
+        self._lock = threading.Lock()
+        self.counts = {'seen': 0, 'scored': 0, 'dropped': 0, 'disagreements': 0, 'errors': 0}
+
+        log_dir = os.path.dirname(log_path)
+        if log_dir:
+            os.makedirs(log_dir, exist_ok=True)
+
+    def submit(self, application: Dict[str, Any], risk_score: float, credit_score: float,
+               approved: bool, application_id: Optional[str] = None) -> bool:
+        """Queue an application for shadow scoring; returns whether it was accepted"""
+        with self._lock:
+            self.counts['seen'] += 1
+            sampled = self._rng.random() < self.sample_rate
+        if not sampled:
+            return False
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.counts['dropped'] += 1
+            return False
+
+        try:
+            future = self._executor.submit(self._score, application, risk_score, credit_score,
+                                           approved, application_id)
+        except RuntimeError:
+            # Executor already shut down
+            self._slots.release()
+            return False
+        future.add_done_callback(lambda _: self._slots.release())
+        return True
+
+    def _score(self, application: Dict[str, Any], risk_score: float, credit_score: float,
+               approved: bool, application_id: Optional[str]) -> None:
+        try:
+            columns = self._processor.process_batch([application])
+            shadow_risk = float(self.challenger.calculate_risk_scores(columns)[0])
+            shadow_approved = bool(BatchScorer.approval_decision(shadow_risk, credit_score))
+        except Exception:
+            with self._lock:
+                self.counts['errors'] += 1
+            return
+
+        disagrees = shadow_approved != approved or abs(shadow_risk - risk_score) > self.risk_tolerance
+        record = None
+        if disagrees:
+            record = {
+                't': round(time.time(), 3),
+                'id': application_id,
+                'v': self.challenger.model_version,
+                'risk': [round(float(risk_score), 4), round(float(shadow_risk), 4)],
+                'approved': [bool(approved), shadow_approved]
+            }
+
+        with self._lock:
+            self.counts['scored'] += 1
+            if record is not None:
+                self.counts['disagreements'] += 1
+                with open(self.log_path, 'a') as f:
+                    f.write(json.dumps(record, separators=(',', ':')) + '\n')
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop accepting work, optionally waiting for running shadow scores"""
+        self._executor.shutdown(wait=wait, cancel_futures=not wait)
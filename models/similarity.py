@@ -0,0 +1,192 @@
+"""Similar-applicant search over normalized feature vectors"""
+import json
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from data.history import HistoryReader
+from .feature_hashing import FeatureHasher
+from .features import build_feature_matrix, feature_names
+from .kmeans import kmeans, nearest_centroid, squared_distances
+
+
+class SimilarApplicantIndex:
+    """Inverted-file (IVF) nearest-neighbour index of past applications
+
+    Feature vectors are standardized and assigned to the nearest of
+    ``n_lists`` k-means centroids; each centroid owns a growing list of the
+    vectors assigned to it, with their ids and outcomes. A query ranks the
+    centroids, takes every vector in the ``n_probe`` closest lists as a
+    candidate and re-ranks those candidates by exact distance, so only a
+    ``n_probe / n_lists`` share of the index is scanned. Inserts append to
+    the lists in place and never retrain the centroids.
+    """
+
+    def __init__(self, centroids: np.ndarray, mean: np.ndarray, scale: np.ndarray,
+                 hasher: Optional[FeatureHasher] = None):
+        self.centroids = np.asarray(centroids, dtype=np.float32)
+        self.mean = np.asarray(mean, dtype=np.float32)
+        self.scale = np.asarray(scale, dtype=np.float32)
+        self.hasher = hasher
+        self.feature_names = feature_names(hasher)
+
+        n_lists, dims = self.centroids.shape
+        self._sizes = np.zeros(n_lists, dtype=np.int64)
+        self._vectors = [np.empty((0, dims), dtype=np.float32) for _ in range(n_lists)]
+        self._ids = [np.empty(0, dtype=np.int64) for _ in range(n_lists)]
+        self._outcomes = [np.empty(0, dtype=np.float32) for _ in range(n_lists)]
+        self._next_id = 0
+
+    @property
+    def n_lists(self) -> int:
+        return len(self.centroids)
+
+    def __len__(self) -> int:
+        return int(self._sizes.sum())
+
+    @classmethod
+    def train(cls, features: np.ndarray, n_lists: int = 1024, hasher: Optional[FeatureHasher] = None,
+              random_state: Optional[int] = 0) -> 'SimilarApplicantIndex':
+        """Empty index with normalization and centroids fitted to a feature sample"""
+        features = np.asarray(features, dtype=np.float64)
+        mean = features.mean(axis=0)
+        scale = features.std(axis=0)
+        scale[scale == 0] = 1.0
+        if hasher is not None:
+            mean[-hasher.n_features:], scale[-hasher.n_features:] = 0.0, 1.0
+        centroids = kmeans((features - mean) / scale, min(n_lists, len(features)), random_state=random_state)
+        return cls(centroids, mean, scale, hasher)
+
+    @classmethod
+    def from_history(cls, path: str, n_lists: int = 1024, sample_rows: int = 200000,
+                     chunk_size: int = 50000, label_field: Optional[str] = 'defaulted',
+                     hasher: Optional[FeatureHasher] = None,
+                     random_state: Optional[int] = 0) -> 'SimilarApplicantIndex':
+        """Train on a uniform row sample of a history file, then insert every row
+
+        Ids are row numbers in the file; outcomes come from ``label_field``.
+        """
+        rng = np.random.default_rng(random_state)
+        sample = np.empty((0, len(feature_names(hasher))))
+        keys = np.empty(0)
+        for columns, _ in HistoryReader(path, chunk_size, label_field=None):
+            sample = np.concatenate([sample, build_feature_matrix(columns, hasher)])
+            keys = np.concatenate([keys, rng.random(len(sample) - len(keys))])
+            if len(keys) > sample_rows:
+                keep = np.argpartition(keys, sample_rows)[:sample_rows]
+                sample, keys = sample[keep], keys[keep]
+
+        if len(sample) == 0:
+            raise ValueError(f"No applications in {path}")
+        index = cls.train(sample, n_lists, hasher, random_state)
+        for columns, labels in HistoryReader(path, chunk_size, label_field):
+            index.add(columns, outcomes=labels)
+        return index
+
+    def normalize(self, features: np.ndarray) -> np.ndarray:
+        """Standardized float32 vectors from a raw feature matrix"""
+        return ((np.asarray(features, dtype=np.float32) - self.mean) / self.scale).astype(np.float32)
+
+    def add(self, columns: Dict[str, np.ndarray], ids: Optional[np.ndarray] = None,
+            outcomes: Optional[np.ndarray] = None) -> np.ndarray:
+        """Insert a batch of DataProcessor columns; returns the ids used"""
+        return self.add_vectors(self.normalize(build_feature_matrix(columns, self.hasher)), ids, outcomes)
+
+    def add_vectors(self, vectors: np.ndarray, ids: Optional[np.ndarray] = None,
+                    outcomes: Optional[np.ndarray] = None) -> np.ndarray:
+        """Insert normalized vectors; ids default to consecutive insert numbers"""
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.centroids.shape[1])
+        if ids is None:
+            ids = np.arange(self._next_id, self._next_id + len(vectors), dtype=np.int64)
+        ids = np.asarray(ids, dtype=np.int64)
+        self._next_id = max(self._next_id, int(ids.max()) + 1) if len(ids) else self._next_id
+        outcomes = np.full(len(vectors), np.nan, dtype=np.float32) if outcomes is None \
+            else np.asarray(outcomes, dtype=np.float32)
+
+        assignments, _ = nearest_centroid(vectors, self.centroids)
+        order = np.argsort(assignments, kind='stable')
+        lists, starts = np.unique(assignments[order], return_index=True)
+        for list_id, rows in zip(lists, np.split(order, starts[1:])):
+            self._append(list_id, vectors[rows], ids[rows], outcomes[rows])
+        return ids
+
+    def _append(self, list_id: int, vectors: np.ndarray, ids: np.ndarray, outcomes: np.ndarray) -> None:
+        """Append to one list, doubling its capacity when full"""
+        size, needed = self._sizes[list_id], self._sizes[list_id] + len(ids)
+        if needed > len(self._ids[list_id]):
+            capacity = max(needed, 2 * len(self._ids[list_id]), 64)
+            for store in (self._vectors, self._ids, self._outcomes):
+                grown = np.empty((capacity,) + store[list_id].shape[1:], dtype=store[list_id].dtype)
+                grown[:size] = store[list_id][:size]
+                store[list_id] = grown
+        self._vectors[list_id][size:needed] = vectors
+        self._ids[list_id][size:needed] = ids
+        self._outcomes[list_id][size:needed] = outcomes
+        self._sizes[list_id] = needed
+
+    def search(self, columns: Dict[str, np.ndarray], k: int = 10,
+               n_probe: int = 8) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Ids, distances and outcomes (queries, k) of the nearest stored applications"""
+        return self.search_vectors(self.normalize(build_feature_matrix(columns, self.hasher)), k, n_probe)
+
+    def search_vectors(self, queries: np.ndarray, k: int = 10,
+                       n_probe: int = 8) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Nearest neighbours of normalized query vectors, closest first
+
+        Missing neighbours (fewer than ``k`` candidates) have id -1 and an
+        infinite distance.
+        """
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, self.centroids.shape[1])
+        n_probe = min(n_probe, self.n_lists)
+        probes = np.argpartition(squared_distances(queries, self.centroids), n_probe - 1, axis=1)[:, :n_probe]
+
+        ids = np.full((len(queries), k), -1, dtype=np.int64)
+        distances = np.full((len(queries), k), np.inf, dtype=np.float32)
+        outcomes = np.full((len(queries), k), np.nan, dtype=np.float32)
+        for row, query in enumerate(queries):
+            lists = [list_id for list_id in probes[row] if self._sizes[list_id]]
+            if not lists:
+                continue
+            candidate_distances = np.concatenate([
+                squared_distances(query[np.newaxis], self._vectors[list_id][:self._sizes[list_id]])[0]
+                for list_id in lists
+            ])
+            found = min(k, len(candidate_distances))
+            best = np.argpartition(candidate_distances, found - 1)[:found]
+            best = best[np.argsort(candidate_distances[best], kind='stable')]
+
+            candidate_ids = np.concatenate([self._ids[list_id][:self._sizes[list_id]] for list_id in lists])
+            candidate_outcomes = np.concatenate([self._outcomes[list_id][:self._sizes[list_id]] for list_id in lists])
+            ids[row, :found] = candidate_ids[best]
+            distances[row, :found] = np.sqrt(candidate_distances[best])
+            outcomes[row, :found] = candidate_outcomes[best]
+        return ids, distances, outcomes
+
+    def save(self, path: str) -> None:
+        """Save centroids, normalization and the list contents to an .npz file"""
+        sizes = self._sizes
+        arrays = {
+            'centroids': self.centroids, 'mean': self.mean, 'scale': self.scale, 'sizes': sizes,
+            'vectors': np.concatenate([self._vectors[i][:sizes[i]] for i in range(self.n_lists)]),
+            'ids': np.concatenate([self._ids[i][:sizes[i]] for i in range(self.n_lists)]),
+            'outcomes': np.concatenate([self._outcomes[i][:sizes[i]] for i in range(self.n_lists)]),
+        }
+        if self.hasher is not None:
+            arrays['feature_hashing'] = np.array(json.dumps(self.hasher.config()))
+        np.savez(path, **arrays)
+
+    @classmethod
+    def load(cls, path: str) -> 'SimilarApplicantIndex':
+        """Load an index saved with save()"""
+        with np.load(path) as data:
+            hasher = None
+            if 'feature_hashing' in data.files:
+                hasher = FeatureHasher.from_config(json.loads(str(data['feature_hashing'])))
+            index = cls(data['centroids'], data['mean'], data['scale'], hasher)
+            offsets = np.concatenate([[0], np.cumsum(data['sizes'])])
+            vectors, ids, outcomes = data['vectors'], data['ids'], data['outcomes']
+            for list_id in np.flatnonzero(data['sizes']):
+                rows = slice(offsets[list_id], offsets[list_id + 1])
+                index._append(list_id, vectors[rows], ids[rows], outcomes[rows])
+            index._next_id = int(ids.max()) + 1 if len(ids) else 0
+        return index
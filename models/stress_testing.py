@@ -0,0 +1,201 @@
+"""Macro stress testing of a scored loan portfolio"""
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from utils.helpers import batch_size
+from .batch_scorer import BatchScorer
+from .indicator_store import INDICATORS
+from .loan_recommender import CREDIT_TIERS
+
+
+@dataclass
+class Scenario:
+    """Macro shock definition
+
+    State shocks are keyed by state code, or '*' for every state (including
+    the default used for states without data). Rate shifts are keyed by
+    credit tier, or '*' for every tier.
+    """
+    name: str
+    state_shifts: Dict[str, Dict[str, float]] = field(default_factory=dict)
+    state_multipliers: Dict[str, Dict[str, float]] = field(default_factory=dict)
+    income_multiplier: float = 1.0
+    rate_shifts: Dict[str, float] = field(default_factory=dict)
+
+
+@dataclass
+class StressTestResult:
+    """Portfolio impact of a single scenario"""
+    scenario: str
+    baseline_approval_rate: float
+    stressed_approval_rate: float
+    approvals_lost: int
+    approvals_gained: int
+    baseline_avg_risk: float
+    stressed_avg_risk: float
+    baseline_expected_loss: float
+    stressed_expected_loss: float
+
+    @property
+    def approval_rate_delta(self) -> float:
+        return self.stressed_approval_rate - self.baseline_approval_rate
+
+    @property
+    def risk_delta(self) -> float:
+        return self.stressed_avg_risk - self.baseline_avg_risk
+
+    @property
+    def expected_loss_delta(self) -> float:
+        return self.stressed_expected_loss - self.baseline_expected_loss
+
+
+class StressTestEngine:
+    """Rescores a stored portfolio under many macro scenarios in one broadcasted pass
+
+    Location risk is not part of the approval rule, so state indicator shocks
+    reach the decision through an overlay: each loan's risk score moves by
+    ``location_sensitivity`` times the change in its location risk.
+    """
+
+    def __init__(self, scorer: Optional[BatchScorer] = None, location_sensitivity: float = 0.5,
+                 memory_budget_mb: float = 256.0):
+        self.scorer = scorer or BatchScorer()
+        self.location_sensitivity = location_sensitivity
+        self.memory_budget_mb = memory_budget_mb
+
+    def run(self, columns: Dict[str, np.ndarray], scenarios: List[Scenario]) -> List[StressTestResult]:
+        """Evaluate all scenarios against a portfolio of columns"""
+        n_loans = batch_size(columns)
+        n_scenarios = len(scenarios)
+        state_values, rate_table = self._scenario_tables(scenarios)
+        income_multipliers = np.array([s.income_multiplier for s in scenarios])[:, np.newaxis]
+
+        # Running totals per scenario
+        baseline_approved = 0
+        baseline_risk = 0.0
+        baseline_loss = 0.0
+        stressed_approved = np.zeros(n_scenarios)
+        stressed_risk = np.zeros(n_scenarios)
+        stressed_loss = np.zeros(n_scenarios)
+        lost = np.zeros(n_scenarios, dtype=np.int64)
+        gained = np.zeros(n_scenarios, dtype=np.int64)
+
+        chunk_size = self._chunk_size(n_scenarios)
+        for start in range(0, n_loans, chunk_size):
+            chunk = {name: values[start:start + chunk_size] for name, values in columns.items()}
+
+            baseline = self.scorer.score(chunk)
+            stressed = self._score_stressed(chunk, baseline, state_values, rate_table, income_multipliers)
+
+            baseline_approved += int(baseline['approved'].sum())
+            baseline_risk += float(baseline['risk_score'].sum())
+            baseline_loss += float(baseline['expected_loss'].sum())
+            stressed_approved += stressed['approved'].sum(axis=1)
+            stressed_risk += stressed['risk_score'].sum(axis=1)
+            stressed_loss += stressed['expected_loss'].sum(axis=1)
+            lost += (baseline['approved'] & ~stressed['approved']).sum(axis=1)
+            gained += (~baseline['approved'] & stressed['approved']).sum(axis=1)
+
+        n = max(n_loans, 1)
+        return [
+            StressTestResult(
+                scenario=scenario.name,
+                baseline_approval_rate=baseline_approved / n,
+                stressed_approval_rate=float(stressed_approved[i]) / n,
+                approvals_lost=int(lost[i]),
+                approvals_gained=int(gained[i]),
+                baseline_avg_risk=baseline_risk / n,
+                stressed_avg_risk=float(stressed_risk[i]) / n,
+                baseline_expected_loss=baseline_loss,
+                stressed_expected_loss=float(stressed_loss[i])
+            )
+            for i, scenario in enumerate(scenarios)
+        ]
+
+    def _score_stressed(self, chunk, baseline, state_values, rate_table, income_multipliers):
+        """Score one chunk under every scenario; outputs have shape (scenarios, loans)"""
+        scorer = self.scorer
+
+        # Stressed location risk from the shocked state table
+        positions = self._state_positions(chunk['state'])
+        indicators = {name: values[:, positions] for name, values in state_values.items()}
+        location_risk = scorer.geo_analyzer.calculate_location_risk(
+            indicators['unemployment'], indicators['median_income'], indicators['crime_rate']
+        )
+
+        # Applicant income shocks flow through the regular vectorized scorers
+        stressed_columns = dict(chunk)
+        stressed_columns['annual_income'] = chunk['annual_income'] * income_multipliers
+        risk_scores = scorer.risk_analyzer.calculate_risk_scores(stressed_columns)
+        risk_scores = np.clip(
+            risk_scores + self.location_sensitivity * (location_risk - baseline['location_risk']), 0.0, 1.0
+        )
+
+        recommendation = scorer.loan_recommender.recommend_batch(stressed_columns, risk_scores, rate_table)
+        recommendation['risk_score'] = risk_scores
+        expected_loss = scorer.expected_loss_model.calculate_batch(chunk, recommendation)
+        return {
+            'risk_score': risk_scores,
+            'approved': scorer.approval_decision(risk_scores, baseline['credit_score'],
+                                               scorer.approval_threshold, scorer.min_approval_score),
+            'expected_loss': expected_loss['expected_loss']
+        }
+
+    def _scenario_tables(self, scenarios: List[Scenario]):
+        """Shocked state indicators (scenario x state, default last) and base rates"""
+        geo = self.scorer.geo_analyzer
+        table = geo.state_table()
+        codes = list(table['codes']) + ['*']
+
+        state_values = {}
+        for name in INDICATORS:
+            base = np.append(table[name], geo.default_state_data[name])
+            values = np.tile(base, (len(scenarios), 1))
+            for i, scenario in enumerate(scenarios):
+                for state, shocks in scenario.state_multipliers.items():
+                    self._apply(values[i], codes, self._state_code(state), shocks.get(name), np.multiply)
+                for state, shocks in scenario.state_shifts.items():
+                    self._apply(values[i], codes, self._state_code(state), shocks.get(name), np.add)
+            state_values[name] = values
+
+        base_rates = np.array([self.scorer.loan_recommender.base_rates[tier] for tier in CREDIT_TIERS])
+        rate_table = np.tile(base_rates, (len(scenarios), 1))
+        for i, scenario in enumerate(scenarios):
+            for tier, shift in scenario.rate_shifts.items():
+                if tier == '*':
+                    rate_table[i] += shift
+                else:
+                    rate_table[i, CREDIT_TIERS.index(tier)] += shift
+
+        return state_values, rate_table
+
+    def _state_code(self, state: str) -> str:
+        """Canonical code for a scenario state key ('*' passes through)"""
+        if state == '*':
+            return state
+        return self.scorer.geo_analyzer.location_index.normalize_state(state) or state
+
+    @staticmethod
+    def _apply(row: np.ndarray, codes: List[str], state: str, shock: Optional[float], op) -> None:
+        """Apply a shock to one state (or all states with '*') in place"""
+        if shock is None:
+            return
+        if state == '*':
+            row[:] = op(row, shock)
+        elif state in codes:
+            index = codes.index(state)
+            row[index] = op(row[index], shock)
+
+    def _state_positions(self, states) -> np.ndarray:
+        """Column of the shocked state table for each loan (last column for unknown states)"""
+        codes = self.scorer.geo_analyzer.state_table()['codes']
+        states = np.asarray(states, dtype='<U2')
+        positions = np.minimum(np.searchsorted(codes, states), len(codes) - 1)
+        return np.where(codes[positions] == states, positions, len(codes))
+
+    def _chunk_size(self, n_scenarios: int) -> int:
+        """Loans per chunk so that roughly 24 float64 (scenario x loan) arrays fit the budget"""
+        bytes_per_loan = max(n_scenarios, 1) * 8 * 24
+        return max(1, int(self.memory_budget_mb * 1024 * 1024 / bytes_per_loan))
@@ -0,0 +1,116 @@
+"""Out-of-core training of the risk model from labeled history"""
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from data.history import HistoryReader
+from .feature_hashing import FeatureHasher
+from .features import build_feature_matrix, feature_names
+from .model_registry import ModelRegistry
+from .risk_model import LinearRiskModel
+
+
+class RiskModelTrainer:
+    """Fits a logistic risk model incrementally over chunks of stored applications
+
+    The first pass over the history accumulates feature moments for
+    standardization; each following epoch streams the chunks again through
+    ``SGDClassifier.partial_fit``. Only one chunk is held in memory at a time.
+
+    With a ``hasher`` the hashed city/ZIP buckets are appended to the
+    features; they are left unstandardized, since a bucket's spread only
+    reflects how often its values occur.
+    """
+
+    def __init__(self, chunk_size: int = 50000, epochs: int = 3, alpha: float = 1e-4,
+                 label_field: str = 'defaulted', random_state: int = 0,
+                 hasher: Optional[FeatureHasher] = None, penalty: str = 'l2', l1_ratio: float = 0.15):
+        self.hasher = hasher
+        self.feature_names = feature_names(hasher)
+        self.chunk_size = chunk_size
+        self.epochs = epochs
+        self.alpha = alpha
+        self.penalty = penalty
+        self.l1_ratio = l1_ratio
+        self.label_field = label_field
+        self.random_state = random_state
+        self.training_summary: Dict[str, Any] = {}
+
+    def fit(self, path: str) -> LinearRiskModel:
+        """Train on a JSONL or Parquet history file"""
+        mean, scale, n_samples, n_positive = self._feature_moments(path)
+
+        from sklearn.linear_model import SGDClassifier  # training only; keeps sklearn out of scoring imports
+        classifier = SGDClassifier(loss='log_loss', alpha=self.alpha, penalty=self.penalty,
+                                   l1_ratio=self.l1_ratio, random_state=self.random_state)
+        rng = np.random.default_rng(self.random_state)
+        loss_sum = 0.0
+
+        for epoch in range(self.epochs):
+            loss_sum = 0.0
+            for features, labels in self._labeled_chunks(path):
+                standardized = (features - mean) / scale
+                order = rng.permutation(len(labels))
+
+                # Progressive validation: score each chunk before learning from it
+                if epoch == self.epochs - 1 and hasattr(classifier, 'coef_'):
+                    probabilities = np.clip(classifier.predict_proba(standardized)[:, 1], 1e-12, 1 - 1e-12)
+                    loss_sum -= np.sum(labels * np.log(probabilities) + (1 - labels) * np.log(1 - probabilities))
+
+                classifier.partial_fit(standardized[order], labels[order], classes=np.array([0, 1]))
+
+        self.training_summary = {
+            'n_samples': n_samples,
+            'positive_rate': n_positive / max(n_samples, 1),
+            'epochs': self.epochs,
+            'progressive_log_loss': loss_sum / max(n_samples, 1) if self.epochs > 1 else None,
+            'sgd_steps': float(classifier.t_)
+        }
+        return LinearRiskModel(classifier.coef_[0], classifier.intercept_[0], mean, scale, self.feature_names)
+
+    def train_and_register(self, path: str, registry: ModelRegistry,
+                           metadata: Optional[Dict[str, Any]] = None) -> str:
+        """Train and save the model as a new registry version"""
+        model = self.fit(path)
+        metadata = dict(metadata or {})
+        if self.hasher is not None:
+            metadata['feature_hashing'] = self.hasher.config()
+        metadata.update({
+            'training_data': path,
+            'feature_names': self.feature_names,
+            'alpha': self.alpha,
+            'penalty': self.penalty,
+            'l1_ratio': self.l1_ratio,
+            **self.training_summary
+        })
+        return registry.save(model, metadata)
+
+    def _labeled_chunks(self, path: str):
+        """Feature matrices and labels per chunk, skipping unlabeled rows"""
+        for columns, labels in HistoryReader(path, self.chunk_size, self.label_field):
+            if labels is None:
+                continue
+            labeled = ~np.isnan(labels)
+            features = build_feature_matrix(columns, self.hasher)[labeled]
+            yield features.astype(np.float64), labels[labeled].astype(np.int64)
+
+    def _feature_moments(self, path: str) -> Tuple[np.ndarray, np.ndarray, int, int]:
+        """Streaming mean and standard deviation of every feature"""
+        count, n_positive = 0, 0
+        total = np.zeros(len(self.feature_names))
+        total_sq = np.zeros(len(self.feature_names))
+        for features, labels in self._labeled_chunks(path):
+            count += len(labels)
+            n_positive += int(labels.sum())
+            total += features.sum(axis=0)
+            total_sq += np.square(features).sum(axis=0)
+
+        if count == 0:
+            raise ValueError(f"No labeled applications in {path}")
+
+        mean = total / count
+        variance = np.maximum(total_sq / count - np.square(mean), 0.0)
+        scale = np.where(variance > 0, np.sqrt(variance), 1.0)
+        if self.hasher is not None:
+            mean[-self.hasher.n_features:], scale[-self.hasher.n_features:] = 0.0, 1.0
+        return mean, scale, count, n_positive
@@ -0,0 +1,243 @@
+"""Compile trained tree ensembles into flat arrays for NumPy inference"""
+import json
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .risk_model import MISSING_NAN, MISSING_NONE, MISSING_ZERO, CompiledTreeEnsemble
+
+
+def compile_model(model: Any, feature_names: Optional[List[str]] = None) -> CompiledTreeEnsemble:
+    """Compile a scikit-learn, LightGBM or XGBoost binary classifier"""
+    module = type(model).__module__
+    if module.startswith('sklearn'):
+        if hasattr(model, '_predictors'):
+            return compile_sklearn_hist_gradient_boosting(model, feature_names)
+        return compile_sklearn_gradient_boosting(model, feature_names)
+    if module.startswith('lightgbm'):
+        return compile_lightgbm(getattr(model, 'booster_', model), feature_names)
+    if module.startswith('xgboost'):
+        booster = model.get_booster() if hasattr(model, 'get_booster') else model
+        return compile_xgboost(booster, feature_names)
+    raise TypeError(f"Unsupported model type: {type(model).__name__}")
+
+
+def compile_sklearn_gradient_boosting(model, feature_names: Optional[List[str]] = None) -> CompiledTreeEnsemble:
+    """GradientBoostingClassifier (binary)"""
+    trees = []
+    for estimator in model.estimators_[:, 0]:
+        tree = estimator.tree_
+        is_leaf = tree.children_left < 0
+        trees.append({
+            'feature': np.where(is_leaf, 0, tree.feature),
+            'threshold': np.where(is_leaf, 0.0, tree.threshold),
+            'left': tree.children_left,
+            'right': tree.children_right,
+            # Internal nodes keep pre-update values; _flatten refills them from the leaves by cover
+            'value': np.where(is_leaf, tree.value[:, 0, 0] * model.learning_rate, np.nan),
+            'cover': tree.weighted_n_node_samples,
+            'default_left': getattr(tree, 'missing_go_to_left', np.ones(tree.node_count, dtype=np.uint8)) != 0
+        })
+    return _calibrate_base_score(model, _flatten(trees, strict_less=False, feature_names=feature_names))
+
+
+def compile_sklearn_hist_gradient_boosting(model, feature_names: Optional[List[str]] = None) -> CompiledTreeEnsemble:
+    """HistGradientBoostingClassifier (binary, numeric splits only)"""
+    trees = []
+    for predictors in model._predictors:
+        nodes = predictors[0].nodes
+        if nodes['is_categorical'].any():
+            raise ValueError("Categorical splits are not supported")
+        is_leaf = nodes['is_leaf'].astype(bool)
+        trees.append({
+            'feature': np.where(is_leaf, 0, nodes['feature_idx']),
+            'threshold': np.where(is_leaf, 0.0, nodes['num_threshold']),
+            'left': np.where(is_leaf, -1, nodes['left'].astype(np.int64)),
+            'right': np.where(is_leaf, -1, nodes['right'].astype(np.int64)),
+            # Internal node values are unshrunk; _flatten refills them from the leaves by cover
+            'value': np.where(is_leaf, nodes['value'], np.nan),
+            'cover': nodes['count'].astype(np.float64),
+            'default_left': nodes['missing_go_to_left'].astype(bool)
+        })
+    return _calibrate_base_score(model, _flatten(trees, strict_less=False, feature_names=feature_names))
+
+
+def compile_lightgbm(booster, feature_names: Optional[List[str]] = None) -> CompiledTreeEnsemble:
+    """LightGBM Booster with a binary objective (numeric splits only)"""
+    dump = booster.dump_model()
+    trees = []
+    for tree_info in dump['tree_info']:
+        nodes: List[Dict[str, Any]] = []
+        _walk_lightgbm(tree_info['tree_structure'], nodes)
+        trees.append(_nodes_to_arrays(nodes))
+
+    objective = str(dump.get('objective', 'binary'))
+    link = 'logit' if objective.startswith(('binary', 'cross_entropy')) else 'identity'
+    return _flatten(trees, strict_less=False, link=link,
+                    feature_names=feature_names or dump.get('feature_names'))
+
+
+def compile_xgboost(booster, feature_names: Optional[List[str]] = None) -> CompiledTreeEnsemble:
+    """XGBoost Booster with a binary:logistic objective (gbtree)"""
+    names = feature_names or booster.feature_names or []
+    feature_index = {name: i for i, name in enumerate(names)}
+
+    trees = []
+    for tree_json in booster.get_dump(dump_format='json', with_stats=True):
+        nodes: List[Dict[str, Any]] = []
+        _walk_xgboost(json.loads(tree_json), nodes, feature_index)
+        trees.append(_nodes_to_arrays(nodes))
+
+    config = json.loads(booster.save_config())
+    objective = config['learner']['objective']['name']
+    base_score = float(str(config['learner']['learner_model_param']['base_score']).strip('[]'))
+    link = 'logit' if objective.startswith('binary:logistic') else 'identity'
+    if link == 'logit':
+        base_score = float(np.log(base_score / (1 - base_score)))
+
+    ensemble = _flatten(trees, strict_less=True, link=link, feature_names=list(names))
+    ensemble.base_score = base_score
+    return ensemble
+
+
+_LIGHTGBM_MISSING_TYPES = {'None': MISSING_NONE, 'Zero': MISSING_ZERO, 'NaN': MISSING_NAN}
+
+
+def _walk_lightgbm(node: Dict[str, Any], nodes: List[Dict[str, Any]]) -> int:
+    """Append a LightGBM node and its subtree in preorder; return its index"""
+    index = len(nodes)
+    if 'leaf_value' in node:
+        nodes.append({'value': node['leaf_value'], 'cover': node.get('leaf_count', 1)})
+        return index
+
+    if node.get('decision_type', '<=') != '<=':
+        raise ValueError("Only numeric '<=' splits are supported")
+    entry = {
+        'feature': node['split_feature'],
+        'threshold': float(node['threshold']),
+        'value': node.get('internal_value', np.nan),
+        'cover': node.get('internal_count', 1),
+        'default_left': bool(node.get('default_left', True)),
+        'missing_type': _LIGHTGBM_MISSING_TYPES[node.get('missing_type', 'NaN')]
+    }
+    nodes.append(entry)
+    entry['left'] = _walk_lightgbm(node['left_child'], nodes)
+    entry['right'] = _walk_lightgbm(node['right_child'], nodes)
+    return index
+
+
+def _walk_xgboost(node: Dict[str, Any], nodes: List[Dict[str, Any]], feature_index: Dict[str, int]) -> int:
+    """Append an XGBoost node and its subtree in preorder; return its index"""
+    index = len(nodes)
+    if 'leaf' in node:
+        nodes.append({'value': node['leaf'], 'cover': node.get('cover', 1)})
+        return index
+
+    split = node['split']
+    feature = feature_index[split] if split in feature_index else int(str(split).lstrip('f'))
+    entry = {
+        'feature': feature,
+        # Splits are float32 values printed with 9 digits; parse back to the nearest float32
+        'threshold': float(np.float32(node['split_condition'])),
+        'value': np.nan,
+        'cover': node.get('cover', 1),
+        'default_left': node.get('missing') == node['yes']
+    }
+    nodes.append(entry)
+    children = {child['nodeid']: child for child in node['children']}
+    entry['left'] = _walk_xgboost(children[node['yes']], nodes, feature_index)
+    entry['right'] = _walk_xgboost(children[node['no']], nodes, feature_index)
+    return index
+
+
+def _nodes_to_arrays(nodes: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """Per-tree node arrays from preorder node records (leaves have no children)"""
+    return {
+        'feature': np.array([node.get('feature', 0) for node in nodes]),
+        'threshold': np.array([node.get('threshold', 0.0) for node in nodes]),
+        'left': np.array([node.get('left', -1) for node in nodes]),
+        'right': np.array([node.get('right', -1) for node in nodes]),
+        'value': np.array([node['value'] for node in nodes], dtype=np.float64),
+        'cover': np.array([node['cover'] for node in nodes], dtype=np.float64),
+        'default_left': np.array([node.get('default_left', True) for node in nodes]),
+        'missing_type': np.array([node.get('missing_type', MISSING_NAN) for node in nodes], dtype=np.uint8)
+    }
+
+
+def _flatten(trees: List[Dict[str, np.ndarray]], strict_less: bool, link: str = 'logit',
+             feature_names: Optional[List[str]] = None) -> CompiledTreeEnsemble:
+    """Concatenate per-tree arrays (local child indices, -1 for leaves) into one ensemble"""
+    offsets = np.cumsum([0] + [len(tree['value']) for tree in trees])
+    parts = {name: [] for name in ['feature', 'threshold', 'children', 'value', 'cover', 'default_left',
+                                   'missing_type', 'is_leaf']}
+    max_depth = 0
+
+    for offset, tree in zip(offsets, trees):
+        n_nodes = len(tree['value'])
+        is_leaf = np.asarray(tree['left']) < 0
+        local = np.arange(n_nodes)
+
+        # Leaves point to themselves so extra traversal steps are no-ops
+        left = np.where(is_leaf, local, tree['left'])
+        right = np.where(is_leaf, local, tree['right'])
+        value = np.array(tree['value'], dtype=np.float64)
+        cover = np.asarray(tree['cover'], dtype=np.float64)
+
+        # Children always follow their parent, so one forward pass gives depths
+        # and one backward pass fills in missing internal values
+        depth = np.zeros(n_nodes, dtype=np.int64)
+        for node in range(n_nodes):
+            if not is_leaf[node]:
+                depth[left[node]] = depth[right[node]] = depth[node] + 1
+        for node in range(n_nodes - 1, -1, -1):
+            if not is_leaf[node] and np.isnan(value[node]):
+                weights = cover[left[node]] + cover[right[node]]
+                value[node] = (value[left[node]] * cover[left[node]] +
+                               value[right[node]] * cover[right[node]]) / max(weights, 1e-12)
+        max_depth = max(max_depth, int(depth.max()) if n_nodes else 0)
+
+        parts['feature'].append(np.asarray(tree['feature']))
+        parts['threshold'].append(np.asarray(tree['threshold'], dtype=np.float64))
+        parts['children'].append(np.stack([left, right], axis=1) + offset)
+        parts['value'].append(value)
+        parts['cover'].append(cover)
+        parts['default_left'].append(np.asarray(tree['default_left'], dtype=bool))
+        # scikit-learn and XGBoost only send NaN down the default branch
+        parts['missing_type'].append(np.asarray(tree.get('missing_type', np.full(n_nodes, MISSING_NAN)),
+                                                dtype=np.uint8))
+        parts['is_leaf'].append(is_leaf)
+
+    arrays = {name: np.concatenate(values) for name, values in parts.items()}
+    return CompiledTreeEnsemble(
+        roots=offsets[:-1], base_score=0.0, max_depth=max_depth, strict_less=strict_less,
+        link=link, feature_names=feature_names, **arrays
+    )
+
+
+def benchmark(model: Any, features: np.ndarray, batch_sizes: Sequence[int] = (1, 10, 100, 1000),
+              repeats: int = 20, compiled: Optional[CompiledTreeEnsemble] = None) -> List[Dict[str, float]]:
+    """Best-of-``repeats`` milliseconds per batch for the compiled ensemble and the library's predict_proba
+
+    The two are timed alternately, so both see the same machine load.
+    """
+    compiled = compiled or compile_model(model)
+    results = []
+    for rows in batch_sizes:
+        batch = np.asarray(features[:rows], dtype=np.float32)
+        best = {'compiled': np.inf, 'library': np.inf}
+        for _ in range(repeats):
+            for name, predict in (('compiled', compiled.predict_proba), ('library', model.predict_proba)):
+                start = time.perf_counter()
+                predict(batch)
+                best[name] = min(best[name], time.perf_counter() - start)
+        results.append({'rows': len(batch), 'compiled_ms': best['compiled'] * 1000,
+                        'library_ms': best['library'] * 1000})
+    return results
+
+
+def _calibrate_base_score(model, ensemble: CompiledTreeEnsemble) -> CompiledTreeEnsemble:
+    """Recover the initial raw prediction from the library's own decision function"""
+    probe = np.zeros((1, model.n_features_in_), dtype=np.float32)
+    ensemble.base_score = float(model.decision_function(probe)[0] - ensemble.decision_function(probe)[0])
+    return ensemble
@@ -0,0 +1,222 @@
+"""Hyperparameter search for the risk model over a cached feature matrix"""
+import json
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.linear_model import SGDClassifier
+from sklearn.metrics import roc_auc_score
+
+from data.history import HistoryReader
+from .feature_hashing import FeatureHasher
+from .features import build_feature_matrix, feature_names
+
+
+class FeatureCache:
+    """Labeled feature matrix stored once as a flat binary file and memory-mapped
+
+    The directory holds ``features.bin`` (C-ordered float32 rows),
+    ``labels.bin`` (int8) and a ``header.json`` with the shape, feature
+    names and hashing settings. Any number of worker processes can map the
+    same files and share their pages through the OS page cache.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        with open(os.path.join(directory, 'header.json')) as f:
+            self.header = json.load(f)
+
+        self.n_rows = int(self.header['n_rows'])
+        self.feature_names: List[str] = list(self.header['feature_names'])
+        hashing = self.header.get('feature_hashing')
+        self.n_hashed = FeatureHasher.from_config(hashing).n_features if hashing else 0
+        self.features = np.memmap(os.path.join(directory, 'features.bin'), dtype=np.float32, mode='r',
+                                  shape=(self.n_rows, len(self.feature_names)))
+        self.labels = np.memmap(os.path.join(directory, 'labels.bin'), dtype=np.int8, mode='r',
+                                shape=(self.n_rows,))
+
+    @classmethod
+    def build(cls, path: str, directory: str, chunk_size: int = 50000, label_field: str = 'defaulted',
+              hasher: Optional[FeatureHasher] = None) -> 'FeatureCache':
+        """Stream a history file once, appending each chunk's labeled rows"""
+        os.makedirs(directory, exist_ok=True)
+        n_rows = 0
+        with open(os.path.join(directory, 'features.bin'), 'wb') as feature_file, \
+                open(os.path.join(directory, 'labels.bin'), 'wb') as label_file:
+            for columns, labels in HistoryReader(path, chunk_size, label_field):
+                if labels is None:
+                    continue
+                labeled = ~np.isnan(labels)
+                feature_file.write(np.ascontiguousarray(build_feature_matrix(columns, hasher)[labeled]).tobytes())
+                label_file.write(labels[labeled].astype(np.int8).tobytes())
+                n_rows += int(labeled.sum())
+
+        if n_rows == 0:
+            raise ValueError(f"No labeled applications in {path}")
+        header = {
+            'source': path,
+            'n_rows': n_rows,
+            'feature_names': feature_names(hasher),
+            'feature_hashing': hasher.config() if hasher is not None else None,
+            'label_field': label_field
+        }
+        with open(os.path.join(directory, 'header.json'), 'w') as f:
+            json.dump(header, f, indent=2)
+        return cls(directory)
+
+    def split(self, validation_fraction: float, seed: int):
+        """Training and validation row indices, fixed for a given seed"""
+        is_validation = np.random.default_rng(seed).random(self.n_rows) < validation_fraction
+        return np.flatnonzero(~is_validation), np.flatnonzero(is_validation)
+
+
+def _row_chunks(cache: FeatureCache, rows: np.ndarray, chunk_size: int):
+    """Features and labels of ``rows`` read from the memory map one chunk at a time"""
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        yield cache.features[chunk], np.asarray(cache.labels[chunk])
+
+
+def _run_trial(directory: str, trial_id: int, params: Dict[str, Any], n_rows: int, epochs: int,
+               validation_fraction: float, max_validation_rows: int, seed: int,
+               chunk_size: int = 50000) -> Dict[str, Any]:
+    """Fit one configuration on ``n_rows`` training rows and score the validation rows
+
+    Rows are standardized and fed to ``partial_fit`` a chunk at a time, so a
+    worker holds at most one float64 chunk on top of the shared memory map.
+    """
+    start = time.perf_counter()
+    cache = FeatureCache(directory)
+    train_rows, validation_rows = cache.split(validation_fraction, seed)
+    rng = np.random.default_rng(seed + trial_id)
+    if n_rows < len(train_rows):
+        train_rows = np.sort(rng.choice(train_rows, n_rows, replace=False))
+    if max_validation_rows < len(validation_rows):
+        validation_rows = np.sort(rng.choice(validation_rows, max_validation_rows, replace=False))
+
+    total = np.zeros(len(cache.feature_names))
+    total_sq = np.zeros(len(cache.feature_names))
+    for features, _ in _row_chunks(cache, train_rows, chunk_size):
+        features = features.astype(np.float64)
+        total += features.sum(axis=0)
+        total_sq += np.square(features).sum(axis=0)
+    mean = total / len(train_rows)
+    variance = np.maximum(total_sq / len(train_rows) - np.square(mean), 0.0)
+    scale = np.where(variance > 0, np.sqrt(variance), 1.0)
+    if cache.n_hashed:
+        mean[-cache.n_hashed:], scale[-cache.n_hashed:] = 0.0, 1.0
+
+    classifier = SGDClassifier(loss='log_loss', random_state=seed, **params)
+    for _ in range(epochs):
+        for features, labels in _row_chunks(cache, train_rows, chunk_size):
+            order = rng.permutation(len(labels))
+            classifier.partial_fit(((features - mean) / scale)[order], labels[order], classes=np.array([0, 1]))
+
+    probabilities, validation_labels = [], []
+    for features, labels in _row_chunks(cache, validation_rows, chunk_size):
+        probabilities.append(classifier.predict_proba((features - mean) / scale)[:, 1])
+        validation_labels.append(labels)
+    probabilities = np.clip(np.concatenate(probabilities), 1e-12, 1 - 1e-12)
+    validation_labels = np.concatenate(validation_labels)
+    log_loss = -np.mean(validation_labels * np.log(probabilities) +
+                        (1 - validation_labels) * np.log(1 - probabilities))
+    auc = roc_auc_score(validation_labels, probabilities) if len(np.unique(validation_labels)) > 1 else None
+
+    return {
+        'trial_id': trial_id,
+        'params': params,
+        'n_rows': int(len(train_rows)),
+        'log_loss': float(log_loss),
+        'auc': None if auc is None else float(auc),
+        'seconds': time.perf_counter() - start
+    }
+
+
+class HyperparameterSearch:
+    """Random search over SGD logistic settings with successive halving
+
+    All trials start on ``min_rows`` training rows; after each rung the best
+    ``1 / eta`` of them (by validation log loss) continue on ``eta`` times as
+    many rows, until one rung runs on the full training split. Trials run in
+    a joblib process pool and stream the shared memory-mapped matrix in
+    ``chunk_size`` rows, so features are built once per search and no
+    worker copies its whole training slice. Every finished trial is
+    appended to a JSONL leaderboard.
+    """
+
+    DEFAULT_SPACE = {
+        'alpha': np.logspace(-6, -2, 9).tolist(),
+        'penalty': ['l2', 'l1', 'elasticnet'],
+        'l1_ratio': [0.05, 0.15, 0.3, 0.5]
+    }
+
+    def __init__(self, cache: FeatureCache, leaderboard_path: str,
+                 param_space: Optional[Dict[str, List[Any]]] = None, n_trials: int = 200,
+                 min_rows: int = 20000, eta: int = 3, epochs: int = 5, validation_fraction: float = 0.2,
+                 max_validation_rows: int = 200000, chunk_size: int = 50000, n_jobs: int = -1,
+                 random_state: int = 0):
+        self.cache = cache
+        self.leaderboard_path = leaderboard_path
+        self.param_space = param_space or self.DEFAULT_SPACE
+        self.n_trials = n_trials
+        self.min_rows = min_rows
+        self.eta = eta
+        self.epochs = epochs
+        self.validation_fraction = validation_fraction
+        self.max_validation_rows = max_validation_rows
+        self.chunk_size = chunk_size
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+
+    def sample_params(self) -> List[Dict[str, Any]]:
+        """``n_trials`` configurations drawn uniformly from the search space"""
+        rng = np.random.default_rng(self.random_state)
+        candidates = []
+        for _ in range(self.n_trials):
+            params = {name: values[rng.integers(len(values))] for name, values in self.param_space.items()}
+            candidates.append({name: value.item() if isinstance(value, np.generic) else value
+                               for name, value in params.items()})
+        return candidates
+
+    def run(self) -> Dict[str, Any]:
+        """Run the search and return the best full-budget result"""
+        n_train = len(self.cache.split(self.validation_fraction, self.random_state)[0])
+        survivors = list(enumerate(self.sample_params()))
+        n_rows, rung = min(self.min_rows, n_train), 0
+
+        with Parallel(n_jobs=self.n_jobs) as parallel:
+            while True:
+                results = parallel(
+                    delayed(_run_trial)(self.cache.directory, trial_id, params, n_rows, self.epochs,
+                                        self.validation_fraction, self.max_validation_rows, self.random_state,
+                                        self.chunk_size)
+                    for trial_id, params in survivors
+                )
+                self._append_leaderboard(results, rung)
+
+                results.sort(key=lambda result: result['log_loss'])
+                if n_rows >= n_train or len(results) == 1:
+                    return results[0]
+                keep = max(1, len(results) // self.eta)
+                survivors = [(result['trial_id'], result['params']) for result in results[:keep]]
+                n_rows, rung = min(n_rows * self.eta, n_train), rung + 1
+
+    def _append_leaderboard(self, results: List[Dict[str, Any]], rung: int) -> None:
+        timestamp = datetime.now().isoformat()
+        with open(self.leaderboard_path, 'a') as f:
+            for result in results:
+                f.write(json.dumps({**result, 'rung': rung, 'cache': self.cache.directory,
+                                    'finished_at': timestamp}) + '\n')
+
+
+def read_leaderboard(path: str, full_budget_only: bool = False) -> List[Dict[str, Any]]:
+    """Leaderboard entries sorted by validation log loss"""
+    with open(path) as f:
+        entries = [json.loads(line) for line in f if line.strip()]
+    if full_budget_only and entries:
+        final_rung = max(entry['rung'] for entry in entries)
+        entries = [entry for entry in entries if entry['rung'] == final_rung]
+    return sorted(entries, key=lambda entry: entry['log_loss'])
@@ -1,9 +1,46 @@
 """Unit tests for models"""
+import importlib.util
+import json
+import os
+import queue
+import tempfile
+import threading
 import unittest
+import warnings
+import numpy as np
+from sklearn.ensemble import HistGradientBoostingClassifier
 from models.risk_analyzer import RiskAnalyzer
 from models.credit_scorer import CreditScorer
 from models.geolocation_analyzer import GeolocationAnalyzer
 from models.loan_recommender import LoanRecommender
+from models.hazard_raster import HazardRaster
+from models.indicator_store import EconomicIndicatorStore, to_months
+from models.batch_scorer import BatchScorer
+from models.stress_testing import StressTestEngine, Scenario
+from models.portfolio_simulation import PortfolioSimulator
+from models.expected_loss import ExpectedLossModel
+from models.model_registry import ModelRegistry
+from models.training import RiskModelTrainer
+from models.scorecard import ScorecardBuilder
+from models.calibration import ApprovalCalibrator
+from models.online_learning import OnlineRiskUpdater
+from models.feature_hashing import FeatureHasher, fnv1a_32
+from models.tuning import FeatureCache, HyperparameterSearch, read_leaderboard
+from models.replay import ChampionChallengerReplay
+from models.shadow import ShadowScorer
+from models.drift import DriftMonitor
+from models.reason_codes import ReasonCodeEngine
+from models.counterfactual import CounterfactualSearch
+from models.sensitivity import SensitivityAnalyzer
+from models.similarity import SimilarApplicantIndex
+from models.segmentation import SegmentationJob
+from models.exposure import ExposureTracker
+from models.features import build_feature_matrix
+from models.tree_compiler import benchmark, compile_model
+from models.risk_model import CompiledTreeEnsemble
+from data.data_processor import DataProcessor
+from data.history import HistoryReader, OutcomeStream
+from data.velocity import VelocityChecker, VelocityRule, SlidingCountMinSketch, row_values
 
 class TestRiskAnalyzer(unittest.TestCase):
     def setUp(self):
@@ -21,5 +58,763 @@ class TestRiskAnalyzer(unittest.TestCase):
         self.assertGreaterEqual(risk_score, 0.0)
         self.assertLessEqual(risk_score, 1.0)
 
+    def test_contributions_sum_to_score(self):
+        assessment = self.analyzer.assess_comprehensive_risk(self.sample_data)
+        self.assertEqual(set(assessment.contributing_factors), {'financial_risk', 'credit_risk', 'employment_risk'})
+        self.assertAlmostEqual(sum(assessment.contributing_factors.values()), assessment.risk_score)
+
+class TestGeolocationAnalyzer(unittest.TestCase):
+    def setUp(self):
+        self.analyzer = GeolocationAnalyzer()
+
+    def test_state_name_variants(self):
+        expected = self.analyzer.assess_location_risk({'state': 'California'})
+        for state in ['CA', 'Calif.', ' california ', 'Califronia', 'Californa']:
+            self.assertEqual(self.analyzer.assess_location_risk({'state': state}), expected)
+        states = self.analyzer.location_index.normalize_states(['TX', 'new york', None, 'Nowhere'])
+        self.assertEqual(list(states), ['TX', 'NY', '', ''])
+
+    def test_hazard_raster_lookup(self):
+        grid = np.zeros((1, 10, 20), dtype=np.float32)
+        grid[0, 2, 5] = 0.9
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'hazard')
+            HazardRaster.write(path, grid, lat_max=40.0, lon_min=-100.0, cell_size=1.0, bands=['flood'])
+            self.analyzer.load_hazard_raster(path)
+            risk = self.analyzer.assess_environmental_risk([37.5, 39.5, 10.0], [-94.5, -99.5, -94.5])
+            np.testing.assert_allclose(risk[:2], [0.9, 0.0], rtol=1e-6)
+            self.assertTrue(np.isnan(risk[2]))
+
+            state_only = self.analyzer.get_comprehensive_location_analysis({'state': 'TX'})
+            for latitude, longitude in [(None, -94.5), ('', ''), ('n/a', -94.5), (37.5, None)]:
+                analysis = self.analyzer.get_comprehensive_location_analysis(
+                    {'state': 'TX', 'latitude': latitude, 'longitude': longitude})
+                self.assertEqual(analysis, state_only)
+            analysis = self.analyzer.get_comprehensive_location_analysis(
+                {'state': 'TX', 'latitude': '37.5', 'longitude': '-94.5'})
+            self.assertAlmostEqual(analysis.environmental_risk, 0.9, places=6)
+            self.analyzer.hazard_raster = None
+
+    def test_indicator_history_asof(self):
+        store = EconomicIndicatorStore(
+            states=['TX', 'TX', 'CA'],
+            months=to_months(['2020-01', '2021-01', '2020-06']),
+            indicators={'unemployment': [5.0, 9.0, 6.0]}
+        )
+        values = store.asof(['TX', 'TX', 'TX', 'CA', 'NY'],
+                            ['2019-12-31', '2020-07-04', '2021-03-15', '2022-01-01', '2021-01-01'])
+        np.testing.assert_array_equal(values['unemployment'], [np.nan, 5.0, 9.0, 6.0, np.nan])
+
+class TestBatchScorer(unittest.TestCase):
+    def setUp(self):
+        self.applications = [
+            {
+                'personal': {'employment_status': status},
+                'financial': {'annual_income': income, 'existing_debts': debts},
+                'loan': {'loan_amount': 40000},
+                'credit': {'credit_score': score, 'previous_defaults': defaults, 'credit_history_length': 6},
+                'geolocation': {'state': state, 'city': 'Austin'}
+            }
+            for status, income, debts, score, defaults, state in [
+                ('Employed', 75000, 15000, 720, 0, 'Texas'),
+                ('Self-Employed', 40000, 25000, 610, 1, 'CA'),
+                ('Unemployed', 0, 5000, 480, 2, 'Nowhere')
+            ]
+        ]
+        self.columns = DataProcessor().process_batch(self.applications)
+
+    def test_batch_matches_scalar_analyzers(self):
+        results = BatchScorer().score(self.columns)
+        for i, application in enumerate(self.applications):
+            risk_score = RiskAnalyzer().calculate_risk_score(application)
+            recommendation = LoanRecommender().recommend_loan_terms(application, risk_score)
+            self.assertAlmostEqual(results['risk_score'][i], risk_score)
+            self.assertEqual(results['credit_score'][i], CreditScorer().calculate_credit_score(application))
+            self.assertAlmostEqual(results['interest_rate'][i], recommendation.interest_rate)
+            self.assertAlmostEqual(results['monthly_payment'][i], recommendation.monthly_payment)
+            expected_loss = ExpectedLossModel().calculate_expected_loss(application, risk_score, recommendation)
+            self.assertAlmostEqual(results['expected_loss'][i], expected_loss.expected_loss)
+
+    def test_stress_scenarios(self):
+        results = StressTestEngine().run(self.columns, [
+            Scenario('baseline'),
+            Scenario('recession', state_shifts={'TX': {'unemployment': 3.0}}, income_multiplier=0.5)
+        ])
+        self.assertEqual(results[0].approvals_lost, 0)
+        self.assertAlmostEqual(results[0].expected_loss_delta, 0.0)
+        self.assertGreater(results[1].risk_delta, 0.0)
+
+    def test_champion_challenger_replay(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            log = os.path.join(tmp, 'applications.jsonl')
+            write_labeled_history(log, n=1200)
+            stricter = BatchScorer(approval_threshold=0.25)
+            serial = ChampionChallengerReplay(BatchScorer(), stricter, chunk_size=250).run(log)
+            parallel = ChampionChallengerReplay(BatchScorer(), stricter, chunk_size=250, n_jobs=2).run(log)
+
+        self.assertEqual([(diff.segment, diff.value, diff.approvals_lost) for diff in serial],
+                         [(diff.segment, diff.value, diff.approvals_lost) for diff in parallel])
+        np.testing.assert_allclose([diff.challenger_expected_loss for diff in serial],
+                                   [diff.challenger_expected_loss for diff in parallel])
+        overall = serial[0]
+        self.assertEqual((overall.segment, overall.applications), ('overall', 1200))
+        self.assertEqual(overall.approvals_gained, 0)
+        self.assertLess(overall.approval_rate_delta, 0)
+        self.assertAlmostEqual(overall.approval_rate_delta, -overall.approvals_lost / 1200)
+        tiers = [diff for diff in serial if diff.segment == 'credit_tier']
+        self.assertEqual(sum(diff.applications for diff in tiers), 1200)
+
+    @unittest.skipUnless(importlib.util.find_spec('pyarrow'), "pyarrow is not installed")
+    def test_replay_parquet_in_parallel(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        with tempfile.TemporaryDirectory() as tmp:
+            jsonl = os.path.join(tmp, 'applications.jsonl')
+            write_labeled_history(jsonl, n=1200)
+            with open(jsonl) as f:
+                flat = [{field: value for section in json.loads(line)['application'].values()
+                         for field, value in section.items()} for line in f]
+            log = os.path.join(tmp, 'applications.parquet')
+            pq.write_table(pa.Table.from_pylist(flat), log, row_group_size=100)
+
+            stricter = BatchScorer(approval_threshold=0.25)
+            serial = ChampionChallengerReplay(BatchScorer(), stricter, chunk_size=250).run(log)
+            parallel = ChampionChallengerReplay(BatchScorer(), stricter, chunk_size=250, n_jobs=2).run(log)
+            with self.assertRaises(ValueError):
+                next(iter(HistoryReader(log, byte_range=(0, 100))))
+
+        self.assertEqual((serial[0].applications, parallel[0].applications), (1200, 1200))
+        self.assertEqual([(diff.segment, diff.value, diff.applications, diff.approvals_lost) for diff in serial],
+                         [(diff.segment, diff.value, diff.applications, diff.approvals_lost) for diff in parallel])
+        np.testing.assert_allclose([diff.challenger_expected_loss for diff in serial],
+                                   [diff.challenger_expected_loss for diff in parallel])
+
+    def test_shadow_scoring_drops_when_saturated(self):
+        release = threading.Event()
+
+        class SlowChallenger(RiskAnalyzer):
+            def calculate_risk_scores(self, columns):
+                release.wait(5)
+                return np.full(len(columns['credit_score']), 0.9)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            log = os.path.join(tmp, 'shadow.jsonl')
+            shadow = ShadowScorer(SlowChallenger(), log, sample_rate=1.0, max_workers=1, max_pending=2)
+            accepted = [shadow.submit(application, 0.2, 720, True, str(i))
+                        for i, application in enumerate(self.applications)]
+            self.assertEqual(accepted, [True, True, False])
+            self.assertEqual(shadow.counts['dropped'], 1)
+
+            release.set()
+            shadow.shutdown()
+            with open(log) as f:
+                records = [json.loads(line) for line in f]
+        self.assertEqual(shadow.counts['disagreements'], 2)
+        self.assertEqual([record['approved'] for record in records], [[True, False]] * 2)
+
+    def test_shadow_scoring_counts_challenger_errors(self):
+        class BrokenChallenger(RiskAnalyzer):
+            def calculate_risk_scores(self, columns):
+                raise RuntimeError("model artifact unreadable")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            log = os.path.join(tmp, 'shadow.jsonl')
+            shadow = ShadowScorer(BrokenChallenger(), log, sample_rate=1.0, max_workers=1)
+            for i, application in enumerate(self.applications):
+                shadow.submit(application, 0.2, 720, True, str(i))
+            shadow.shutdown()
+            self.assertFalse(os.path.exists(log))
+        self.assertEqual((shadow.counts['errors'], shadow.counts['scored']), (len(self.applications), 0))
+
+    def test_drift_monitor(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            history = os.path.join(tmp, 'history.jsonl')
+            write_labeled_history(history, n=1000)
+            reference = DriftMonitor.from_history(history, chunk_size=300)
+            reference.save(os.path.join(tmp, 'reference.npz'))
+            reference = DriftMonitor.load(os.path.join(tmp, 'reference.npz'))
+
+            monitor = DriftMonitor()
+            scorer = BatchScorer(drift_monitor=monitor)
+            for columns, _ in HistoryReader(history, 250):
+                scorer.score(columns)
+            self.assertTrue(all(stat.psi < 1e-9 for stat in monitor.compare(reference).values()))
+
+            monitor.reset()
+            shifted = {'credit_score': np.full(500, 480.0), 'employment_status': np.full(500, 'Unemployed', dtype=object)}
+            monitor.update(shifted)
+            stats = monitor.compare(reference)
+            self.assertEqual(stats['credit_score'].status, 'significant')
+            self.assertGreater(stats['credit_score'].ks, 0.5)
+            self.assertEqual(stats['employment_status'].n_current, 500)
+            self.assertIsNone(stats['employment_status'].ks)
+            self.assertNotIn('annual_income', stats)
+
+    def test_reason_codes(self):
+        names, contributions = RiskAnalyzer().calculate_contributions(self.columns)
+        codes = ReasonCodeEngine(top_n=2).generate(names, contributions)
+        self.assertEqual(codes.dtype, np.int16)
+        # Employed applicant with a 720 score and 20% debt ratio: only the credit component is adverse
+        self.assertEqual(codes.tolist(), [[2, 0], [1, 2], [1, 3]])
+
+        # Hashed city/ZIP buckets are a location proxy and never become a reason
+        location = ReasonCodeEngine(top_n=2).generate(['hash_3', 'hash_7', 'credit_score'], [[0.5, 0.4, 0.1]])
+        self.assertEqual(location.tolist(), [[2, 0]])
+
+        letters = ReasonCodeEngine.render(codes, self.columns, rows=[2])
+        self.assertEqual(letters, [[
+            "Debt obligations are too high relative to income ($5,000 of debts with no verified income)",
+            "Employment status does not meet our requirements (Unemployed)"
+        ]])
+
+    def test_counterfactual_search(self):
+        search = CounterfactualSearch(BatchScorer(approval_threshold=0.3, min_approval_score=550))
+        results = search.search(self.columns)
+        # The first applicant is approved; the third fails the credit score cut, which no change fixes
+        self.assertEqual(sorted(results), [1, 2])
+        self.assertIsNone(results[2])
+
+        # Rule-based risk only responds to debts: the 0.3 debt ratio tier is the nearest approval
+        counterfactual = results[1]
+        self.assertEqual(list(counterfactual.changes), ['existing_debts'])
+        self.assertEqual(counterfactual.changes['existing_debts'][0], 25000)
+        self.assertAlmostEqual(counterfactual.changes['existing_debts'][1], 10000)
+        self.assertAlmostEqual(counterfactual.cost, 0.6)
+        self.assertLess(counterfactual.risk_score, 0.3)
+
+        # Grouping applicants into several passes gives the same answers
+        grouped = CounterfactualSearch(search.scorer, max_evaluations=1).search(self.columns)
+        self.assertEqual(grouped[1], counterfactual)
+
+    def test_sensitivity_grid(self):
+        ranges = {'annual_income': np.linspace(0, 150000, 50), 'existing_debts': np.linspace(0, 60000, 50),
+                  'credit_score': np.linspace(300, 850, 10)}
+        result = SensitivityAnalyzer().analyze(self.applications[1], ranges)
+        self.assertEqual(result.fields, ['annual_income', 'existing_debts', 'credit_score'])
+        self.assertEqual(result.outputs['approved'].shape, (50, 50, 10))
+
+        # Each grid point matches scoring that application on its own
+        i, j, k = 20, 7, 6
+        application = json.loads(json.dumps(self.applications[1]))
+        application['financial'].update(annual_income=ranges['annual_income'][i],
+                                        existing_debts=ranges['existing_debts'][j])
+        application['credit']['credit_score'] = ranges['credit_score'][k]
+        expected = BatchScorer().score(DataProcessor().process_batch([application]))
+        for name, values in result.outputs.items():
+            self.assertAlmostEqual(float(values[i, j, k]), float(expected[name][0]))
+
+        with self.assertRaises(ValueError):
+            SensitivityAnalyzer().analyze(self.applications[1], {'employment_status': ['Employed']})
+
+class TestPortfolioSimulator(unittest.TestCase):
+    def test_loss_distribution(self):
+        rng = np.random.default_rng(0)
+        pds, exposures = rng.uniform(0.02, 0.1, 500), rng.uniform(1e4, 5e4, 500)
+        lgd, states = np.full(500, 0.5), rng.choice(['CA', 'TX', 'NY'], 500)
+
+        result = PortfolioSimulator(n_paths=4000, seed=7).simulate(pds, exposures, lgd, states)
+        chunked = PortfolioSimulator(n_paths=4000, seed=7, memory_budget_mb=1).simulate(pds, exposures, lgd, states)
+
+        self.assertAlmostEqual(result.expected_loss / np.sum(pds * exposures * lgd), 1.0, delta=0.05)
+        self.assertGreater(result.expected_shortfall, result.value_at_risk)
+        self.assertGreater(result.value_at_risk, result.expected_loss)
+        self.assertEqual(len(chunked.losses), 4000)
+
+def write_labeled_history(path, n=600, seed=0):
+    """Synthetic labeled history where defaults follow debt ratio and credit score"""
+    rng = np.random.default_rng(seed)
+    with open(path, 'w') as f:
+        for _ in range(n):
+            income, debts, score = rng.uniform(20000, 150000), rng.uniform(0, 80000), int(rng.integers(400, 850))
+            odds = np.exp(3 * debts / income - (score - 600) / 60)
+            application = {
+                'personal': {'age': int(rng.integers(21, 70)), 'employment_status': 'Employed'},
+                'financial': {'annual_income': income, 'existing_debts': debts},
+                'loan': {'loan_amount': rng.uniform(5000, 50000), 'loan_purpose': 'Auto Loan'},
+                'credit': {'credit_score': score},
+                'geolocation': {'state': 'TX', 'city': 'Austin'}
+            }
+            label = int(rng.random() < odds / (1 + odds))
+            f.write(json.dumps({'application': application, 'defaulted': label}) + '\n')
+
+
+class TestRiskModelTraining(unittest.TestCase):
+    def test_train_register_and_score(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            history = os.path.join(tmp, 'history.jsonl')
+            write_labeled_history(history)
+            registry = ModelRegistry(os.path.join(tmp, 'registry'))
+            version = RiskModelTrainer(chunk_size=200, epochs=3).train_and_register(history, registry)
+
+            analyzer = RiskAnalyzer()
+            analyzer.load_model(registry)
+            self.assertTrue(analyzer.is_trained)
+            self.assertEqual(analyzer.model_version, version)
+            self.assertIsInstance(analyzer.model.coef.base, np.memmap)
+            self.assertLess(analyzer.model_metadata['load_stats']['seconds'], 1.0)
+
+            risky = {'financial': {'annual_income': 30000, 'existing_debts': 60000}, 'credit': {'credit_score': 450}}
+            safe = {'financial': {'annual_income': 150000, 'existing_debts': 0}, 'credit': {'credit_score': 820}}
+            self.assertGreater(analyzer.calculate_risk_score(risky), analyzer.calculate_risk_score(safe))
+
+            columns = DataProcessor().process_batch([risky, safe])
+            names, contributions = analyzer.calculate_contributions(columns)
+            probabilities = 1 / (1 + np.exp(-(contributions.sum(axis=1) + analyzer.model.intercept)))
+            np.testing.assert_allclose(probabilities, analyzer.calculate_risk_scores(columns), rtol=1e-5)
+            self.assertEqual(names[np.argmax(contributions[0])], 'debt_to_income')
+
+    def test_online_updates_hot_swap(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            history = os.path.join(tmp, 'history.jsonl')
+            write_labeled_history(history)
+            registry = ModelRegistry(os.path.join(tmp, 'registry'))
+            RiskModelTrainer(chunk_size=200).train_and_register(history, registry)
+
+            analyzer = RiskAnalyzer()
+            analyzer.follow_registry(registry, refresh_interval=0)
+            self.assertEqual(analyzer.model_version, 'v0001')
+
+            outcomes = os.path.join(tmp, 'outcomes.jsonl')
+            write_labeled_history(outcomes, n=250, seed=1)
+            with open(outcomes, 'a') as f:
+                f.write('{"application": {"personal"')  # record still being written
+            updater = OnlineRiskUpdater(registry, checkpoint_every=2)
+            versions = updater.follow(outcomes, batch_size=100, poll_interval=0.01, idle_timeout=0.05)
+            self.assertEqual(versions, ['v0002', 'v0003'])
+            file_key = OutcomeStream.source_key(outcomes)
+            self.assertEqual(updater.stream_offsets[file_key],
+                             os.path.getsize(outcomes) - len('{"application": {"personal"'))
+
+            records = queue.Queue()
+            with open(history) as f:
+                for line in f.readlines()[:50]:
+                    records.put(json.loads(line))
+            versions = updater.run(OutcomeStream(records, batch_size=20, poll_interval=0.01, idle_timeout=0.05))
+            self.assertEqual(versions, ['v0004', 'v0005'])
+            _, metadata = registry.load()
+            self.assertEqual((metadata['parent_version'], metadata['stream_offsets']['queue']), ('v0004', 50))
+            self.assertEqual(metadata['stream_offsets'][file_key], updater.stream_offsets[file_key])
+
+            columns = DataProcessor().process_batch([{'credit': {'credit_score': 700}}])
+            analyzer.calculate_risk_scores(columns)
+            self.assertEqual(analyzer.model_version, 'v0005')
+
+    def test_online_offsets_per_source(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            history = os.path.join(tmp, 'history.jsonl')
+            write_labeled_history(history)
+            registry = ModelRegistry(os.path.join(tmp, 'registry'))
+            RiskModelTrainer(chunk_size=200).train_and_register(history, registry)
+            updater = OnlineRiskUpdater(registry, checkpoint_every=100)
+
+            records = queue.Queue()
+            with open(history) as f:
+                for line in f.readlines()[:30]:
+                    records.put(json.loads(line))
+            updater.run(OutcomeStream(records, batch_size=10, poll_interval=0.01, idle_timeout=0.05))
+            self.assertEqual(updater.stream_offsets, {'queue': 30})
+
+            # A file read after a queue run starts at its own offset, not at record 30
+            outcomes = os.path.join(tmp, 'outcomes.jsonl')
+            write_labeled_history(outcomes, n=120, seed=1)
+            updater.follow(outcomes, batch_size=50, poll_interval=0.01, idle_timeout=0.05)
+            _, metadata = registry.load()
+            file_key = OutcomeStream.source_key(outcomes)
+            self.assertEqual(metadata['online_samples'], 120)
+            self.assertEqual(metadata['stream_offsets'], {'queue': 30, file_key: os.path.getsize(outcomes)})
+
+            resumed = OnlineRiskUpdater(registry, checkpoint_every=100)
+            self.assertEqual(resumed.follow(outcomes, poll_interval=0.01, idle_timeout=0.05), [])
+
+    def test_stream_stops_while_busy(self):
+        records = queue.Queue()
+        for i in range(100):
+            records.put({'credit': {'credit_score': 600 + i}, 'defaulted': 0})
+        stream = OutcomeStream(records, batch_size=10, poll_interval=0.01)
+        batches = 0
+        for _, labels, offset in stream:
+            batches += 1
+            stream.stop()
+        self.assertEqual((batches, offset), (1, 10))
+
+    def test_hashed_city_features(self):
+        self.assertEqual(fnv1a_32(np.array(['a', 'foobar'])).tolist(), [0xe40c292c, 0xbf9cf968])
+
+        hasher = FeatureHasher(n_features=64)
+        columns = DataProcessor().process_batch([
+            {'geolocation': {'city': 'Austin', 'zip_code': '78701'}},
+            {'geolocation': {'city': 'Austin'}},
+            {'geolocation': {}}
+        ])
+        dense = hasher.transform(columns)
+        self.assertEqual(dense.shape, (3, 64))
+        self.assertEqual(np.abs(dense).sum(axis=1).tolist(), [2, 1, 0])
+        np.testing.assert_array_equal(hasher.transform_sparse(columns).toarray(), dense)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            history = os.path.join(tmp, 'history.jsonl')
+            write_labeled_history(history)
+            registry = ModelRegistry(os.path.join(tmp, 'registry'))
+            RiskModelTrainer(chunk_size=200, hasher=hasher).train_and_register(history, registry)
+
+            analyzer = RiskAnalyzer()
+            analyzer.load_model(registry)
+            self.assertEqual(analyzer.hasher.config(), hasher.config())
+            self.assertEqual(len(analyzer.model.coef), 24 + 64)
+            self.assertEqual(analyzer.calculate_risk_scores(columns).shape, (3,))
+
+    def test_hyperparameter_search(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            history = os.path.join(tmp, 'history.jsonl')
+            write_labeled_history(history, n=1500)
+            cache = FeatureCache.build(history, os.path.join(tmp, 'cache'), chunk_size=400)
+            self.assertEqual(cache.features.shape, (1500, 24))
+            self.assertIsInstance(cache.features, np.memmap)
+
+            leaderboard = os.path.join(tmp, 'leaderboard.jsonl')
+            search = HyperparameterSearch(cache, leaderboard, n_trials=6, min_rows=200, chunk_size=256, n_jobs=2)
+            best = search.run()
+
+            entries = read_leaderboard(leaderboard)
+            self.assertEqual([sum(entry['rung'] == rung for entry in entries) for rung in range(3)], [6, 2, 1])
+            final = read_leaderboard(leaderboard, full_budget_only=True)
+            self.assertEqual(final[0]['trial_id'], best['trial_id'])
+            self.assertGreater(best['auc'], 0.7)
+
+    def test_scorecard_backend(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            history = os.path.join(tmp, 'history.jsonl')
+            write_labeled_history(history, n=2000)
+            registry = ModelRegistry(os.path.join(tmp, 'registry'))
+            builder = ScorecardBuilder(chunk_size=500, sample_rows=800)
+            builder.train_and_register(history, registry)
+            self.assertGreater(builder.information_value['credit_score'], builder.information_value['age'])
+
+            analyzer = RiskAnalyzer()
+            analyzer.load_model(registry)
+            scorecard = analyzer.model
+            self.assertEqual(scorecard.kind, 'scorecard')
+
+            features = np.array([[11.0, 2.0] + [0.0] * 22, [12.0, 0.0] + [0.0] * 22], dtype=np.float32)
+            features[:, 4] = [450, 820]
+            totals = scorecard.score(features)
+            self.assertEqual(totals.dtype, np.int16)
+            self.assertLess(totals[0], totals[1])
+
+            # The points table reproduces the score by hand
+            table = scorecard.points_table()
+            by_hand = 0
+            for feature, name in enumerate(scorecard.feature_names):
+                value = features[0, feature]
+                by_hand += next(row['points'] for row in table if row['feature'] == name and not row['missing'] and
+                                (row['lower'] is None or row['lower'] <= value) and
+                                (row['upper'] is None or value < row['upper']))
+            self.assertEqual(by_hand, totals[0])
+
+    def test_approval_calibration(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            history = os.path.join(tmp, 'history.jsonl')
+            write_labeled_history(history, n=2000)
+            with open(history) as f:
+                records = [json.loads(line) for line in f]
+            with open(history, 'w') as f:
+                for record in records:
+                    f.write(json.dumps({'application': record['application'], 'repaid': 1 - record['defaulted']}) + '\n')
+
+            registry = ModelRegistry(os.path.join(tmp, 'calibration'))
+            calibrator = ApprovalCalibrator(label_field='repaid')
+            calibrator.fit_and_register(history, registry)
+            self.assertLess(calibrator.calibration_summary['brier_after'],
+                            calibrator.calibration_summary['brier_before'])
+
+            recommender = LoanRecommender()
+            recommender.load_calibration(registry)
+            self.assertEqual(recommender.calibration_version, 'v0001')
+            calibrated = recommender._calculate_approval_probability(np.array([0.9, 0.5, 0.1]), np.array([450, 650, 820]))
+            self.assertTrue(np.all(np.diff(calibrated) > 0))
+            self.assertTrue(np.all((calibrated >= 0) & (calibrated <= 1)))
+
+class TestSimilarApplicantIndex(unittest.TestCase):
+    def test_search_insert_and_reload(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            history = os.path.join(tmp, 'history.jsonl')
+            write_labeled_history(history)
+            index = SimilarApplicantIndex.from_history(history, n_lists=8, chunk_size=200)
+            self.assertEqual(len(index), 600)
+
+            columns, labels = next(iter(HistoryReader(history, 5)))
+            ids, distances, outcomes = index.search(columns, k=3, n_probe=2)
+            np.testing.assert_array_equal(ids[:, 0], np.arange(5))
+            np.testing.assert_allclose(distances[:, 0], 0.0, atol=1e-3)
+            np.testing.assert_array_equal(outcomes[:, 0], labels)
+
+            # Probing every list is an exact search
+            vectors = index.normalize(build_feature_matrix(columns))
+            stored = np.concatenate([index._vectors[i][:index._sizes[i]] for i in range(index.n_lists)])
+            stored_ids = np.concatenate([index._ids[i][:index._sizes[i]] for i in range(index.n_lists)])
+            exact = np.sqrt(((vectors[:, np.newaxis] - stored[np.newaxis]) ** 2).sum(axis=-1))
+            expected = stored_ids[np.argsort(exact, axis=1)[:, :3]]
+            np.testing.assert_array_equal(index.search_vectors(vectors, k=3, n_probe=8)[0], expected)
+
+            new_ids = index.add(columns)
+            np.testing.assert_array_equal(new_ids, np.arange(600, 605))
+            path = os.path.join(tmp, 'index.npz')
+            index.save(path)
+            reloaded = SimilarApplicantIndex.load(path)
+            self.assertEqual(len(reloaded), 605)
+            np.testing.assert_array_equal(reloaded.search(columns, k=2)[0], index.search(columns, k=2)[0])
+            self.assertTrue(np.isnan(reloaded.search(columns, k=2)[2]).any())
+
+class TestSegmentation(unittest.TestCase):
+    def test_segments_fit_register_and_score(self):
+        rng = np.random.default_rng(0)
+        groups = rng.integers(3, size=900)
+        with tempfile.TemporaryDirectory() as tmp:
+            history = os.path.join(tmp, 'history.jsonl')
+            with open(history, 'w') as f:
+                for group in groups:
+                    income = [30000, 90000, 250000][group] * rng.uniform(0.9, 1.1)
+                    application = {
+                        'financial': {'annual_income': income, 'existing_debts': income * 0.2},
+                        'credit': {'credit_score': [520, 680, 800][group] + rng.normal() * 10},
+                        'loan': {'loan_amount': 20000, 'loan_purpose': 'Auto Loan'},
+                        'geolocation': {'state': 'TX', 'city': 'Austin'}
+                    }
+                    f.write(json.dumps({'application': application}) + '\n')
+
+            job = SegmentationJob(n_segments=3, batch_size=100, chunk_size=250)
+            registry = ModelRegistry(os.path.join(tmp, 'segments'))
+            version = job.fit_and_register(history, registry)
+            model, metadata = registry.load(version)
+            self.assertEqual(metadata['n_rows'], 900)
+            self.assertEqual(sum(metadata['segment_sizes']), 900)
+
+            columns, _ = next(iter(HistoryReader(history, 900, label_field=None)))
+            results = BatchScorer(segment_model=model).score(columns)
+            # Every income band falls in a segment of its own
+            pairs = set(zip(groups.tolist(), results['segment'].tolist()))
+            self.assertEqual(len(pairs), 3)
+            self.assertEqual(len({segment for _, segment in pairs}), 3)
+
+    def test_fit_cache_matches_fit(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            history = os.path.join(tmp, 'history.jsonl')
+            write_labeled_history(history, n=600)
+            cache = FeatureCache.build(history, os.path.join(tmp, 'cache'), chunk_size=200)
+
+            job = SegmentationJob(n_segments=4, batch_size=50, chunk_size=200)
+            from_file, from_cache = job.fit(history), job.fit_cache(cache)
+            np.testing.assert_allclose(from_cache.centroids, from_file.centroids, atol=1e-4)
+
+            features = build_feature_matrix(next(iter(HistoryReader(history, 600)))[0])
+            np.testing.assert_array_equal(from_cache.assign(features), from_file.assign(features))
+            np.testing.assert_array_equal(from_cache.sizes, from_file.sizes)
+
+        with self.assertRaises(ValueError):
+            SegmentationJob(epochs=0)
+
+class TestExposureTracker(unittest.TestCase):
+    def test_limits_are_enforced_under_concurrency(self):
+        tracker = ExposureTracker(amount_limits={'state': {'CA': 100000}})
+        keys = ExposureTracker.keys('CA', 'Education', 0.3)
+
+        def approve_many():
+            for _ in range(50):
+                tracker.try_approve(keys, 1000)
+
+        threads = [threading.Thread(target=approve_many) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(tracker.totals['state']['CA'], 100000)
+        self.assertEqual(tracker.n_loans, 100)
+        self.assertEqual(tracker.totals['risk_category']['LOW'], 100000)
+
+        # Share limits wait for the book to reach its minimum size
+        shares = ExposureTracker(max_share={'loan_purpose': 0.5}, min_portfolio_amount=3000)
+        self.assertTrue(shares.try_approve(ExposureTracker.keys('TX', 'Auto Loan', 0.1), 1000)[0])
+        self.assertTrue(shares.try_approve(ExposureTracker.keys('TX', 'Auto Loan', 0.1), 1000)[0])
+        approved, breaches = shares.try_approve(ExposureTracker.keys('TX', 'Auto Loan', 0.1), 1000)
+        self.assertFalse(approved)
+        self.assertIn('loan_purpose Auto Loan', breaches[0])
+
+    def test_rebuild_from_history(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            history = os.path.join(tmp, 'history.jsonl')
+            write_labeled_history(history)
+            with open(history) as f:
+                records = [json.loads(line) for line in f]
+            with open(history, 'w') as f:
+                for i, record in enumerate(records):
+                    # Half the rows record the amount offered; the rest book the amount requested
+                    offered = {'recommended_amount': record['application']['loan']['loan_amount'] * 0.8} \
+                        if i % 2 else {}
+                    f.write(json.dumps({**record, **offered, 'approved': i % 3 != 0}) + '\n')
+
+            tracker = ExposureTracker.from_history(history, chunk_size=250)
+            expected = ExposureTracker()
+            analyzer = RiskAnalyzer()
+            for i, record in enumerate(records):
+                if i % 3 != 0:
+                    application = record['application']
+                    keys = ExposureTracker.keys('TX', 'Auto Loan', analyzer.calculate_risk_score(application))
+                    amount = application['loan']['loan_amount'] * (0.8 if i % 2 else 1.0)
+                    expected.record(keys, amount)
+
+            self.assertEqual(tracker.n_loans, 400)
+            self.assertAlmostEqual(tracker.total_amount, expected.total_amount)
+            for dimension, totals in expected.totals.items():
+                self.assertEqual(set(tracker.totals[dimension]), set(totals))
+                for value, amount in totals.items():
+                    self.assertAlmostEqual(tracker.totals[dimension][value], amount)
+
+    def test_approvals_survive_restart(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            history = os.path.join(tmp, 'history.jsonl')
+            write_labeled_history(history, n=20)
+            with open(history) as f:
+                applications = [json.loads(line)['application'] for line in f]
+
+            path = os.path.join(tmp, 'logs', 'approved_loans.jsonl')
+            tracker = ExposureTracker(amount_limits={'state': {'TX': 150000}}, history_path=path)
+            analyzer = RiskAnalyzer()
+            for application in applications:
+                keys = ExposureTracker.keys('TX', 'Auto Loan', analyzer.calculate_risk_score(application))
+                tracker.try_approve(keys, 25000, application=application)
+            self.assertEqual(tracker.n_loans, 6)
+
+            restarted = ExposureTracker.from_history(path, amount_limits={'state': {'TX': 150000}})
+            self.assertEqual((restarted.n_loans, restarted.total_amount), (6, 150000))
+            self.assertEqual(dict(restarted.totals['risk_category']), dict(tracker.totals['risk_category']))
+            self.assertFalse(restarted.try_approve(keys, 25000)[0])
+
+    @unittest.skipUnless(importlib.util.find_spec('pyarrow'), "pyarrow is not installed")
+    def test_missing_approval_field_books_nothing(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        with tempfile.TemporaryDirectory() as tmp:
+            jsonl = os.path.join(tmp, 'history.jsonl')
+            write_labeled_history(jsonl, n=50)
+            with open(jsonl) as f:
+                flat = [{field: value for section in json.loads(line)['application'].values()
+                         for field, value in section.items()} for line in f]
+            parquet = os.path.join(tmp, 'history.parquet')
+            pq.write_table(pa.Table.from_pylist(flat), parquet)
+
+            for path in [jsonl, parquet]:
+                self.assertEqual(ExposureTracker.from_history(path).n_loans, 0)
+                self.assertEqual(ExposureTracker.from_history(path, approved_field=None).n_loans, 50)
+
+class TestVelocityChecker(unittest.TestCase):
+    def test_bursts_are_flagged_within_the_window(self):
+        checker = VelocityChecker([VelocityRule('ZIP code', ('zip_code',), window_seconds=600, threshold=3)])
+        columns = DataProcessor().process_batch([{'geolocation': {'state': 'CA', 'city': 'LA', 'zip_code': '90001'}}])
+        values = row_values(columns)
+
+        flags = [checker.check(values, timestamp=1000 + 60 * i) for i in range(5)]
+        self.assertEqual([len(f) for f in flags], [0, 0, 0, 1, 1])
+        self.assertEqual(flags[4][0].count, 5)
+        # Other keys and rows missing the field are unaffected
+        self.assertEqual(checker.check({'zip_code': '10001'}, timestamp=1300), [])
+        self.assertEqual(checker.check({'city': 'LA'}, timestamp=1300), [])
+        # Once the window has passed the count starts over
+        self.assertEqual(checker.check(values, timestamp=1000 + 60 * 4 + 700), [])
+
+    def test_count_min_sketch_never_undercounts(self):
+        sketch = SlidingCountMinSketch(window_seconds=60, n_buckets=6, width=256, depth=4)
+        rng = np.random.default_rng(0)
+        keys = [f"profile-{i}" for i in rng.integers(0, 400, size=3000)]
+        estimates = {key: sketch.add(key, timestamp=10.0) for key in keys}
+        for key, estimate in estimates.items():
+            self.assertGreaterEqual(estimate, keys.count(key))
+        self.assertEqual(sketch.add('profile-new', timestamp=100.0), 1)
+
+class TestTreeCompiler(unittest.TestCase):
+    def test_matches_library_predictions(self):
+        rng = np.random.default_rng(0)
+        features = rng.normal(size=(500, 6)).astype(np.float32)
+        labels = (features[:, 0] + features[:, 1] ** 2 + rng.normal(size=500) > 1).astype(int)
+        features[rng.random(features.shape) < 0.05] = np.nan
+
+        model = HistGradientBoostingClassifier(max_iter=30, max_depth=4).fit(features, labels)
+        compiled = compile_model(model)
+        np.testing.assert_allclose(compiled.predict_proba(features), model.predict_proba(features)[:, 1], atol=1e-9)
+
+        contributions, base = compiled.contributions(features)
+        np.testing.assert_allclose(contributions.sum(axis=1) + base, compiled.decision_function(features), atol=1e-9)
+        self.assertEqual(set(np.argsort(np.abs(contributions).mean(axis=0))[-2:]), {0, 1})
+
+        with tempfile.TemporaryDirectory() as tmp:
+            registry = ModelRegistry(tmp)
+            registry.save(compiled)
+            loaded, _ = registry.load()
+            np.testing.assert_allclose(loaded.predict_proba(features), compiled.predict_proba(features))
+
+    @staticmethod
+    def _training_data():
+        rng = np.random.default_rng(1)
+        features = rng.normal(size=(2000, 4)).astype(np.float32)
+        features[rng.random(features.shape) < 0.2] = 0.0
+        labels = (features[:, 0] - features[:, 2] + rng.normal(size=2000) > 0).astype(int)
+        # Only the first two features have NaN in training
+        features[:, :2][rng.random((2000, 2)) < 0.1] = np.nan
+        probe = rng.normal(size=(400, 4)).astype(np.float32)
+        probe[rng.random(probe.shape) < 0.2] = 0.0
+        probe[rng.random(probe.shape) < 0.2] = np.nan
+        return features, labels, probe
+
+    @unittest.skipUnless(importlib.util.find_spec('lightgbm'), "lightgbm is not installed")
+    def test_matches_lightgbm_with_nan_and_zero(self):
+        import lightgbm
+        features, labels, probe = self._training_data()
+        for zero_as_missing in (False, True):
+            model = lightgbm.LGBMClassifier(n_estimators=20, num_leaves=8, zero_as_missing=zero_as_missing,
+                                            verbose=-1).fit(features, labels)
+            missing_types = set(model.booster_.trees_to_dataframe()['missing_type'].dropna())
+            self.assertEqual(missing_types, {'Zero'} if zero_as_missing else {'NaN', 'None'})
+            compiled = compile_model(model)
+            np.testing.assert_allclose(compiled.predict_proba(probe), model.predict_proba(probe)[:, 1], atol=1e-6)
+            np.testing.assert_allclose(compiled.predict_proba(features), model.predict_proba(features)[:, 1],
+                                       atol=1e-6)
+
+        timings = benchmark(model, probe, batch_sizes=(1, 100), repeats=2)
+        self.assertEqual([timing['rows'] for timing in timings], [1, 100])
+        self.assertTrue(all(timing['compiled_ms'] > 0 and timing['library_ms'] > 0 for timing in timings))
+
+    @unittest.skipUnless(importlib.util.find_spec('xgboost'), "xgboost is not installed")
+    def test_matches_xgboost_on_split_values(self):
+        import xgboost
+        rng = np.random.default_rng(2)
+        # Training rows and integer-valued features land exactly on split values
+        features = np.column_stack([rng.integers(0, 8, size=(3000, 2)),
+                                    rng.normal(size=(3000, 2))]).astype(np.float32)
+        labels = (features[:, 0] - 3 * features[:, 2] + rng.normal(size=3000) > 3).astype(int)
+        model = xgboost.XGBClassifier(n_estimators=50, max_depth=4).fit(features, labels)
+        compiled = compile_model(model)
+        np.testing.assert_allclose(compiled.predict_proba(features), model.predict_proba(features)[:, 1], atol=1e-6)
+
+    def test_out_of_range_thresholds(self):
+        # LightGBM writes +-1e300 thresholds; they must saturate rather than overflow float32
+        ensemble = CompiledTreeEnsemble(
+            feature=[0] * 5, threshold=[1e300, -1e300, 0, 0, 0], children=[[1, 2], [3, 4], [2, 2], [3, 3], [4, 4]],
+            value=[0, 0, 1, 2, 3], cover=[3, 2, 1, 1, 1], default_left=[True] * 5,
+            is_leaf=[False, False, True, True, True], roots=[0], base_score=0.0, max_depth=2, link='identity')
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            raw = CompiledTreeEnsemble.from_arrays(*ensemble.to_arrays()).decision_function(
+                np.array([[5.0], [-np.inf], [np.inf]], dtype=np.float32))
+        np.testing.assert_array_equal(raw, [3, 2, 1])
+
+    @unittest.skipUnless(importlib.util.find_spec('xgboost'), "xgboost is not installed")
+    def test_matches_xgboost_with_nan_and_zero(self):
+        import xgboost
+        features, labels, probe = self._training_data()
+        model = xgboost.XGBClassifier(n_estimators=20, max_depth=3).fit(features, labels)
+        compiled = compile_model(model)
+        np.testing.assert_allclose(compiled.predict_proba(probe), model.predict_proba(probe)[:, 1], atol=1e-6)
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,4 +1,5 @@
 """Helper functions for loan evaluation system"""
+import os
 import numpy as np
 
 def format_currency(amount):
@@ -40,3 +41,24 @@ def calculate_debt_to_income_ratio(monthly_debt, monthly_income):
         return monthly_debt / monthly_income
     except:
         return 0.0
+
+def column_or_default(columns, name, default):
+    """Numeric column from a batch, with missing values replaced by a default"""
+    values = columns.get(name)
+    if values is None:
+        return np.full(batch_size(columns), float(default))
+    values = np.asarray(values, dtype=np.float64)
+    return np.where(np.isnan(values), default, values)
+
+def batch_size(columns):
+    """Number of rows in a batch of columns"""
+    return len(next(iter(columns.values()))) if columns else 0
+
+def current_rss_bytes():
+    """Resident set size of this process in bytes (None where /proc is unavailable)"""
+    try:
+        with open('/proc/self/statm') as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
@@ -0,0 +1,140 @@
+"""State and city name normalization index"""
+import re
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, List, Optional, Set
+
+import numpy as np
+
+from utils.constants import US_STATES
+
+# Associated Press style abbreviations and other common short forms
+STATE_ALIASES = {
+    'ALA': 'AL', 'ARIZ': 'AZ', 'ARK': 'AR', 'CALIF': 'CA', 'CALI': 'CA', 'CAL': 'CA',
+    'COLO': 'CO', 'CONN': 'CT', 'DEL': 'DE', 'FLA': 'FL', 'ILL': 'IL', 'IND': 'IN',
+    'KAN': 'KS', 'KANS': 'KS', 'MASS': 'MA', 'MICH': 'MI', 'MINN': 'MN', 'MISS': 'MS',
+    'MONT': 'MT', 'NEB': 'NE', 'NEBR': 'NE', 'NEV': 'NV', 'OKLA': 'OK', 'ORE': 'OR',
+    'PENN': 'PA', 'PENNA': 'PA', 'TENN': 'TN', 'TEX': 'TX', 'WASH': 'WA', 'WVA': 'WV',
+    'WIS': 'WI', 'WISC': 'WI', 'WYO': 'WY', 'WASHINGTON DC': 'DC', 'WASHINGTON D C': 'DC',
+    'NYC': 'NY', 'NEW YORK STATE': 'NY', 'STATE OF NEW YORK': 'NY'
+}
+
+# Frequently seen misspellings (the fuzzy fallback covers the long tail)
+STATE_MISSPELLINGS = {
+    'CALIFORINA': 'CA', 'CALFORNIA': 'CA', 'CALIFRONIA': 'CA', 'CONNETICUT': 'CT',
+    'MASSACHUSETS': 'MA', 'MASSACHUSSETTS': 'MA', 'MISSISIPPI': 'MS', 'MISSISSIPI': 'MS',
+    'PENSYLVANIA': 'PA', 'PENNSYLVANNIA': 'PA', 'TENNESSE': 'TN', 'TENNESEE': 'TN',
+    'ILLINIOS': 'IL', 'LOUISANA': 'LA', 'ARIZONIA': 'AZ', 'FLORDIA': 'FL', 'TEXES': 'TX'
+}
+
+# Leading city-name abbreviations expanded during normalization
+CITY_ABBREVIATIONS = {'ST': 'SAINT', 'STE': 'SAINTE', 'FT': 'FORT', 'MT': 'MOUNT', 'PT': 'PORT'}
+
+_NON_ALPHA = re.compile(r'[^A-Z ]+')
+_SPACES = re.compile(r'\s+')
+
+
+def _normalize_key(value: str) -> str:
+    """Upper-case, drop punctuation and collapse whitespace"""
+    key = str(value).upper().replace('.', '')
+    key = _NON_ALPHA.sub(' ', key)
+    return _SPACES.sub(' ', key).strip()
+
+
+def _trigrams(key: str) -> Set[str]:
+    """Padded character trigrams of a normalized key"""
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class LocationIndex:
+    """Maps free-text state and city names to canonical forms"""
+
+    def __init__(self, cache_size: int = 4096, min_similarity: float = 0.5):
+        self.cache_size = cache_size
+        self.min_similarity = min_similarity
+
+        # Exact lookup table: codes, full names, aliases and misspellings
+        self.state_lookup: Dict[str, str] = {}
+        for code, name in US_STATES.items():
+            self.state_lookup[code] = code
+            self.state_lookup[_normalize_key(name)] = code
+        self.state_lookup.update(STATE_ALIASES)
+        self.state_lookup.update(STATE_MISSPELLINGS)
+
+        # Trigram inverted index over the longer keys for fuzzy matching
+        self._fuzzy_keys: List[str] = [key for key in self.state_lookup if len(key) >= 4]
+        self._key_trigrams = [_trigrams(key) for key in self._fuzzy_keys]
+        self._trigram_postings: Dict[str, List[int]] = defaultdict(list)
+        for key_id, grams in enumerate(self._key_trigrams):
+            for gram in grams:
+                self._trigram_postings[gram].append(key_id)
+
+        # Bounded cache so repeated misses do not rescan the index
+        self._fuzzy_state = lru_cache(maxsize=cache_size)(self._fuzzy_state_lookup)
+
+    def __getstate__(self):
+        # The cache wraps a bound method and is rebuilt empty when unpickled
+        state = self.__dict__.copy()
+        del state['_fuzzy_state']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._fuzzy_state = lru_cache(maxsize=self.cache_size)(self._fuzzy_state_lookup)
+
+    def normalize_state(self, value: Optional[str]) -> Optional[str]:
+        """Return the USPS code for a state name, or None if unrecognized"""
+        if value is None:
+            return None
+        key = _normalize_key(value)
+        code = self.state_lookup.get(key)
+        if code is None and len(key) >= 4:
+            code = self._fuzzy_state(key)
+        return code
+
+    def normalize_states(self, values) -> np.ndarray:
+        """Normalize a whole column of state names ('' where unrecognized)"""
+        uniques, inverse = self._factorize(values)
+        codes = np.array([self.normalize_state(value) or '' for value in uniques], dtype='<U2')
+        return codes[inverse]
+
+    def normalize_city(self, value: Optional[str]) -> str:
+        """Return the canonical title-cased form of a city name"""
+        if value is None:
+            return ''
+        words = _normalize_key(value).split(' ')
+        if words and words[0] in CITY_ABBREVIATIONS:
+            words[0] = CITY_ABBREVIATIONS[words[0]]
+        return ' '.join(words).title()
+
+    def normalize_cities(self, values) -> np.ndarray:
+        """Normalize a whole column of city names"""
+        uniques, inverse = self._factorize(values)
+        cities = np.array([self.normalize_city(value) for value in uniques], dtype=object)
+        return cities[inverse]
+
+    def _fuzzy_state_lookup(self, key: str) -> Optional[str]:
+        """Best trigram (Dice) match among indexed keys"""
+        grams = _trigrams(key)
+        shared = defaultdict(int)
+        for gram in grams:
+            for key_id in self._trigram_postings.get(gram, ()):
+                shared[key_id] += 1
+
+        best_id, best_score = None, self.min_similarity
+        for key_id, count in shared.items():
+            score = 2.0 * count / (len(grams) + len(self._key_trigrams[key_id]))
+            if score >= best_score:
+                best_id, best_score = key_id, score
+
+        if best_id is None:
+            return None
+        return self.state_lookup[self._fuzzy_keys[best_id]]
+
+    @staticmethod
+    def _factorize(values):
+        """Distinct values and the inverse mapping back to the column"""
+        column = np.asarray(values, dtype=object)
+        column = np.where(column == None, '', column).astype(str)  # noqa: E711
+        return np.unique(column, return_inverse=True)